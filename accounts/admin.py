@@ -1,10 +1,80 @@
 from django.contrib import admin
-from .models import Profile, Cart, CartItem, Order, OrderItem
+from base.admin import LargeTableAdmin
+from .models import Profile, Cart, CartItem, Order, OrderItem, StockReservation
 
 # Register your models here.
 
-admin.site.register(Profile)
-admin.site.register(Cart)
-admin.site.register(CartItem)
-admin.site.register(Order)
-admin.site.register(OrderItem)
\ No newline at end of file
+@admin.register(Profile)
+class ProfileAdmin(LargeTableAdmin):
+    list_display = ['user', 'is_email_verified', 'order_count', 'total_spent', 'last_order_date']
+    list_select_related = ['user']
+    list_filter = ['is_email_verified']
+    raw_id_fields = ['user', 'shipping_address']
+    search_fields = ['=user__username', '=user__email']
+
+    model = Profile
+
+
+class CartItemInline(admin.TabularInline):
+    model = CartItem
+    raw_id_fields = ['product', 'size_variant', 'color_variant']
+    extra = 0
+
+
+@admin.register(Cart)
+class CartAdmin(LargeTableAdmin):
+    list_display = ['uid', 'user', 'coupon', 'is_paid', 'razorpay_order_id', 'created_at']
+    list_select_related = ['user', 'coupon']
+    list_filter = ['is_paid']
+    raw_id_fields = ['user', 'coupon']
+    search_fields = ['=user__username', '=razorpay_order_id']
+    inlines = [CartItemInline]
+
+    model = Cart
+
+
+@admin.register(CartItem)
+class CartItemAdmin(LargeTableAdmin):
+    list_display = ['cart', 'product', 'size_variant', 'color_variant', 'quantity']
+    list_select_related = ['cart', 'product', 'size_variant', 'color_variant']
+    raw_id_fields = ['cart', 'product', 'size_variant', 'color_variant']
+    search_fields = ['=cart__user__username']
+
+    model = CartItem
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    raw_id_fields = ['product', 'size_variant', 'color_variant']
+    extra = 0
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ['order_id', 'user', 'order_date', 'payment_status', 'payment_mode', 'grand_total']
+    list_select_related = ['user']
+    list_filter = ['payment_status', 'payment_mode']
+    raw_id_fields = ['user', 'coupon']
+    search_fields = ['=order_id', '=user__username']
+    inlines = [OrderItemInline]
+
+    model = Order
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ['order', 'product_name', 'size_name', 'color_name', 'quantity', 'product_price']
+    list_select_related = ['order__user']
+    raw_id_fields = ['order', 'product', 'size_variant', 'color_variant']
+    search_fields = ['=order__order_id']
+
+    model = OrderItem
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(LargeTableAdmin):
+    list_display = ['cart', 'inventory', 'quantity', 'expires_at']
+    list_select_related = ['inventory__product', 'inventory__size_variant', 'inventory__color_variant']
+    raw_id_fields = ['cart', 'inventory']
+
+    model = StockReservation
@@ -0,0 +1,337 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from accounts.models import Cart, CartItem
+from products.cache import get_catalog_version
+from products.coupons import CouponError, get_coupon_version, validate_coupon
+from products.inventory import get_available_quantities
+from products.models import ProductImage, Wishlist
+
+CART_SNAPSHOT_TIMEOUT = 60 * 60
+
+
+class CartUpdateError(Exception):
+    pass
+
+
+def get_open_cart(user, create=True):
+    """
+    Returns the user's unpaid cart. The unique open_cart_owner index makes
+    parallel requests agree on a single cart instead of creating duplicates.
+    """
+    cart = Cart.objects.filter(open_cart_owner=user).first()
+    if cart or not create:
+        return cart
+
+    try:
+        with transaction.atomic():
+            return Cart.objects.create(user=user, is_paid=False)
+    except IntegrityError:
+        # Another request created the cart first.
+        return Cart.objects.get(open_cart_owner=user)
+
+
+def add_cart_item(cart, product, size_variant=None, color_variant=None, quantity=1):
+    """
+    Adds quantity to the cart line, creating the line if needed. The increment
+    is a single UPDATE ... SET quantity = quantity + n so no update gets lost.
+    """
+    line_key = CartItem.build_line_key(
+        product.pk, size_variant.pk if size_variant else None, color_variant.pk if color_variant else None)
+    lines = CartItem.objects.filter(cart=cart, line_key=line_key)
+    cart_item = _increment_or_create_line(lines, cart, product, size_variant, color_variant, quantity)
+    # After the write, a page rendered before it could otherwise cache the old lines again
+    invalidate_cart_snapshot(cart.user_id)
+    return cart_item
+
+
+def _increment_or_create_line(lines, cart, product, size_variant, color_variant, quantity):
+    # created_at is the line's last modification time, purge_stale_data keeps carts with recent lines
+    if lines.update(quantity=F('quantity') + quantity, created_at=timezone.now()):
+        return lines.get()
+
+    try:
+        with transaction.atomic():
+            return CartItem.objects.create(cart=cart, product=product, size_variant=size_variant,
+                                           color_variant=color_variant, quantity=quantity)
+    except IntegrityError:
+        # The line was created concurrently, fall back to incrementing it.
+        lines.update(quantity=F('quantity') + quantity, created_at=timezone.now())
+        return lines.get()
+
+
+def set_cart_item_quantity(user, cart_item_id, quantity):
+    """Sets an absolute quantity on a line of the user's open cart."""
+    updated = CartItem.objects.filter(
+        uid=cart_item_id, cart__user=user, cart__is_paid=False
+    ).update(quantity=quantity, created_at=timezone.now())
+    if not updated:
+        raise CartItem.DoesNotExist("Cart item not found.")
+    invalidate_cart_snapshot(user.pk)
+
+
+def apply_coupon(cart, coupon_code, cart_total=None):
+    """Validates the coupon code against the cart and attaches it. Raises CartUpdateError."""
+    if cart.coupon_id:
+        raise CartUpdateError('Coupon already exists.')
+
+    if cart_total is None:
+        cart_total = get_cart_summary(cart)['subtotal']
+
+    try:
+        coupon_obj = validate_coupon(coupon_code, cart.user, cart_total)
+    except CouponError as e:
+        raise CartUpdateError(str(e))
+
+    cart.coupon = coupon_obj
+    cart.save(update_fields=['coupon'])
+    invalidate_cart_snapshot(cart.user_id)
+    return coupon_obj
+
+
+def get_cart_summary(cart, cart_items=None):
+    """Line prices and totals of the cart, computed from a single query."""
+    if cart_items is None:
+        cart_items = cart.cart_items.select_related('product', 'size_variant', 'color_variant')
+
+    lines = []
+    subtotal = 0
+    for cart_item in cart_items:
+        price = cart_item.get_product_price()
+        subtotal += price
+        lines.append({'cart_item_id': str(cart_item.uid), 'quantity': cart_item.quantity, 'price': price})
+
+    discount = 0
+    coupon = cart.coupon
+    if coupon and subtotal >= coupon.minimum_amount:
+        discount = coupon.discount_amount
+
+    return {
+        'items': lines,
+        'subtotal': subtotal,
+        'discount': discount,
+        'grand_total': subtotal - discount,
+        'coupon': coupon.coupon_code if coupon else None,
+    }
+
+
+
+def _snapshot_key(user_id):
+    return f'cart-snapshot:{user_id}'
+
+
+def invalidate_cart_snapshot(user_id):
+    """
+    Called by every cart mutation, the next cart page rebuilds the snapshot.
+    Dropped again on commit so a page rendered mid-transaction is not kept.
+    """
+    key = _snapshot_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def build_cart_snapshot(cart):
+    """
+    Everything the cart page shows, as plain values: lines with product,
+    primary image, variants and prices, and the totals. Costs one query for
+    the lines and one for the product colors, whatever the number of lines.
+    """
+    primary_image = ProductImage.objects.filter(product=OuterRef('product')).order_by('pk').values('image')[:1]
+    cart_items = list(
+        cart.cart_items.filter(product__isnull=False)
+        .select_related('product', 'size_variant', 'color_variant')
+        .annotate(primary_image=Subquery(primary_image))
+        .prefetch_related('product__color_variant')
+        .order_by('updated_at', 'uid')
+    )
+
+    lines = []
+    for cart_item in cart_items:
+        if cart_item.color_variant:
+            colors = [cart_item.color_variant.color_name]
+        else:
+            colors = [color.color_name for color in cart_item.product.color_variant.all()]
+        lines.append({
+            'uid': str(cart_item.uid),
+            'product_name': cart_item.product.product_name,
+            'product_slug': cart_item.product.slug,
+            'image': cart_item.primary_image,
+            'size_name': cart_item.size_variant.size_name if cart_item.size_variant else None,
+            'colors': colors,
+            'quantity': cart_item.quantity,
+            'price': cart_item.get_product_price(),
+        })
+
+    summary = get_cart_summary(cart, cart_items)
+    return {
+        'cart_id': str(cart.pk),
+        'lines': lines,
+        'subtotal': summary['subtotal'],
+        'discount': summary['discount'],
+        'grand_total': summary['grand_total'],
+        'coupon': summary['coupon'],
+    }
+
+
+def _coupon_state(cart):
+    # Whatever the discount depends on, a deleted coupon leaves coupon_id None without a signal
+    coupon = cart.coupon
+    if coupon is None:
+        return None
+    return [str(coupon.pk), coupon.discount_amount, coupon.minimum_amount]
+
+
+def get_cart_snapshot(cart):
+    """
+    The cart page snapshot, cached per user until the next cart mutation,
+    catalog change or coupon change.
+    """
+    key = _snapshot_key(cart.user_id)
+    versions = {
+        'cart_id': str(cart.pk),
+        'catalog_version': get_catalog_version(),
+        'coupon_version': get_coupon_version(),
+        'coupon_state': _coupon_state(cart),
+    }
+    cached = cache.get(key)
+    if cached and all(cached.get(name) == value for name, value in versions.items()):
+        return cached
+
+    snapshot = build_cart_snapshot(cart)
+    snapshot.update(versions)
+    cache.set(key, snapshot, CART_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+def apply_cart_changes(user, changes, coupon_code=None):
+    """
+    Applies many line changes in one transaction: each change is
+    {'cart_item_id': ..., 'quantity': n} or {'cart_item_id': ..., 'remove': true}.
+    coupon_code applies a coupon, an empty string removes the current one.
+    Either every change is applied or none is. Returns the new cart summary.
+    """
+    with transaction.atomic():
+        cart = Cart.objects.select_related('coupon').filter(open_cart_owner=user).first()
+        if cart is None:
+            raise CartUpdateError('Your cart is empty.')
+
+        cart_items = {
+            str(cart_item.uid): cart_item
+            for cart_item in cart.cart_items.select_related('product', 'size_variant', 'color_variant')
+        }
+
+        updated, removed = {}, set()
+        for change in changes:
+            cart_item = cart_items.get(str(change.get('cart_item_id')))
+            if cart_item is None:
+                raise CartUpdateError('Cart item not found.')
+
+            if change.get('remove'):
+                removed.add(cart_item.pk)
+                continue
+
+            try:
+                quantity = int(change.get('quantity'))
+            except (TypeError, ValueError):
+                raise CartUpdateError('Invalid quantity.')
+            if quantity < 1:
+                raise CartUpdateError('Quantity must be at least 1.')
+
+            cart_item.quantity = quantity
+            cart_item.created_at = timezone.now()
+            updated[cart_item.pk] = cart_item
+
+        available = get_available_quantities(updated.values())
+        for cart_item in updated.values():
+            if available.get(cart_item.pk) is not None and cart_item.quantity > available[cart_item.pk]:
+                raise CartUpdateError(
+                    f'Only {available[cart_item.pk]} left in stock for {cart_item.product.product_name}.')
+
+        if removed:
+            CartItem.objects.filter(pk__in=removed).delete()
+        if updated:
+            CartItem.objects.bulk_update([item for item in updated.values() if item.pk not in removed],
+                                         ['quantity', 'created_at'])
+
+        remaining = [item for item in cart_items.values() if item.pk not in removed]
+
+        if coupon_code == '':
+            cart.coupon = None
+            cart.save(update_fields=['coupon'])
+        elif coupon_code:
+            cart_total = sum(cart_item.get_product_price() for cart_item in remaining)
+            apply_coupon(cart, coupon_code, cart_total=cart_total)
+
+        # Inside the transaction, so the snapshot is dropped again once the changes are committed
+        invalidate_cart_snapshot(user.pk)
+        return get_cart_summary(cart, remaining)
+
+
+def insert_cart_lines(cart, lines):
+    """
+    Inserts new quantity 1 lines with one bulk INSERT. A line another request
+    inserted meanwhile is incremented instead, like add_cart_item does, so
+    no add is lost. Call inside a transaction.
+    """
+    while lines:
+        try:
+            with transaction.atomic():
+                CartItem.objects.bulk_create(lines)
+            return
+        except IntegrityError:
+            # A locking read, so rows committed after this transaction started are seen too
+            present = set(CartItem.objects.select_for_update().filter(
+                cart=cart, line_key__in=[line.line_key for line in lines]).values_list('line_key', flat=True))
+            if not present:
+                raise
+            CartItem.objects.filter(cart=cart, line_key__in=present).update(
+                quantity=F('quantity') + 1, created_at=timezone.now())
+            lines = [line for line in lines if line.line_key not in present]
+
+
+def move_wishlist_to_cart(user, wishlist_ids=None):
+    """
+    Moves the selected wishlist items (all of them when wishlist_ids is None)
+    into the open cart in one transaction: existing cart lines are
+    incremented with one bulk UPDATE, new ones are inserted with one bulk
+    INSERT (see insert_cart_lines), and the moved wishlist rows are deleted. Items
+    that are out of stock stay in the wishlist. Returns the counts and the
+    new cart summary.
+    """
+    with transaction.atomic():
+        # Locking the rows makes a repeated request wait, then find nothing left to move
+        items = Wishlist.objects.select_for_update().filter(user=user)
+        if wishlist_ids is not None:
+            items = items.filter(pk__in=wishlist_ids)
+        items = list(items)
+
+        cart = get_open_cart(user)
+        lines = {}
+        for item in items:
+            line = CartItem(cart=cart, product_id=item.product_id, size_variant_id=item.size_variant_id, quantity=1)
+            line.line_key = CartItem.build_line_key(item.product_id, item.size_variant_id)
+            lines[item.pk] = line
+
+        available = get_available_quantities(lines.values())
+        moved = {pk: line for pk, line in lines.items() if available[line.pk] is None or available[line.pk] >= 1}
+
+        existing = {
+            cart_item.line_key: cart_item
+            for cart_item in CartItem.objects.filter(cart=cart, line_key__in=[line.line_key for line in moved.values()])
+        }
+        for cart_item in existing.values():
+            cart_item.quantity = F('quantity') + 1
+            cart_item.created_at = timezone.now()
+        CartItem.objects.bulk_update(existing.values(), ['quantity', 'created_at'])
+
+        insert_cart_lines(cart, [line for line in moved.values() if line.line_key not in existing])
+
+        Wishlist.objects.filter(pk__in=list(moved)).delete()
+        invalidate_cart_snapshot(user.pk)
+
+    return {
+        'moved': len(moved),
+        'out_of_stock': len(lines) - len(moved),
+        'cart': get_cart_summary(cart),
+    }
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with its work factor read from settings.PASSWORD_HASH_ITERATIONS.
+    It keeps the pbkdf2_sha256 algorithm name, so existing hashes still verify
+    and are rehashed with the new count the next time the user logs in.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,49 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Times password checks with the configured hasher, optionally at several work factors, "
+        "under a burst of concurrent logins. Use it to size PASSWORD_HASH_ITERATIONS to the CPU you have."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, nargs='*',
+                            help="PBKDF2 work factors to compare, defaults to PASSWORD_HASH_ITERATIONS.")
+        parser.add_argument('--logins', type=int, default=100, help="Password checks per work factor.")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Concurrent checks, roughly the number of CPU cores serving logins.")
+
+    def handle(self, *args, **options):
+        hasher = get_hasher()
+        self.stdout.write(f"Hasher: {hasher.algorithm}, {options['logins']} logins, {options['workers']} workers")
+
+        for iterations in options['iterations'] or [settings.PASSWORD_HASH_ITERATIONS]:
+            # Only the tunable PBKDF2 hasher reads the setting, other hashers ignore it
+            with override_settings(PASSWORD_HASH_ITERATIONS=iterations):
+                encoded = hasher.encode('benchmark-password', hasher.salt())
+                elapsed, latencies = self.time_checks(hasher, encoded, options['logins'], options['workers'])
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(self.style.SUCCESS(
+                f"iterations={iterations}: {len(latencies) / elapsed:.1f} logins/s, "
+                f"median {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms"
+            ))
+
+    def time_checks(self, hasher, encoded, logins, workers):
+        def check(_):
+            started = time.perf_counter()
+            hasher.verify('benchmark-password', encoded)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            latencies = list(pool.map(check, range(logins)))
+        return time.perf_counter() - started, latencies
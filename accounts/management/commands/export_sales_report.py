@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from accounts.reports import REPORTS, stream_csv
+
+
+class Command(BaseCommand):
+    help = "Streams a finance report (orders, daily-revenue, coupons or top-products) as CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('report', choices=sorted(REPORTS))
+        parser.add_argument('--from', dest='date_from', help="First day to include, YYYY-MM-DD.")
+        parser.add_argument('--to', dest='date_to', help="Last day to include, YYYY-MM-DD.")
+        parser.add_argument('--output', help="Output file, defaults to stdout.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        dates = {}
+        for option in ('date_from', 'date_to'):
+            if options[option]:
+                dates[option] = parse_date(options[option])
+                if dates[option] is None:
+                    raise CommandError(f"{options[option]} is not a YYYY-MM-DD date.")
+
+        header, rows = REPORTS[options['report']]
+        lines = stream_csv(header, rows(chunk_size=options['chunk_size'], **dates))
+
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            output.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(f"Wrote the {options['report']} report to {options['output']}."))
@@ -0,0 +1,111 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import Cart, Profile
+from products.inventory import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Purges abandoned unpaid carts, never verified accounts and orphaned profile images "
+        "in small batches, so it can run next to production traffic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cart-days', type=int, default=30,
+                            help="Delete unpaid carts untouched for this many days.")
+        parser.add_argument('--profile-days', type=int, default=7,
+                            help="Delete accounts still unverified after this many days.")
+        parser.add_argument('--file-days', type=int, default=1,
+                            help="Only delete orphaned images older than this many days.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.5,
+                            help="Seconds to pause between batches to limit lock time and replication lag.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many rows and files would be deleted.")
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.pause = options['sleep']
+        self.dry_run = options['dry_run']
+        now = timezone.now()
+
+        if not self.dry_run:
+            # Give reserved stock back first, carts holding a live reservation are skipped below.
+            release_expired_reservations(now=now)
+
+        cart_cutoff = now - timedelta(days=options['cart_days'])
+        # Adding or changing a line only writes the CartItem, so a cart in use has recent lines
+        carts = Cart.objects.filter(
+            is_paid=False,
+            created_at__lt=cart_cutoff,
+            stock_reservations__isnull=True,
+        ).exclude(cart_items__created_at__gte=cart_cutoff)
+        self.purge("abandoned carts", carts)
+
+        users = User.objects.filter(
+            profile__is_email_verified=False,
+            profile__email_token__isnull=False,
+            profile__updated_at__lt=now - timedelta(days=options['profile_days']),
+            last_login__isnull=True,
+            is_staff=False,
+        )
+        self.purge("unverified accounts", users)
+
+        self.purge_orphaned_images(now - timedelta(days=options['file_days']))
+
+    def purge(self, label, queryset):
+        if self.dry_run:
+            self.stdout.write(f"[dry-run] {label}: {queryset.count()} rows would be deleted.")
+            return
+
+        deleted = 0
+        while True:
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                break
+
+            # Re-apply the filter so a row that changed since it was selected is kept.
+            _, counts = queryset.filter(pk__in=pks).delete()
+            deleted += counts.get(queryset.model._meta.label, 0)
+            self.stdout.write(f"{label}: {deleted} deleted so far.")
+
+            if len(pks) < self.batch_size:
+                break
+            time.sleep(self.pause)
+
+        self.stdout.write(self.style.SUCCESS(f"{label}: {deleted} deleted."))
+
+    def purge_orphaned_images(self, cutoff):
+        directory = os.path.join(settings.MEDIA_ROOT, Profile._meta.get_field('profile_image').upload_to)
+        if not os.path.isdir(directory):
+            return
+
+        referenced = set(
+            Profile.objects.exclude(profile_image='').exclude(profile_image__isnull=True)
+            .values_list('profile_image', flat=True).iterator(chunk_size=self.batch_size)
+        )
+
+        orphaned = []
+        for entry in os.scandir(directory):
+            name = f"{os.path.basename(directory)}/{entry.name}"
+            if entry.is_file() and name not in referenced and entry.stat().st_mtime < cutoff.timestamp():
+                orphaned.append(entry.path)
+
+        if self.dry_run:
+            self.stdout.write(f"[dry-run] orphaned profile images: {len(orphaned)} files would be deleted.")
+            return
+
+        for count, path in enumerate(orphaned, start=1):
+            os.remove(path)
+            if count % self.batch_size == 0:
+                self.stdout.write(f"orphaned profile images: {count} deleted so far.")
+                time.sleep(self.pause)
+
+        self.stdout.write(self.style.SUCCESS(f"orphaned profile images: {len(orphaned)} deleted."))
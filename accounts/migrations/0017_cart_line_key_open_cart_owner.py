@@ -0,0 +1,59 @@
+# Generated by Django 5.0.6 on 2026-10-19 10:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_keys(apps, schema_editor):
+    Cart = apps.get_model('accounts', 'Cart')
+    CartItem = apps.get_model('accounts', 'CartItem')
+
+    # Keep a single open cart per user, later duplicates stay as plain unpaid carts.
+    owners = set()
+    for cart in Cart.objects.filter(is_paid=False, user__isnull=False).order_by('updated_at'):
+        if cart.user_id in owners:
+            continue
+        owners.add(cart.user_id)
+        Cart.objects.filter(pk=cart.pk).update(open_cart_owner=cart.user_id)
+
+    # Merge duplicated cart lines into one line before the unique index is created.
+    lines = {}
+    for cart_item in CartItem.objects.order_by('updated_at'):
+        line_key = f"{cart_item.product_id}:{cart_item.size_variant_id or ''}:{cart_item.color_variant_id or ''}"
+        key = (cart_item.cart_id, line_key)
+        if key in lines:
+            first = lines[key]
+            first.quantity += cart_item.quantity
+            CartItem.objects.filter(pk=first.pk).update(quantity=first.quantity)
+            cart_item.delete()
+            continue
+        lines[key] = cart_item
+        CartItem.objects.filter(pk=cart_item.pk).update(line_key=line_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_stockreservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='open_cart_owner',
+            field=models.OneToOneField(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='open_cart', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='line_key',
+            field=models.CharField(default='', editable=False, max_length=120),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_keys, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='cartitem',
+            unique_together={('cart', 'line_key')},
+        ),
+    ]
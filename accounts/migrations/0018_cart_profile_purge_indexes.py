@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-19 11:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_cart_line_key_open_cart_owner'),
+        ('home', '0001_initial'),
+        ('products', '0016_coupon_limits_couponusage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['is_paid', 'created_at'], name='accounts_ca_is_paid_8ff8aa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['is_email_verified', 'updated_at'], name='accounts_pr_is_emai_b968c3_idx'),
+        ),
+    ]
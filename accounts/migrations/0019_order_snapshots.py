@@ -0,0 +1,67 @@
+# Generated by Django 5.0.6 on 2026-10-19 11:37
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_snapshots(apps, schema_editor):
+    Order = apps.get_model('accounts', 'Order')
+    OrderItem = apps.get_model('accounts', 'OrderItem')
+
+    Order.objects.update(coupon_discount=F('order_total_price') - F('grand_total'))
+
+    order_items = OrderItem.objects.select_related('product', 'size_variant', 'color_variant')
+    batch = []
+    for item in order_items.iterator(chunk_size=1000):
+        if item.product:
+            item.product_name = item.product.product_name
+            item.product_slug = item.product.slug or ''
+            if not item.color_variant:
+                item.color_name = ", ".join(color.color_name for color in item.product.color_variant.all())
+        if item.size_variant:
+            item.size_name = item.size_variant.size_name
+        if item.color_variant:
+            item.color_name = item.color_variant.color_name
+        batch.append(item)
+
+        if len(batch) == 1000:
+            OrderItem.objects.bulk_update(batch, ['product_name', 'product_slug', 'size_name', 'color_name'])
+            batch = []
+
+    OrderItem.objects.bulk_update(batch, ['product_name', 'product_slug', 'size_name', 'color_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_cart_profile_purge_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='coupon_discount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='color_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_slug',
+            field=models.SlugField(blank=True, db_index=False, default=''),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='size_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
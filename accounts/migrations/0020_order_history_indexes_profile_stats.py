@@ -0,0 +1,55 @@
+# Generated by Django 5.0.6 on 2026-10-19 11:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_order_stats(apps, schema_editor):
+    Order = apps.get_model('accounts', 'Order')
+    Profile = apps.get_model('accounts', 'Profile')
+
+    stats = Order.objects.values('user').annotate(
+        order_count=Count('pk'), total_spent=Sum('grand_total'), last_order_date=Max('order_date'))
+    for row in stats.iterator():
+        Profile.objects.filter(user_id=row['user']).update(
+            order_count=row['order_count'],
+            total_spent=row['total_spent'] or 0,
+            last_order_date=row['last_order_date'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_order_snapshots'),
+        ('products', '0016_coupon_limits_couponusage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='last_order_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='order_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='total_spent',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'order_date', 'uid'], name='accounts_or_user_id_c487bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'payment_status', 'order_date'], name='accounts_or_user_id_9556b6_idx'),
+        ),
+        migrations.RunPython(backfill_order_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_order_history_indexes_profile_stats'),
+        ('products', '0023_popularity_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_date'], name='accounts_or_order_d_381e6b_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import migrations
+from django.utils import timezone
+
+OLD_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+NEW_BACKEND = 'accounts.backends.ProfileModelBackend'
+BATCH_SIZE = 1000
+
+
+def move_sessions(apps, schema_editor, old=OLD_BACKEND, new=NEW_BACKEND):
+    # A session whose backend is no longer in AUTHENTICATION_BACKENDS is logged out,
+    # so live sessions of the replaced ModelBackend are pointed at its subclass.
+    Session = apps.get_model('sessions', 'Session')
+    store = SessionStore()
+    changed = []
+    for session in Session.objects.filter(expire_date__gt=timezone.now()).iterator(chunk_size=BATCH_SIZE):
+        data = store.decode(session.session_data)
+        if data.get(BACKEND_SESSION_KEY) != old:
+            continue
+        data[BACKEND_SESSION_KEY] = new
+        session.session_data = store.encode(data)
+        changed.append(session)
+        if len(changed) == BATCH_SIZE:
+            Session.objects.bulk_update(changed, ['session_data'])
+            changed = []
+    Session.objects.bulk_update(changed, ['session_data'])
+
+
+def restore_sessions(apps, schema_editor):
+    move_sessions(apps, schema_editor, old=NEW_BACKEND, new=OLD_BACKEND)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_order_date_index'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_sessions, restore_sessions),
+    ]
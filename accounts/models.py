@@ -2,10 +2,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from base.models import BaseModel
-from products.models import Product, ColorVariant, SizeVariant, Coupon
+from products.models import Product, ColorVariant, SizeVariant, Coupon, Inventory
 from home.models import ShippingAddress
-from django.conf import settings
-import os
 # Create your models here.
 
 
@@ -18,26 +16,38 @@ class Profile(BaseModel):
     bio = models.TextField(null=True, blank=True)
     shipping_address = models.ForeignKey(ShippingAddress, on_delete=models.CASCADE, related_name="shipping_address", null=True, blank=True)
 
+    # Lifetime order aggregates, kept up to date by create_order
+    order_count = models.PositiveIntegerField(default=0, editable=False)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    last_order_date = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        # Used by the purge_stale_data command, updated_at holds the creation time
+        indexes = [models.Index(fields=['is_email_verified', 'updated_at'])]
+
     def __str__(self):
         return self.user.username
 
     def get_cart_count(self):
         return CartItem.objects.filter(cart__is_paid=False, cart__user=self.user).count()
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets save() spot a replaced image without reading the row again
+        instance._loaded_profile_image = instance.__dict__.get('profile_image')
+        return instance
+
     def save(self, *args, **kwargs):
-        # Check if the profile image is being updated and profile exists
-        if self.pk:  # Only if profile exists
-            try:
-                old_profile = Profile.objects.get(pk=self.pk)
-                if old_profile.profile_image and old_profile.profile_image != self.profile_image:
-                    old_image_path = os.path.join(settings.MEDIA_ROOT, old_profile.profile_image.path)
-                    if os.path.exists(old_image_path):
-                        os.remove(old_image_path)
-            except Profile.DoesNotExist:
-                # Profile does not exist, so nothing to do
-                pass
+        old_image = getattr(self, '_loaded_profile_image', None)
+        old_name = getattr(old_image, 'name', old_image)
+        if old_name and old_name != self.profile_image.name:
+            storage = self._meta.get_field('profile_image').storage
+            if storage.exists(old_name):
+                storage.delete(old_name)
 
         super(Profile, self).save(*args, **kwargs)
+        self._loaded_profile_image = self.profile_image.name
 
 
 
@@ -48,6 +58,17 @@ class Cart(BaseModel):
     razorpay_order_id = models.CharField(max_length=100, null=True, blank=True)
     razorpay_payment_id = models.CharField(max_length=100, null=True, blank=True)
     razorpay_payment_signature = models.CharField(max_length=100, null=True, blank=True)
+    # Only set while the cart is unpaid, the unique index allows one open cart per user.
+    open_cart_owner = models.OneToOneField(User, on_delete=models.CASCADE, related_name="open_cart",
+                                           null=True, blank=True, editable=False)
+
+    class Meta:
+        # Used by the purge_stale_data command, created_at holds the last modification time
+        indexes = [models.Index(fields=['is_paid', 'created_at'])]
+
+    def save(self, *args, **kwargs):
+        self.open_cart_owner = None if self.is_paid else self.user
+        super(Cart, self).save(*args, **kwargs)
 
     def get_cart_total(self):
         cart_items = self.cart_items.all()
@@ -75,6 +96,18 @@ class CartItem(BaseModel):
     color_variant = models.ForeignKey(ColorVariant, on_delete=models.SET_NULL, null=True, blank=True)
     size_variant = models.ForeignKey(SizeVariant, on_delete=models.SET_NULL, null=True, blank=True)
     quantity = models.IntegerField(default=1)
+    line_key = models.CharField(max_length=120, editable=False)
+
+    class Meta:
+        unique_together = ('cart', 'line_key')
+
+    @staticmethod
+    def build_line_key(product_id, size_variant_id=None, color_variant_id=None):
+        return f"{product_id}:{size_variant_id or ''}:{color_variant_id or ''}"
+
+    def save(self, *args, **kwargs):
+        self.line_key = self.build_line_key(self.product_id, self.size_variant_id, self.color_variant_id)
+        super(CartItem, self).save(*args, **kwargs)
 
     def get_product_price(self):
         price = self.product.price * self.quantity
@@ -88,6 +121,16 @@ class CartItem(BaseModel):
         return price
 
 
+class StockReservation(BaseModel):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="stock_reservations")
+    inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name="reservations")
+    quantity = models.PositiveIntegerField(default=1)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.inventory} x {self.quantity}"
+
+
 class Order(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
     order_id = models.CharField(max_length=100, unique=True)
@@ -97,8 +140,18 @@ class Order(BaseModel):
     payment_mode = models.CharField(max_length=100)
     order_total_price = models.DecimalField(max_digits=10, decimal_places=2)
     coupon = models.ForeignKey(Coupon, on_delete=models.SET_NULL, null=True, blank=True)
+    coupon_discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     grand_total = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        # Order history pages by (order_date, uid) per user, optionally filtered by status
+        indexes = [
+            models.Index(fields=['user', 'order_date', 'uid']),
+            models.Index(fields=['user', 'payment_status', 'order_date']),
+            # Sales reports and the popularity job read all orders by date
+            models.Index(fields=['order_date']),
+        ]
+
     def __str__(self):
         return f"Order {self.order_id} by {self.user.username}"
     
@@ -114,11 +167,41 @@ class OrderItem(BaseModel):
     quantity = models.PositiveIntegerField(default=1)
     product_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
 
+    # Snapshot of the product taken when the order is placed, later catalog edits do not change it
+    product_name = models.CharField(max_length=100, blank=True, default='')
+    product_slug = models.SlugField(blank=True, default='', db_index=False)
+    size_name = models.CharField(max_length=100, blank=True, default='')
+    color_name = models.CharField(max_length=100, blank=True, default='')
+
     def __str__(self):
-        return f"{self.product.product_name} - {self.quantity}"
-    
+        return f"{self.product_name} - {self.quantity}"
+
+    @classmethod
+    def from_cart_item(cls, order, cart_item):
+        product = cart_item.product
+        if cart_item.color_variant:
+            color_name = cart_item.color_variant.color_name
+        else:
+            color_name = ", ".join(color.color_name for color in product.color_variant.all())
+
+        return cls(
+            order=order,
+            product=product,
+            size_variant=cart_item.size_variant,
+            color_variant=cart_item.color_variant,
+            quantity=cart_item.quantity,
+            product_price=cart_item.get_product_price(),
+            product_name=product.product_name,
+            product_slug=product.slug or '',
+            size_name=cart_item.size_variant.size_name if cart_item.size_variant else '',
+            color_name=color_name,
+        )
+
     def get_total_price(self):
-        # Use the get_product_price method from CartItem
+        if self.product_price is not None:
+            return self.product_price
+
+        # Orders placed before prices were stored, use the get_product_price method from CartItem
         cart_item = CartItem(
             product=self.product,
             size_variant=self.size_variant,
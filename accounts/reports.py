@@ -0,0 +1,90 @@
+import csv
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import Order, OrderItem
+
+
+class Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def filter_by_date_range(queryset, field, date_from=None, date_to=None):
+    # Compare against day boundaries instead of DATE(field) so the index can be used
+    if date_from:
+        queryset = queryset.filter(**{f"{field}__gte": timezone.make_aware(datetime.combine(date_from, time.min))})
+    if date_to:
+        queryset = queryset.filter(
+            **{f"{field}__lt": timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))})
+    return queryset
+
+
+def order_rows(date_from=None, date_to=None, chunk_size=2000):
+    """One row per order line, read through a server-side cursor in chunks."""
+    items = filter_by_date_range(OrderItem.objects.all(), 'order__order_date', date_from, date_to)
+    items = items.order_by('order__order_date', 'order__order_id').values_list(
+        'order__order_id', 'order__order_date', 'order__user__username', 'order__payment_status',
+        'order__payment_mode', 'order__coupon__coupon_code', 'order__coupon_discount', 'order__grand_total',
+        'product_name', 'size_name', 'color_name', 'quantity', 'product_price',
+    )
+    for row in items.iterator(chunk_size=chunk_size):
+        yield [row[0], row[1].isoformat(), *row[2:]]
+
+
+def daily_revenue_rows(date_from=None, date_to=None, chunk_size=2000):
+    orders = filter_by_date_range(Order.objects.all(), 'order_date', date_from, date_to)
+    days = orders.annotate(day=TruncDate('order_date')).values('day').annotate(
+        orders=Count('pk'),
+        subtotal=Sum('order_total_price'),
+        discount=Sum('coupon_discount'),
+        revenue=Sum('grand_total'),
+    ).order_by('day')
+    for day in days.iterator(chunk_size=chunk_size):
+        yield [day['day'].isoformat(), day['orders'], day['subtotal'], day['discount'], day['revenue']]
+
+
+def coupon_usage_rows(date_from=None, date_to=None, chunk_size=2000):
+    orders = filter_by_date_range(Order.objects.filter(coupon__isnull=False), 'order_date', date_from, date_to)
+    coupons = orders.values('coupon__coupon_code').annotate(
+        orders=Count('pk'),
+        discount=Sum('coupon_discount'),
+        revenue=Sum('grand_total'),
+    ).order_by('-orders')
+    for coupon in coupons.iterator(chunk_size=chunk_size):
+        yield [coupon['coupon__coupon_code'], coupon['orders'], coupon['discount'], coupon['revenue']]
+
+
+def top_product_rows(date_from=None, date_to=None, chunk_size=2000, limit=100):
+    items = filter_by_date_range(OrderItem.objects.all(), 'order__order_date', date_from, date_to)
+    products = items.values('product_name').annotate(
+        units=Sum('quantity'),
+        orders=Count('order', distinct=True),
+        revenue=Sum('product_price'),
+    ).order_by('-revenue')[:limit]
+    for product in products.iterator(chunk_size=chunk_size):
+        yield [product['product_name'], product['units'], product['orders'], product['revenue']]
+
+
+REPORTS = {
+    'orders': (
+        ['order_id', 'order_date', 'username', 'payment_status', 'payment_mode', 'coupon', 'coupon_discount',
+         'order_grand_total', 'product', 'size', 'color', 'quantity', 'line_total'],
+        order_rows,
+    ),
+    'daily-revenue': (['day', 'orders', 'subtotal', 'discount', 'revenue'], daily_revenue_rows),
+    'coupons': (['coupon', 'orders', 'discount', 'revenue'], coupon_usage_rows),
+    'top-products': (['product', 'units', 'orders', 'revenue'], top_product_rows),
+}
@@ -1,15 +1,17 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from accounts.models import Profile
+from accounts.models import Profile, Cart
+from accounts.carts import invalidate_cart_snapshot
 
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
+    # register_page passes the initial profile fields along so the profile is written in one INSERT
     if created:
-        Profile.objects.create(user=instance)
+        Profile.objects.create(user=instance, **getattr(instance, '_profile_defaults', {}))
 
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
+@receiver(post_save, sender=Cart)
+def cart_saved(sender, instance, **kwargs):
+    invalidate_cart_snapshot(instance.user_id)
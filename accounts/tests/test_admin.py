@@ -0,0 +1,60 @@
+import pytest
+from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from accounts.models import Order
+from accounts.views import create_order
+from accounts.carts import get_open_cart, add_cart_item
+from base import admin as base_admin
+from base.admin import EstimatedCountPaginator
+from products.models import Category, SizeVariant, Product
+
+# Fixtures
+@pytest.fixture
+def product():
+    category = Category.objects.create(category_name="Shoes")
+    return Product.objects.create(product_name="Runner", price=100, product_desription="Runner", category=category)
+
+def place_orders(product, count, offset=0):
+    size_variant = SizeVariant.objects.create(size_name=f"M-{offset}", price=10)
+    for i in range(offset, offset + count):
+        user = User.objects.create_user(username=f'buyer{i}', password='password')
+        cart = get_open_cart(user)
+        add_cart_item(cart, product, size_variant)
+        cart.razorpay_order_id = f'order_{i}'
+        cart.is_paid = True
+        cart.save()
+        create_order(cart)
+
+def changelist_queries(client, url):
+    # Warm up the per-user caches (navbar counts) so only the page itself is measured
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(queries)
+
+# Test Cases
+
+# 1. Changelist pages cost the same number of queries for 3 or 12 rows
+@pytest.mark.django_db
+@pytest.mark.parametrize('model', ['profile', 'cart', 'cartitem', 'order', 'orderitem'])
+def test_changelist_query_count_is_constant(admin_client, product, model):
+    url = reverse(f'admin:accounts_{model}_changelist')
+    place_orders(product, 3)
+    few = changelist_queries(admin_client, url)
+    place_orders(product, 9, offset=3)
+    assert changelist_queries(admin_client, url) == few
+
+# 2. Large unfiltered tables are counted from table statistics
+@pytest.mark.django_db
+def test_paginator_uses_estimated_count_for_large_tables(monkeypatch, product):
+    place_orders(product, 2)
+    monkeypatch.setattr(base_admin, 'estimate_row_count', lambda model, using: 5000000)
+    assert EstimatedCountPaginator(Order.objects.all(), 50).count == 5000000
+
+    # Filtered querysets and small tables still get an exact count
+    assert EstimatedCountPaginator(Order.objects.filter(order_id='order_0'), 50).count == 1
+    monkeypatch.setattr(base_admin, 'estimate_row_count', lambda model, using: 40)
+    assert EstimatedCountPaginator(Order.objects.all(), 50).count == 2
@@ -0,0 +1,187 @@
+import importlib
+from io import StringIO
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.test import Client
+from django.apps import apps
+from django.conf import settings as django_settings
+from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY, HASH_SESSION_KEY, authenticate
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.contrib.messages import get_messages
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from accounts.models import Profile
+
+REGISTRATION = {
+    'username': 'newuser',
+    'first_name': 'New',
+    'last_name': 'User',
+    'email': 'new@example.com',
+    'password': 'newpassword123',
+}
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashing(settings):
+    settings.PASSWORD_HASH_ITERATIONS = 1000
+
+
+def statements(queries, verb):
+    return [query['sql'] for query in queries if query['sql'].lstrip().upper().startswith(verb)]
+
+
+@pytest.mark.django_db
+def test_register_writes_one_row_per_table(monkeypatch, django_capture_on_commit_callbacks):
+    sent = []
+    monkeypatch.setattr('accounts.views.send_account_activation_email', lambda email, token: sent.append((email, token)))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().post(reverse('register'), REGISTRATION)
+
+    assert response.status_code == 302
+    inserts = statements(queries.captured_queries, 'INSERT')
+    assert len(inserts) == 2
+    assert 'auth_user' in inserts[0] and 'accounts_profile' in inserts[1]
+    assert statements(queries.captured_queries, 'UPDATE') == []
+    assert len(statements(queries.captured_queries, 'SELECT')) == 1
+
+    user = User.objects.select_related('profile').get(username='newuser')
+    assert user.check_password('newpassword123')
+    assert user.profile.email_token
+    assert sent == [('new@example.com', user.profile.email_token)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('field, value, message', [
+    ('username', 'newuser', 'Username already exists!'),
+    ('email', 'new@example.com', 'Email already exists!'),
+])
+def test_register_rejects_taken_username_or_email(field, value, message):
+    User.objects.create_user(**{'username': 'someone', 'email': 'someone@example.com', field: value})
+
+    response = Client().post(reverse('register'), REGISTRATION)
+
+    assert [str(m) for m in get_messages(response.wsgi_request)] == [message]
+    assert User.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_saving_a_user_leaves_the_profile_alone():
+    user = User.objects.create_user(username='testuser', password='password')
+    user = User.objects.select_related('profile').get(pk=user.pk)
+
+    with CaptureQueriesContext(connection) as queries:
+        user.first_name = 'Changed'
+        user.save()
+
+    assert len(queries.captured_queries) == 1
+    assert 'auth_user' in queries.captured_queries[0]['sql']
+
+
+@pytest.mark.django_db
+def test_profile_save_replaces_image_without_reading_the_row(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    user = User.objects.create_user(username='testuser', password='password')
+    profile = Profile.objects.get(user=user)
+    profile.profile_image.save('old.jpg', ContentFile(b'old'))
+    old_name = profile.profile_image.name
+
+    profile = Profile.objects.get(pk=profile.pk)
+    profile.profile_image.save('new.jpg', ContentFile(b'new'), save=False)
+    with CaptureQueriesContext(connection) as queries:
+        profile.save()
+
+    assert statements(queries.captured_queries, 'SELECT') == []
+    assert not default_storage.exists(old_name)
+    assert default_storage.exists(profile.profile_image.name)
+
+    # Saving again without touching the image keeps the file
+    profile.bio = 'Hello'
+    profile.save()
+    assert default_storage.exists(profile.profile_image.name)
+
+
+@pytest.fixture
+def verified_user():
+    user = User.objects.create_user(username='testuser', password='password')
+    Profile.objects.filter(user=user).update(is_email_verified=True)
+    return user
+
+
+@pytest.mark.django_db
+def test_authenticate_loads_user_and_profile_in_one_query(verified_user):
+    with CaptureQueriesContext(connection) as queries:
+        user = authenticate(username='testuser', password='password')
+        assert user.profile.is_email_verified
+
+    assert len(queries.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_login_checks_password_before_verification(verified_user):
+    Profile.objects.filter(user=verified_user).update(is_email_verified=False)
+    response = Client().post(reverse('login'), {'username': 'testuser', 'password': 'wrong'})
+    assert [str(m) for m in get_messages(response.wsgi_request)] == ['Invalid credentials.']
+
+    client = Client()
+    response = client.post(reverse('login'), {'username': 'testuser', 'password': 'password'})
+    assert [str(m) for m in get_messages(response.wsgi_request)] == ['Account not verified!']
+    assert '_auth_user_id' not in client.session
+
+
+@pytest.mark.django_db
+def test_login_writes_only_last_login(verified_user):
+    client = Client()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(reverse('login'), {'username': 'testuser', 'password': 'password'})
+
+    assert response.status_code == 302
+    assert client.session['_auth_user_id'] == str(verified_user.pk)
+    user_queries = [query['sql'] for query in queries.captured_queries if 'auth_user' in query['sql']]
+    assert len(user_queries) == 2  # the authenticating SELECT and the last_login UPDATE
+    assert not any('accounts_profile' in sql for sql in statements(queries.captured_queries, 'UPDATE'))
+
+
+@pytest.mark.django_db
+def test_sessions_of_the_old_backend_stay_logged_in(verified_user):
+    session = SessionStore()
+    session.update({SESSION_KEY: str(verified_user.pk), HASH_SESSION_KEY: verified_user.get_session_auth_hash(),
+                    BACKEND_SESSION_KEY: 'django.contrib.auth.backends.ModelBackend'})
+    session.create()
+    client = Client()
+    client.cookies[django_settings.SESSION_COOKIE_NAME] = session.session_key
+    # Without the migration the backend path is no longer listed and the user is logged out
+    assert client.get(reverse('index')).wsgi_request.user.is_anonymous
+
+    migration = importlib.import_module('accounts.migrations.0022_sessions_profile_backend')
+    migration.move_sessions(apps, None)
+
+    assert SessionStore(session.session_key).load()[BACKEND_SESSION_KEY] == 'accounts.backends.ProfileModelBackend'
+    response = client.get(reverse('index'))
+    assert response.wsgi_request.user == verified_user
+
+
+@pytest.mark.django_db
+def test_password_is_rehashed_on_login_when_work_factor_changes(settings, verified_user):
+    assert User.objects.get(pk=verified_user.pk).password.startswith('pbkdf2_sha256$1000$')
+
+    settings.PASSWORD_HASH_ITERATIONS = 1500
+    assert authenticate(username='testuser', password='password')
+
+    assert User.objects.get(pk=verified_user.pk).password.startswith('pbkdf2_sha256$1500$')
+
+
+def test_benchmark_password_hashing_reports_each_work_factor():
+    out = StringIO()
+    call_command('benchmark_password_hashing', '--iterations', '1000', '2000', '--logins', '8', '--workers', '2',
+                 stdout=out)
+
+    output = out.getvalue()
+    assert 'iterations=1000:' in output and 'iterations=2000:' in output
+    assert 'logins/s' in output
@@ -0,0 +1,331 @@
+import json
+import threading
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.test import Client
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from accounts.models import Cart, CartItem
+from accounts.carts import (get_open_cart, add_cart_item, insert_cart_lines, move_wishlist_to_cart, get_cart_snapshot,
+                           invalidate_cart_snapshot)
+from products.models import Category, SizeVariant, Product, Coupon, Inventory, Wishlist
+
+# Fixtures
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='testuser', password='password')
+
+@pytest.fixture
+def size_variant():
+    return SizeVariant.objects.create(size_name="M", price=10)
+
+@pytest.fixture
+def product(size_variant):
+    category = Category.objects.create(category_name="Shoes")
+    product = Product.objects.create(
+        product_name="Runner", price=100, product_desription="Running shoe", category=category)
+    product.size_variant.add(size_variant)
+    return product
+
+def run_concurrently(target, workers):
+    """Starts all workers at the same time and retries SQLite's 'database is locked' errors."""
+    barrier = threading.Barrier(workers)
+    errors = []
+
+    def worker():
+        try:
+            barrier.wait()
+            for attempt in range(50):
+                try:
+                    target()
+                    return
+                except Exception as e:
+                    if connection.vendor != 'sqlite' or 'locked' not in str(e):
+                        errors.append(e)
+                        return
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+# Test Cases
+
+# 1. One open cart per user
+@pytest.mark.django_db
+def test_get_open_cart_reuses_cart(user):
+    cart = get_open_cart(user)
+    assert get_open_cart(user) == cart
+    assert Cart.objects.filter(user=user, is_paid=False).count() == 1
+
+@pytest.mark.django_db
+def test_paid_cart_releases_open_slot(user):
+    cart = get_open_cart(user)
+    cart.is_paid = True
+    cart.save()
+    assert get_open_cart(user, create=False) is None
+    assert get_open_cart(user) != cart
+
+# 2. Cart lines are merged on their line key
+@pytest.mark.django_db
+def test_add_cart_item_increments_existing_line(user, product, size_variant):
+    cart = get_open_cart(user)
+    add_cart_item(cart, product, size_variant)
+    cart_item = add_cart_item(cart, product, size_variant, quantity=2)
+    assert cart_item.quantity == 3
+    assert CartItem.objects.filter(cart=cart).count() == 1
+
+# 3. Multi-threaded harness: no lost updates, no duplicate carts
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_add_to_cart_has_no_lost_updates(user, product, size_variant):
+    workers = 15
+    errors = run_concurrently(lambda: add_cart_item(get_open_cart(user), product, size_variant), workers)
+
+    assert errors == []
+    assert Cart.objects.filter(user=user, is_paid=False).count() == 1
+    assert CartItem.objects.filter(cart__user=user).count() == 1
+    assert CartItem.objects.get(cart__user=user).quantity == workers
+
+# 4. Idempotency key on update_cart_item
+@pytest.mark.django_db
+def test_update_cart_item_replays_idempotent_requests(user, product, size_variant):
+    cache.clear()
+    client = Client()
+    client.login(username='testuser', password='password')
+    cart_item = add_cart_item(get_open_cart(user), product, size_variant)
+
+    url = reverse('update_cart_item')
+    body = json.dumps({'cart_item_id': str(cart_item.uid), 'quantity': 3})
+    first = client.post(url, body, content_type="application/json", HTTP_IDEMPOTENCY_KEY='abc')
+    assert first.json() == {"success": True}
+
+    CartItem.objects.filter(pk=cart_item.pk).update(quantity=1)
+    replay = client.post(url, body, content_type="application/json", HTTP_IDEMPOTENCY_KEY='abc')
+    assert replay.json() == {"success": True}
+    assert replay['Idempotent-Replayed'] == 'true'
+    cart_item.refresh_from_db()
+    assert cart_item.quantity == 1
+
+# 5. Batch cart update
+@pytest.mark.django_db
+def test_batch_update_cart(user, product, size_variant):
+    client = Client()
+    client.login(username='testuser', password='password')
+    cart = get_open_cart(user)
+    first = add_cart_item(cart, product, size_variant)
+    second = add_cart_item(cart, product)
+    coupon = Coupon.objects.create(coupon_code="SALE", discount_amount=50, minimum_amount=300)
+
+    response = client.post(reverse('batch_update_cart'), json.dumps({
+        'items': [
+            {'cart_item_id': str(first.uid), 'quantity': 3},
+            {'cart_item_id': str(second.uid), 'remove': True},
+        ],
+        'coupon': 'SALE',
+    }), content_type="application/json")
+
+    data = response.json()
+    assert data['success'] is True
+    assert data['cart']['items'] == [{'cart_item_id': str(first.uid), 'quantity': 3, 'price': 310}]
+    assert data['cart']['subtotal'] == 310
+    assert data['cart']['discount'] == 50
+    assert data['cart']['grand_total'] == 260
+    assert not CartItem.objects.filter(pk=second.pk).exists()
+    cart.refresh_from_db()
+    assert cart.coupon == coupon
+
+@pytest.mark.django_db
+def test_batch_update_cart_is_all_or_nothing(user, product, size_variant):
+    client = Client()
+    client.login(username='testuser', password='password')
+    cart = get_open_cart(user)
+    cart_item = add_cart_item(cart, product, size_variant)
+
+    response = client.post(reverse('batch_update_cart'), json.dumps({
+        'items': [
+            {'cart_item_id': str(cart_item.uid), 'quantity': 4},
+            {'cart_item_id': str(cart_item.uid), 'quantity': 0},
+        ],
+    }), content_type="application/json")
+
+    assert response.json()['success'] is False
+    cart_item.refresh_from_db()
+    assert cart_item.quantity == 1
+
+# 6. Bulk wishlist to cart move
+def fill_wishlist(user, count):
+    category = Category.objects.create(category_name="Bulk")
+    size_variant = SizeVariant.objects.create(size_name="L", price=5)
+    products = Product.objects.bulk_create([
+        Product(product_name=f"Bulk {i}", slug=f"bulk-{i}", price=10, product_desription="Bulk", category=category)
+        for i in range(count)
+    ])
+    Wishlist.objects.bulk_create([Wishlist(user=user, product=product, size_variant=size_variant) for product in products])
+    return products, size_variant
+
+@pytest.mark.django_db
+def test_move_wishlist_to_cart_merges_lines(user, product, size_variant):
+    cart = get_open_cart(user)
+    add_cart_item(cart, product, size_variant)
+    Wishlist.objects.create(user=user, product=product, size_variant=size_variant)
+    other = Product.objects.create(product_name="Other", price=50, product_desription="Other", category=product.category)
+    kept = Wishlist.objects.create(user=user, product=other)
+    Inventory.objects.create(product=other, quantity=0)
+
+    result = move_wishlist_to_cart(user)
+    assert (result['moved'], result['out_of_stock']) == (1, 1)
+    assert result['cart']['subtotal'] == 210
+    assert CartItem.objects.get(cart=cart).quantity == 2
+    assert list(Wishlist.objects.filter(user=user)) == [kept]
+
+@pytest.mark.django_db
+def test_inserting_lines_increments_a_line_added_meanwhile(user, product, size_variant):
+    cart = get_open_cart(user)
+    other = Product.objects.create(product_name="Other", price=50, product_desription="Other", category=product.category)
+    lines = [CartItem(cart=cart, product=product, size_variant=size_variant, quantity=1),
+             CartItem(cart=cart, product=other, quantity=1)]
+    for line in lines:
+        line.line_key = CartItem.build_line_key(line.product_id, line.size_variant_id)
+    # Another request adds the same line between the read and the insert
+    add_cart_item(cart, product, size_variant, quantity=3)
+
+    insert_cart_lines(cart, lines)
+
+    quantities = dict(CartItem.objects.filter(cart=cart).values_list('product__product_name', 'quantity'))
+    assert quantities == {"Runner": 4, "Other": 1}
+
+@pytest.mark.django_db
+def test_move_selected_wishlist_items_view(user):
+    client = Client()
+    client.login(username='testuser', password='password')
+    fill_wishlist(user, 3)
+    selected = [str(pk) for pk in Wishlist.objects.values_list('pk', flat=True)[:2]]
+
+    response = client.post(reverse('move_wishlist_items_to_cart'), json.dumps({'items': selected}),
+                           content_type="application/json")
+    data = response.json()
+    assert data['moved'] == 2
+    assert data['cart']['subtotal'] == 30
+    assert Wishlist.objects.filter(user=user).count() == 1
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('body', [{'items': ["nope"]}, {'items': "abc"}, {'items': [{'id': 1}]}, ["items"]])
+def test_move_wishlist_items_view_rejects_bad_ids(user, body):
+    client = Client()
+    client.login(username='testuser', password='password')
+    fill_wishlist(user, 1)
+
+    response = client.post(reverse('move_wishlist_items_to_cart'), json.dumps(body), content_type="application/json")
+    assert response.status_code == 400
+    assert response.json() == {"success": False, "error": "Invalid request body."}
+    assert Wishlist.objects.filter(user=user).count() == 1
+
+# Benchmark: moving a 200 item wishlist is a fixed number of statements
+@pytest.mark.django_db
+def test_move_200_item_wishlist_benchmark(user):
+    fill_wishlist(user, 200)
+    add_cart_item(get_open_cart(user), Product.objects.get(slug="bulk-0"), SizeVariant.objects.get(size_name="L"))
+
+    with CaptureQueriesContext(connection) as queries:
+        result = move_wishlist_to_cart(user)
+
+    assert result['moved'] == 200
+    assert len(result['cart']['items']) == 200
+    assert CartItem.objects.get(cart__user=user, product__slug="bulk-0").quantity == 2
+    assert len(queries) < 20
+
+# 7. Cart page snapshot
+class FakeRazorpay:
+    def __init__(self, auth):
+        self.order = self
+
+    def create(self, data):
+        return {'id': 'order_fake', 'amount': data['amount']}
+
+def cart_page_queries(client, user):
+    # Warms the other per-request caches, then drops the snapshot so the measured page rebuilds it
+    client.get(reverse('cart'))
+    invalidate_cart_snapshot(user.pk)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('cart'))
+    assert response.status_code == 200
+    assert any('accounts_cartitem' in query['sql'] for query in queries.captured_queries)
+    return len(queries), response
+
+@pytest.mark.django_db
+def test_cart_page_query_count_is_constant(monkeypatch, user):
+    monkeypatch.setattr('accounts.views.razorpay.Client', FakeRazorpay)
+    client = Client()
+    client.login(username='testuser', password='password')
+    products, size_variant = fill_wishlist(user, 12)
+    cart = get_open_cart(user)
+
+    for product in products[:3]:
+        add_cart_item(cart, product, size_variant)
+    cache.clear()
+    few, response = cart_page_queries(client, user)
+    assert len(response.context['snapshot']['lines']) == 3
+
+    for product in products[3:]:
+        add_cart_item(cart, product, size_variant)
+    cache.clear()
+    many, response = cart_page_queries(client, user)
+    assert len(response.context['snapshot']['lines']) == 12
+    assert response.context['snapshot']['subtotal'] == 12 * 15
+    assert many == few
+
+@pytest.mark.django_db
+def test_cart_snapshot_is_cached_until_the_cart_changes(user, product, size_variant):
+    cart = get_open_cart(user)
+    add_cart_item(cart, product, size_variant)
+    assert get_cart_snapshot(cart)['subtotal'] == 110
+    with CaptureQueriesContext(connection) as queries:
+        get_cart_snapshot(cart)
+    assert len(queries) == 0
+
+    add_cart_item(cart, product, size_variant)
+    assert get_cart_snapshot(cart)['lines'][0]['quantity'] == 2
+
+    # Catalog price changes show up as well
+    product.price = 200
+    product.save()
+    assert get_cart_snapshot(cart)['subtotal'] == 410
+
+@pytest.mark.django_db
+def test_cart_snapshot_is_dropped_after_the_line_is_written(monkeypatch, user, product, size_variant):
+    cart = get_open_cart(user)
+    seen = []
+    # A page rendered at the moment of invalidation must already see the new quantity
+    monkeypatch.setattr('accounts.carts.invalidate_cart_snapshot',
+                        lambda user_id: seen.append(list(CartItem.objects.values_list('quantity', flat=True))))
+    add_cart_item(cart, product, size_variant)
+    add_cart_item(cart, product, size_variant)
+    assert seen == [[1], [2]]
+
+@pytest.mark.django_db
+def test_cart_snapshot_follows_coupon_changes(monkeypatch, user, product, size_variant):
+    monkeypatch.setattr('accounts.views.razorpay.Client', FakeRazorpay)
+    coupon = Coupon.objects.create(coupon_code="TEN", discount_amount=10, minimum_amount=50)
+    cart = get_open_cart(user)
+    add_cart_item(cart, product, size_variant)
+    cart.coupon = coupon
+    cart.save()
+    assert get_cart_snapshot(cart)['grand_total'] == 100
+
+    coupon.discount_amount = 60
+    coupon.save()
+    assert get_cart_snapshot(Cart.objects.get(pk=cart.pk))['grand_total'] == 50
+
+    client = Client()
+    client.login(username='testuser', password='password')
+    coupon.delete()
+    response = client.get(reverse('cart'))
+    assert response.context['snapshot']['grand_total'] == 110
+    assert response.context['payment']['amount'] == 11000
@@ -0,0 +1,98 @@
+import os
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from django.contrib.auth.models import User
+from accounts.models import Cart, CartItem, Profile
+from accounts.carts import add_cart_item
+from products.models import Category, Product
+
+
+def age(queryset, days, field='created_at'):
+    queryset.update(**{field: timezone.now() - timedelta(days=days)})
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    (tmp_path / 'profile').mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def stale_data():
+    buyer = User.objects.create_user(username='buyer', password='password')
+    old_cart = Cart.objects.create(user=buyer)
+    age(Cart.objects.filter(pk=old_cart.pk), 40)
+
+    other = User.objects.create_user(username='other', password='password')
+    fresh_cart = Cart.objects.create(user=other)
+    paid_cart = Cart.objects.create(user=other, is_paid=True)
+    age(Cart.objects.filter(pk=paid_cart.pk), 40)
+
+    unverified = User.objects.create_user(username='unverified', password='password')
+    unverified.profile.email_token = 'token'
+    unverified.profile.save()
+    age(Profile.objects.filter(user=unverified), 10, 'updated_at')
+
+    return old_cart, fresh_cart, paid_cart, unverified
+
+
+@pytest.mark.django_db
+def test_purge_stale_data_dry_run(stale_data):
+    out = StringIO()
+    call_command('purge_stale_data', '--dry-run', stdout=out)
+
+    assert "abandoned carts: 1 rows would be deleted" in out.getvalue()
+    assert "unverified accounts: 1 rows would be deleted" in out.getvalue()
+    assert Cart.objects.count() == 3
+    assert User.objects.filter(username='unverified').exists()
+
+
+@pytest.mark.django_db
+def test_purge_stale_data(stale_data):
+    old_cart, fresh_cart, paid_cart, unverified = stale_data
+    call_command('purge_stale_data', '--sleep', '0', stdout=StringIO())
+
+    assert set(Cart.objects.values_list('pk', flat=True)) == {fresh_cart.pk, paid_cart.pk}
+    assert not User.objects.filter(pk=unverified.pk).exists()
+    assert User.objects.filter(username='buyer').exists()
+
+
+@pytest.mark.django_db
+def test_purge_keeps_old_carts_with_recent_lines():
+    buyer = User.objects.create_user(username='buyer', password='password')
+    category = Category.objects.create(category_name="Shoes")
+    product = Product.objects.create(product_name="Runner", price=100, product_desription="", category=category)
+    cart = Cart.objects.create(user=buyer)
+    add_cart_item(cart, product)
+    age(Cart.objects.filter(pk=cart.pk), 40)
+    age(CartItem.objects.filter(cart=cart), 40)
+
+    # Incrementing the line is the only write a cart in use gets
+    add_cart_item(cart, product)
+    call_command('purge_stale_data', '--sleep', '0', stdout=StringIO())
+    assert Cart.objects.filter(pk=cart.pk).exists()
+
+    age(CartItem.objects.filter(cart=cart), 40)
+    call_command('purge_stale_data', '--sleep', '0', stdout=StringIO())
+    assert not Cart.objects.filter(pk=cart.pk).exists()
+
+
+@pytest.mark.django_db
+def test_purge_orphaned_profile_images(media_root):
+    user = User.objects.create_user(username='buyer', password='password')
+    user.profile.profile_image = 'profile/kept.png'
+    user.profile.save()
+    for name in ('kept.png', 'orphan.png', 'recent.png'):
+        (media_root / 'profile' / name).write_bytes(b'image')
+    old = (timezone.now() - timedelta(days=2)).timestamp()
+    os.utime(media_root / 'profile' / 'kept.png', (old, old))
+    os.utime(media_root / 'profile' / 'orphan.png', (old, old))
+
+    call_command('purge_stale_data', '--sleep', '0', stdout=StringIO())
+
+    assert sorted(os.listdir(media_root / 'profile')) == ['kept.png', 'recent.png']
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from django.urls import reverse
+from django.test import Client
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from accounts.models import Order
+from accounts.views import create_order
+from accounts.carts import get_open_cart, add_cart_item
+from products.models import Category, ColorVariant, SizeVariant, Product
+
+# Fixtures
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='testuser', password='password')
+
+@pytest.fixture
+def category():
+    return Category.objects.create(category_name="Shoes")
+
+def make_product(category, name, price=100):
+    product = Product.objects.create(product_name=name, price=price, product_desription=name, category=category)
+    product.color_variant.add(ColorVariant.objects.create(color_name="Red", price=0))
+    return product
+
+def place_order(user, category, lines, order_id):
+    cart = get_open_cart(user)
+    size_variant = SizeVariant.objects.create(size_name=f"S-{order_id}", price=10)
+    for i in range(lines):
+        add_cart_item(cart, make_product(category, f"Product {order_id} {i}"), size_variant, quantity=2)
+    cart.razorpay_order_id = order_id
+    cart.is_paid = True
+    cart.save()
+    return create_order(cart)
+
+# Test Cases
+
+# 1. Order lines are snapshotted at order time
+@pytest.mark.django_db
+def test_order_items_are_snapshotted(user, category):
+    order = place_order(user, category, 1, 'order_1')
+    item = order.order_items.get()
+    assert (item.product_name, item.size_name, item.color_name) == ("Product order_1 0", "S-order_1", "Red")
+    assert item.product_price == 210
+    assert order.order_total_price == 210
+
+    # Later catalog changes do not rewrite the order
+    Product.objects.filter(pk=item.product_id).update(product_name="Renamed", price=999)
+    item.refresh_from_db()
+    assert item.product_name == "Product order_1 0"
+    assert item.get_total_price() == 210
+
+# 2. Order details render in a constant number of queries
+@pytest.mark.django_db
+def test_order_details_query_count_is_constant(user, category):
+    place_order(user, category, 1, 'order_small')
+    place_order(user, category, 8, 'order_large')
+    client = Client()
+    client.login(username='testuser', password='password')
+
+    counts = []
+    for order_id in ('order_small', 'order_large'):
+        client.get(reverse('order_details', args=[order_id]))
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('order_details', args=[order_id]))
+        assert response.status_code == 200
+        counts.append(len(queries))
+
+    assert counts[0] == counts[1]
+    assert "Product order_large 7" in response.content.decode()
+
+# 3. Lifetime aggregates are maintained on order creation
+@pytest.mark.django_db
+def test_profile_order_stats(user, category):
+    first = place_order(user, category, 1, 'order_1')
+    second = place_order(user, category, 2, 'order_2')
+    user.profile.refresh_from_db()
+    assert user.profile.order_count == 2
+    assert user.profile.total_spent == first.grand_total + second.grand_total
+    assert user.profile.last_order_date == second.order_date
+
+# 4. Order history keyset pagination and filters
+@pytest.mark.django_db
+def test_order_history_keyset_pagination(user):
+    now = timezone.now()
+    for i in range(25):
+        order = Order.objects.create(user=user, order_id=f'order_{i}', payment_status="Paid",
+                                     payment_mode="Razorpay", order_total_price=100, grand_total=100)
+        Order.objects.filter(pk=order.pk).update(order_date=now - timedelta(days=i))
+    client = Client()
+    client.login(username='testuser', password='password')
+
+    response = client.get(reverse('order_history'))
+    first_page = [order.order_id for order in response.context['orders']]
+    assert first_page == [f'order_{i}' for i in range(20)]
+    assert response.context['next_cursor']
+
+    response = client.get(reverse('order_history'), {'cursor': response.context['next_cursor']})
+    assert [order.order_id for order in response.context['orders']] == [f'order_{i}' for i in range(20, 25)]
+    assert response.context['next_cursor'] is None
+
+    date_from = (now - timedelta(days=3)).date().isoformat()
+    date_to = (now - timedelta(days=1)).date().isoformat()
+    response = client.get(reverse('order_history'), {'from': date_from, 'to': date_to})
+    assert [order.order_id for order in response.context['orders']] == ['order_1', 'order_2', 'order_3']
+
+    # An impossible date is ignored rather than failing the page
+    response = client.get(reverse('order_history'), {'from': '2024-02-30', 'to': date_to})
+    assert response.status_code == 200
+    assert response.context['date_from'] is None
+    assert [order.order_id for order in response.context['orders']][:2] == ['order_1', 'order_2']
@@ -0,0 +1,82 @@
+import csv
+import io
+
+import pytest
+from django.urls import reverse
+from django.test import Client
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from accounts.views import create_order
+from accounts.carts import get_open_cart, add_cart_item
+from products.models import Category, SizeVariant, Product, Coupon
+
+# Fixtures
+@pytest.fixture
+def orders():
+    user = User.objects.create_user(username='buyer', password='password')
+    category = Category.objects.create(category_name="Shoes")
+    size_variant = SizeVariant.objects.create(size_name="M", price=10)
+    runner = Product.objects.create(product_name="Runner", price=100, product_desription="Runner", category=category)
+    boot = Product.objects.create(product_name="Boot", price=300, product_desription="Boot", category=category)
+    coupon = Coupon.objects.create(coupon_code="SALE", discount_amount=50, minimum_amount=0)
+
+    for order_id, lines, with_coupon in (('order_1', [(runner, 2)], False), ('order_2', [(runner, 1), (boot, 1)], True)):
+        cart = get_open_cart(user)
+        for product, quantity in lines:
+            add_cart_item(cart, product, size_variant, quantity=quantity)
+        cart.coupon = coupon if with_coupon else None
+        cart.razorpay_order_id = order_id
+        cart.is_paid = True
+        cart.save()
+        create_order(cart)
+
+def read_csv(content):
+    return list(csv.reader(io.StringIO(content)))
+
+# Test Cases
+
+# 1. Reports are only for staff
+@pytest.mark.django_db
+def test_sales_report_requires_staff(orders):
+    client = Client()
+    client.login(username='buyer', password='password')
+    response = client.get(reverse('sales_report', args=['orders']))
+    assert response.status_code == 302
+
+# 2. Order lines are streamed as CSV
+@pytest.mark.django_db
+def test_orders_report_streams_order_lines(orders):
+    User.objects.create_user(username='finance', password='password', is_staff=True)
+    client = Client()
+    client.login(username='finance', password='password')
+
+    response = client.get(reverse('sales_report', args=['orders']))
+    assert response.streaming
+    rows = read_csv(b''.join(response.streaming_content).decode())
+    assert rows[0][:2] == ['order_id', 'order_date']
+    assert sorted((row[0], row[8], row[11]) for row in rows[1:]) == [
+        ('order_1', 'Runner', '2'), ('order_2', 'Boot', '1'), ('order_2', 'Runner', '1')]
+
+    assert client.get(reverse('sales_report', args=['unknown'])).status_code == 404
+
+    # An impossible date is ignored like a missing one
+    response = client.get(reverse('sales_report', args=['orders']), {'from': '2024-02-30'})
+    assert response.status_code == 200
+    assert len(read_csv(b''.join(response.streaming_content).decode())) == 4
+
+# 3. Summaries are aggregated in the database
+@pytest.mark.django_db
+def test_summary_reports(orders):
+    out = io.StringIO()
+    call_command('export_sales_report', 'daily-revenue', stdout=out)
+    rows = read_csv(out.getvalue())
+    assert rows[0] == ['day', 'orders', 'subtotal', 'discount', 'revenue']
+    assert rows[1][1:] == ['2', '630', '50', '580']
+
+    out = io.StringIO()
+    call_command('export_sales_report', 'coupons', stdout=out)
+    assert read_csv(out.getvalue())[1:] == [['SALE', '1', '50', '370']]
+
+    out = io.StringIO()
+    call_command('export_sales_report', 'top-products', stdout=out)
+    assert read_csv(out.getvalue())[1:] == [['Runner', '3', '2', '320'], ['Boot', '1', '1', '310']]
@@ -36,6 +36,7 @@ urlpatterns = [
     path('cart/', cart, name="cart"),
     path('add-to-cart/<uid>/', add_to_cart, name="add_to_cart"),
     path('update_cart_item/', update_cart_item, name='update_cart_item'),
+    path('update-cart/', batch_update_cart, name='batch_update_cart'),
     path('remove-cart/<uid>/', remove_cart, name="remove_cart"),
     path('remove-coupon/<cart_id>/', remove_coupon, name="remove_coupon"),
     
@@ -47,6 +48,9 @@ urlpatterns = [
     path('order-details/<str:order_id>/', order_details, name='order_details'),
     path('order-details/<str:order_id>/download/', download_invoice, name='download_invoice'),
 
+    #Finance reports for staff users
+    path('reports/<str:report>/', sales_report, name='sales_report'),
+
     #Delete user account url
     path('delete-account/', delete_account, name='delete_account'),
 ]
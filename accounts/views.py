@@ -1,5 +1,6 @@
 import os, json
 import uuid
+import logging
 import razorpay
 import os
 
@@ -14,6 +15,14 @@ from django.contrib.auth.models import User
 from django.template.loader import get_template
 from accounts.models import Profile, Cart, CartItem, Order, OrderItem
 from base.emails import send_account_activation_email
+from base.idempotency import idempotent_json
+from base.ratelimit import rate_limit
+from accounts.carts import (CartUpdateError, get_open_cart, add_cart_item, set_cart_item_quantity,
+                           apply_coupon, apply_cart_changes, get_cart_summary, get_cart_snapshot,
+                           invalidate_cart_snapshot)
+from products.inventory import OutOfStock, reserve_cart, commit_cart, get_available_quantity
+from products.coupons import redeem_coupon
+from products.variants import get_size_variant
 from django.views.decorators.http import require_POST
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.decorators import login_required
@@ -21,30 +30,35 @@ from django.http import HttpResponseRedirect, HttpResponse
 from django.contrib.auth import authenticate, login, logout
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.shortcuts import redirect, render, get_object_or_404
+from django.utils.dateparse import parse_date
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.http import StreamingHttpResponse, Http404
+from django.contrib.admin.views.decorators import staff_member_required
+from base.pagination import paginate_keyset
+from accounts.reports import REPORTS, filter_by_date_range, stream_csv
 from accounts.forms import UserUpdateForm, UserProfileForm, ShippingAddressForm, CustomPasswordChangeForm
 
 
+logger = logging.getLogger(__name__)
+
 # Create your views here.
 
 
+@rate_limit('login', key='ip', methods=['POST'])
 def login_page(request):
     next_url = request.GET.get('next')  # Default to 'index' if 'next' is not provided
     if request.method == 'POST':
         username = request.POST.get('username')
         password = request.POST.get('password')
-        user_obj = User.objects.filter(username=username)
-
-        if not user_obj.exists():
-            messages.warning(request, 'Account not found!')
-            return HttpResponseRedirect(request.path_info)
-
-        if not user_obj[0].profile.is_email_verified:
-            messages.error(request, 'Account not verified!')
-            return HttpResponseRedirect(request.path_info)
-
-        # then authenticate user
-        user_obj = authenticate(username=username, password=password)
+        # One query: the auth backend loads the profile together with the user
+        user_obj = authenticate(request, username=username, password=password)
         if user_obj:
+            profile = getattr(user_obj, 'profile', None)
+            if profile is None or not profile.is_email_verified:
+                messages.error(request, 'Account not verified!')
+                return HttpResponseRedirect(request.path_info)
+
             login(request, user_obj)
             messages.success(request, 'Login Successfull.')
             
@@ -59,6 +73,7 @@ def login_page(request):
 
     return render(request, 'accounts/login.html')
 
+@rate_limit('register', key='ip', methods=['POST'])
 def register_page(request):
     if request.method == 'POST':
         username = request.POST.get('username')
@@ -67,27 +82,30 @@ def register_page(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
 
-        # Check if username already exists
-        if User.objects.filter(username=username).exists():
+        # One query for both uniqueness checks
+        taken = list(User.objects.filter(Q(username=username) | Q(email=email)).values_list('username', flat=True)[:2])
+        if username in taken:
             messages.info(request, 'Username already exists!')
             return HttpResponseRedirect(request.path_info)
-
-        # Check if email already exists
-        if User.objects.filter(email=email).exists():
+        if taken:
             messages.info(request, 'Email already exists!')
             return HttpResponseRedirect(request.path_info)
 
-        # Create user if not registered
-        user_obj = User.objects.create(
-            username=username, first_name=first_name, last_name=last_name, email=email)
+        # Create user if not registered: the password is hashed before the INSERT and the
+        # profile is created by the post_save signal with its token, one INSERT per table
+        email_token = str(uuid.uuid4())
+        user_obj = User(username=username, first_name=first_name, last_name=last_name, email=email)
         user_obj.set_password(password)
-        user_obj.save()
-
-        profile = Profile.objects.get(user=user_obj)
-        profile.email_token = str(uuid.uuid4())
-        profile.save()
+        user_obj._profile_defaults = {'email_token': email_token}
+        try:
+            with transaction.atomic():
+                user_obj.save(force_insert=True)
+        except IntegrityError:
+            # Lost a race with a concurrent registration of the same username
+            messages.info(request, 'Username already exists!')
+            return HttpResponseRedirect(request.path_info)
 
-        send_account_activation_email(email, profile.email_token)
+        transaction.on_commit(lambda: send_account_activation_email(email, email_token))
         messages.success(request, "An email has been sent to your mail.")
         return HttpResponseRedirect(request.path_info)
 
@@ -124,108 +142,130 @@ def add_to_cart(request, uid):
             return redirect(request.META.get('HTTP_REFERER'))
         
         product = get_object_or_404(Product, uid=uid)
+        size_variant = get_size_variant(variant, product=product)
+        if size_variant is None:
+            messages.error(request, 'This product does not come in the selected size.')
+            return redirect(request.META.get('HTTP_REFERER'))
 
-        cart, _ = Cart.objects.get_or_create(user=request.user, is_paid=False)
-        size_variant = get_object_or_404(SizeVariant, size_name=variant)
+        available = get_available_quantity(product, size_variant)
+        if available is not None and available < 1:
+            messages.error(request, 'Sorry, this size is out of stock.')
+            return redirect(request.META.get('HTTP_REFERER'))
 
-        # Check if the cart item already exists in the cart
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product, size_variant=size_variant)
-        
-        if not created:
-            cart_item.quantity += 1
-            cart_item.save()
+        # Creates the cart line or atomically increments an existing one
+        cart = get_open_cart(request.user)
+        add_cart_item(cart, product, size_variant)
 
         messages.success(request, 'Item added to cart successfully.')
 
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Error adding product %s to cart", uid)
         messages.error(request, 'Error adding item to cart.')
 
     return redirect(reverse('cart'))
 
 
 @login_required
+@rate_limit('checkout', key='user')
 def cart(request):
     cart_obj = None
     payment = None
     user = request.user
 
-    try:
-        cart_obj = Cart.objects.get(is_paid=False, user=user)
-
-    except Exception as e:
-        print(e)
+    cart_obj = get_open_cart(user, create=False)
+    if cart_obj is None:
         messages.warning(request, "Your cart is empty. Please sign in or add a product to cart.")
         return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
     if request.method == 'POST':
-        coupon = request.POST.get('coupon')
-        coupon_obj = Coupon.objects.filter(coupon_code__exact=coupon).first()
-
-        if not coupon_obj:
-            messages.warning(request, 'Invalid coupon code.')
-            return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
-
-        if cart_obj and cart_obj.coupon:
-            messages.warning(request, 'Coupon already exists.')
-            return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
-
-        if coupon_obj and coupon_obj.is_expired:
-            messages.warning(request, 'Coupon code expired.')
-            return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
-
-        if cart_obj and coupon_obj and cart_obj.get_cart_total() < coupon_obj.minimum_amount:
-            messages.warning(
-                request, f'Amount should be greater than {coupon_obj.minimum_amount}')
-            return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
-
-        if cart_obj and coupon_obj:
-            cart_obj.coupon = coupon_obj
-            cart_obj.save()
+        try:
+            apply_coupon(cart_obj, request.POST.get('coupon'))
+        except CartUpdateError as e:
+            messages.warning(request, str(e))
+        else:
             messages.success(request, 'Coupon applied successfully.')
-            return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+        return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
+    snapshot = None
     if cart_obj:
-        
-        cart_total_in_paise = int(cart_obj.get_cart_total_price_after_coupon() * 100)
+        # The coupon may have run out of its validity window since it was applied
+        if cart_obj.coupon and not cart_obj.coupon.is_active():
+            cart_obj.coupon = None
+            cart_obj.save(update_fields=['coupon'])
+            messages.warning(request, 'Coupon code expired.')
+
+        # Lines and totals come from one prefetched snapshot, cached until the cart changes
+        snapshot = get_cart_snapshot(cart_obj)
+        # The amount charged is computed from the live rows, the same way create_order records it
+        cart_total_in_paise = int(get_cart_summary(cart_obj)['grand_total'] * 100)
         
         if cart_total_in_paise < 100:
             messages.warning(
                 request, 'Total amount in cart is less than the minimum required amount (1.00 INR). Please add a product to the cart.')
             return redirect('index')
         
-        client = razorpay.Client(auth = (settings.RAZORPAY_KEY_ID, settings.RAZORPAY_SECRET_KEY))
-        payment = client.order.create(
-            {'amount': cart_total_in_paise, 'currency': 'INR', 'payment_capture': 1})
-        cart_obj.razorpay_order_id = payment['id']
-        cart_obj.save()
-
-    context = {'cart': cart_obj, 'payment': payment, 'quantity_range': range(1, 6),}
+        # Hold the stock for this cart while the customer is paying.
+        try:
+            reserve_cart(cart_obj)
+        except OutOfStock as e:
+            messages.warning(request, str(e))
+        else:
+            client = razorpay.Client(auth = (settings.RAZORPAY_KEY_ID, settings.RAZORPAY_SECRET_KEY))
+            payment = client.order.create(
+                {'amount': cart_total_in_paise, 'currency': 'INR', 'payment_capture': 1})
+            # A plain UPDATE, the order id does not change what the cached snapshot shows
+            cart_obj.razorpay_order_id = payment['id']
+            Cart.objects.filter(pk=cart_obj.pk).update(razorpay_order_id=payment['id'])
+
+    context = {'cart': cart_obj, 'snapshot': snapshot, 'payment': payment, 'quantity_range': range(1, 6),}
     return render(request, 'accounts/cart.html', context)
 
 
 
 @require_POST
 @login_required
+@idempotent_json
 def update_cart_item(request):
     try:
         data = json.loads(request.body)
         cart_item_id = data.get("cart_item_id")
         quantity = int(data.get("quantity"))
 
+        if quantity < 1:
+            return JsonResponse({"success": False, "error": "Quantity must be at least 1."})
+
         cart_item = CartItem.objects.get(uid=cart_item_id, cart__user=request.user, cart__is_paid=False)
-        cart_item.quantity = quantity
-        cart_item.save()
+
+        available = get_available_quantity(cart_item.product, cart_item.size_variant, cart_item.color_variant)
+        if available is not None and quantity > available:
+            return JsonResponse({"success": False, "error": f"Only {available} left in stock."})
+
+        set_cart_item_quantity(request.user, cart_item_id, quantity)
 
         return JsonResponse({"success": True})
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)})
 
 
+@require_POST
+@login_required
+@idempotent_json
+def batch_update_cart(request):
+    try:
+        data = json.loads(request.body)
+        summary = apply_cart_changes(request.user, data.get("items", []), data.get("coupon"))
+        return JsonResponse({"success": True, "cart": summary})
+    except CartUpdateError as e:
+        return JsonResponse({"success": False, "error": str(e)})
+    except (ValueError, AttributeError):
+        return JsonResponse({"success": False, "error": "Invalid request body."}, status=400)
+
+
 def remove_cart(request, uid):
     try:
-        cart_item = get_object_or_404(CartItem, uid=uid)
+        cart_item = get_object_or_404(CartItem.objects.select_related('cart'), uid=uid)
         cart_item.delete()
+        invalidate_cart_snapshot(cart_item.cart.user_id)
         messages.success(request, 'Item removed from cart.')
 
     except Exception as e:
@@ -250,9 +290,12 @@ def success(request):
     # cart = Cart.objects.get(razorpay_order_id = order_id)
     cart = get_object_or_404(Cart, razorpay_order_id = order_id)
 
-    # Mark the cart as paid
-    cart.is_paid = True
-    cart.save()
+    # Mark the cart as paid, only the first request for this order commits the stock
+    if Cart.objects.filter(pk=cart.pk, is_paid=False).update(is_paid=True, open_cart_owner=None):
+        cart.is_paid = True
+        commit_cart(cart)
+        if cart.coupon and not redeem_coupon(cart.coupon, cart.user):
+            logger.warning("Coupon %s redeemed past its usage limit on order %s", cart.coupon, order_id)
 
     # Create the order after payment is confirmed
     order = create_order(cart)
@@ -288,8 +331,10 @@ def render_to_pdf(template_src, context_dict={}):
 
 
 
+@rate_limit('invoice', key='user')
 def download_invoice(request, order_id):
-    order = get_object_or_404(Order, order_id=order_id)
+    order = get_object_or_404(
+        Order.objects.select_related('user').prefetch_related('order_items'), order_id=order_id)
     order_items = order.order_items.all()
 
     context = {
@@ -370,36 +415,78 @@ def update_shipping_address(request):
     return render(request, 'accounts/shipping_address_form.html', {'form': form})
 
 
+# A ?from=/?to= date filter, None when missing or not a real date such as 2024-02-30
+def get_date_param(request, name):
+    try:
+        return parse_date(request.GET.get(name) or '')
+    except ValueError:
+        return None
+
+
 # Order history view
 @login_required
 def order_history(request):
-    orders = Order.objects.filter(user=request.user).order_by('-order_date')
-    return render(request, 'accounts/order_history.html', {'orders': orders})
+    orders = Order.objects.filter(user=request.user).only(
+        'uid', 'order_id', 'order_date', 'payment_status', 'grand_total', 'payment_mode')
+
+    date_from = get_date_param(request, 'from')
+    date_to = get_date_param(request, 'to')
+    status = request.GET.get('status')
+
+    orders = filter_by_date_range(orders, 'order_date', date_from, date_to)
+    if status:
+        orders = orders.filter(payment_status=status)
+
+    orders, next_cursor = paginate_keyset(
+        orders, ('-order_date', '-uid'), request.GET.get('cursor'), per_page=20)
+
+    filters = request.GET.copy()
+    filters.pop('cursor', None)
+
+    context = {
+        'orders': orders,
+        'next_cursor': next_cursor,
+        'filters': filters.urlencode(),
+        'date_from': date_from,
+        'date_to': date_to,
+        'selected_status': status,
+        'profile': request.user.profile,
+    }
+    return render(request, 'accounts/order_history.html', context)
 
 
 # Create an order view
 def create_order(cart):
+    cart_items = list(
+        cart.cart_items.filter(product__isnull=False)
+        .select_related('product', 'size_variant', 'color_variant')
+        .prefetch_related('product__color_variant')
+    )
+    summary = get_cart_summary(cart, cart_items)
+
     order, created = Order.objects.get_or_create(
-        user=cart.user,
         order_id=cart.razorpay_order_id,
-        payment_status="Paid",
-        shipping_address=cart.user.profile.shipping_address,
-        payment_mode="Razorpay",
-        order_total_price=cart.get_cart_total(),
-        coupon=cart.coupon,
-        grand_total=cart.get_cart_total_price_after_coupon(),
+        defaults={
+            'user': cart.user,
+            'payment_status': "Paid",
+            'shipping_address': cart.user.profile.shipping_address,
+            'payment_mode': "Razorpay",
+            'order_total_price': summary['subtotal'],
+            'coupon': cart.coupon,
+            'coupon_discount': summary['discount'],
+            'grand_total': summary['grand_total'],
+        }
     )
 
-    # Create OrderItem instances for each item in the cart
-    cart_items = CartItem.objects.filter(cart=cart)
-    for cart_item in cart_items:
-        OrderItem.objects.get_or_create(
-            order=order,
-            product=cart_item.product,
-            size_variant=cart_item.size_variant,
-            color_variant=cart_item.color_variant,
-            quantity=cart_item.quantity,
-            product_price=cart_item.get_product_price()
+    # Create OrderItem instances for each item in the cart, with their product details snapshotted
+    if created:
+        OrderItem.objects.bulk_create([OrderItem.from_cart_item(order, cart_item) for cart_item in cart_items])
+
+        # Keep the lifetime aggregates shown on the order history page current
+        Profile.objects.filter(user=cart.user).update(
+            order_count=F('order_count') + 1,
+            total_spent=F('total_spent') + order.grand_total,
+            last_order_date=order.order_date,
         )
 
     return order
@@ -408,13 +495,15 @@ def create_order(cart):
 # Order Details view
 @login_required
 def order_details(request, order_id):
-    order = get_object_or_404(Order, order_id=order_id, user=request.user)
-    order_items = OrderItem.objects.filter(order=order)
+    order = get_object_or_404(
+        Order.objects.select_related('user').prefetch_related('order_items'),
+        order_id=order_id, user=request.user)
+    order_items = order.order_items.all()
     context = {
         'order': order,
         'order_items': order_items,
         'order_total_price': sum(item.get_total_price() for item in order_items),
-        'coupon_discount': order.coupon.discount_amount if order.coupon else 0,
+        'coupon_discount': order.coupon_discount,
         'grand_total': order.get_order_total_price()
     }
     return render(request, 'accounts/order_details.html', context)
@@ -428,4 +517,19 @@ def delete_account(request):
         logout(request)
         user.delete()
         messages.success(request, "Your account has been deleted successfully.")
-        return redirect('index')
\ No newline at end of file
+        return redirect('index')
+
+
+# Finance reports, streamed as CSV so memory stays flat for any date range
+@staff_member_required
+def sales_report(request, report):
+    if report not in REPORTS:
+        raise Http404("Unknown report.")
+
+    header, rows = REPORTS[report]
+    date_from = get_date_param(request, 'from')
+    date_to = get_date_param(request, 'to')
+
+    response = StreamingHttpResponse(stream_csv(header, rows(date_from, date_to)), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{report}.csv"'
+    return response
@@ -0,0 +1,50 @@
+import json
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import JsonResponse
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+IDEMPOTENCY_TTL = 60 * 60 * 24
+PENDING = '__pending__'
+
+
+def idempotent_json(view_func):
+    """
+    Replays the stored JSON response when a request is retried with the same
+    Idempotency-Key header. Requests without the header run as usual.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_func(request, *args, **kwargs)
+
+        cache_key = f"idempotency:{request.user.pk}:{request.path}:{key[:100]}"
+
+        # cache.add is atomic, only the first request with this key runs the view.
+        if not cache.add(cache_key, PENDING, IDEMPOTENCY_TTL):
+            stored = cache.get(cache_key)
+            if stored is None or stored == PENDING:
+                return JsonResponse(
+                    {"success": False, "error": "A request with this idempotency key is in progress."},
+                    status=409)
+            response = JsonResponse(stored['data'], status=stored['status'])
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if isinstance(response, JsonResponse) and response.status_code < 500:
+            cache.set(cache_key, {'data': json.loads(response.content), 'status': response.status_code},
+                      IDEMPOTENCY_TTL)
+        else:
+            cache.delete(cache_key)
+
+        return response
+
+    return _wrapped_view
@@ -0,0 +1,207 @@
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+from base.storage import ENCODINGS
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+ZERO_Q_RE = re.compile(r'(^|;)q=0(\.0*)?$')
+
+
+@dataclass
+class StaticFile:
+    path: str
+    size: int
+    mtime: int
+    content_type: str
+    cache_control: str
+    # encoding -> (path, size) of the precompressed copies
+    variants: dict = field(default_factory=dict)
+
+    def etag(self, encoding=None):
+        size = self.variants[encoding][1] if encoding else self.size
+        return f'"{self.mtime:x}-{size:x}{"-" + encoding if encoding else ""}"'
+
+
+class FileRange:
+    """Reads at most `length` bytes of an open file, from where it is positioned."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = part.strip().partition(';')
+        if ZERO_Q_RE.search(params.replace(' ', '')):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single 'bytes=' range, None to ignore the header and
+    send the whole file, or False when the range is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        # A suffix range, the last `end` bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+class StaticFilesMiddleware:
+    """
+    Serves collected static files from STATIC_ROOT before the rest of the
+    middleware runs. The files are indexed once at startup, so a request
+    costs a dict lookup and an open(). Sends the .br/.gz copy collectstatic
+    wrote when the client accepts it, answers conditional and single range
+    requests, and marks hashed names immutable for a year. The body is a
+    FileResponse, so the WSGI server can hand it to sendfile().
+
+    Not used when STATIC_ROOT is empty, e.g. in development where
+    staticfiles_urlpatterns() serves the app directories instead.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        if not settings.STATIC_ROOT or not self.prefix.startswith('/'):
+            raise MiddlewareNotUsed
+        self.files = self.scan(settings.STATIC_ROOT)
+        if not self.files:
+            raise MiddlewareNotUsed
+        logger.info("Serving %d static files from %s", len(self.files), settings.STATIC_ROOT)
+
+    def immutable_names(self):
+        return set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def scan(self, root):
+        immutable = self.immutable_names()
+        files = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                # Compressed copies are variants of their original, not files of their own
+                if name.endswith(tuple(ENCODINGS.values())) and os.path.exists(os.path.splitext(path)[0]):
+                    continue
+                stat = os.stat(path)
+                content_type, _ = mimetypes.guess_type(filename)
+                max_age = IMMUTABLE_MAX_AGE if name in immutable else settings.STATIC_MAX_AGE
+                files[name] = StaticFile(
+                    path=path, size=stat.st_size, mtime=int(stat.st_mtime),
+                    content_type=content_type or 'application/octet-stream',
+                    cache_control=f'public, max-age={max_age}' + (', immutable' if name in immutable else ''),
+                )
+                for encoding, suffix in ENCODINGS.items():
+                    if os.path.exists(path + suffix):
+                        files[name].variants[encoding] = (path + suffix, os.path.getsize(path + suffix))
+        return files
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            static_file = self.files.get(request.path_info[len(self.prefix):])
+            if static_file is not None:
+                return self.serve(request, static_file)
+        return self.get_response(request)
+
+    def choose_encoding(self, request, static_file):
+        # Byte ranges are always of the uncompressed file
+        if 'Range' in request.headers or not static_file.variants:
+            return None
+        accepted = accepted_encodings(request)
+        for encoding in ENCODINGS:
+            if encoding in static_file.variants and encoding in accepted:
+                return encoding
+        return None
+
+    def not_modified(self, request, static_file, etag):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return since is not None and static_file.mtime <= since
+
+    def serve(self, request, static_file):
+        encoding = self.choose_encoding(request, static_file)
+        etag = static_file.etag(encoding)
+        headers = {
+            'Cache-Control': static_file.cache_control,
+            'ETag': etag,
+            'Last-Modified': http_date(static_file.mtime),
+            'Accept-Ranges': 'bytes',
+        }
+        if static_file.variants:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if self.not_modified(request, static_file, etag):
+            response = HttpResponseNotModified()
+            for header, value in headers.items():
+                response.headers[header] = value
+            return response
+
+        path, size = static_file.variants[encoding] if encoding else (static_file.path, static_file.size)
+        status, length, start = 200, size, 0
+        byte_range = None
+        if 'Range' in request.headers and request.headers.get('If-Range', etag) == etag:
+            byte_range = parse_range(request.headers['Range'], size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            status, length = 206, end - start + 1
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+        if request.method == 'HEAD':
+            response = HttpResponse(status=status)
+        else:
+            file = open(path, 'rb')
+            if start:
+                file.seek(start)
+            body = FileRange(file, length) if status == 206 else file
+            response = FileResponse(body, status=status, content_type=static_file.content_type)
+            response.headers.pop('Content-Disposition', None)
+        response.headers['Content-Type'] = static_file.content_type
+        response.headers['Content-Length'] = length
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        for header, value in headers.items():
+            response.headers[header] = value
+        return response
@@ -0,0 +1,70 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, model, ordering):
+    """Returns the typed cursor values, or None if the cursor is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(ordering):
+            return None
+        return [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        return None
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=20):
+    """
+    Keyset (cursor) pagination: the next page starts right after the last row
+    of the current one, so every page costs the same indexed range scan no
+    matter how deep the user pages. The ordering must be unique, end it with
+    the primary key. Returns (items, next_cursor).
+    """
+    queryset = queryset.order_by(*ordering)
+
+    values = decode_cursor(cursor, queryset.model, ordering) if cursor else None
+    if values:
+        # (a, b) after (x, y)  <=>  a after x OR (a = x AND b after y)
+        after = Q()
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f"{name}__{lookup}": values[i]})
+            for previous, value in zip(ordering[:i], values[:i]):
+                condition &= Q(**{previous.lstrip('-'): value})
+            after |= condition
+        queryset = queryset.filter(after)
+
+    items = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor([getattr(items[-1], field.lstrip('-')) for field in ordering])
+
+    return items, next_cursor
+
+
+class KnownCountPaginator(Paginator):
+    """Paginator for a list whose size is already known (e.g. cached), so it skips the COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        return self._known_count
@@ -0,0 +1,143 @@
+import logging
+import math
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+OUTCOMES = ('allowed', 'limited')
+
+
+def parse_rate(rate):
+    """'20/m' -> (20, 60): at most 20 requests in any 60 seconds."""
+    match = RATE_RE.match(rate.replace(' ', ''))
+    if not match:
+        raise ValueError(f"Invalid rate {rate!r}, expected e.g. '20/m' or '100/5m'.")
+    capacity, count, unit = match.groups()
+    return int(capacity), int(count or 1) * PERIODS[unit]
+
+
+def client_ip(request):
+    # Behind the nginx proxy REMOTE_ADDR is the proxy, RATE_LIMIT_IP_META names the header it sets
+    return request.META.get(settings.RATE_LIMIT_IP_META) or request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def ip_key(request):
+    return f"ip:{client_ip(request)}"
+
+
+def user_key(request):
+    # Anonymous visitors share the limit of their IP
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return ip_key(request)
+
+
+KEYS = {'ip': ip_key, 'user': user_key}
+
+
+def _incr(cache_key, delta, timeout):
+    cache.add(cache_key, 0, timeout)
+    try:
+        return cache.incr(cache_key, delta)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(cache_key, max(delta, 0), timeout)
+        return max(delta, 0)
+
+
+def consume(scope, key, capacity, period, now=None):
+    """
+    Counts one request of (scope, key) against a sliding window and returns
+    (allowed, retry_after_seconds). The estimate is the count of the current
+    fixed window plus the previous window's count, weighted by how much of it
+    still falls within the last `period` seconds. The current count comes
+    from an atomic cache.incr(), so requests sent in parallel each get their
+    own count and at most `capacity` of them pass, across all workers.
+    """
+    now = time.time() if now is None else now
+    window = int(now // period)
+    elapsed = now - window * period
+    cache_key = f"ratelimit:{scope}:{key}"
+
+    count = _incr(f"{cache_key}:{window}", 1, period * 2)
+    previous = cache.get(f"{cache_key}:{window - 1}", 0)
+    if previous * (1 - elapsed / period) + count <= capacity:
+        return True, 0
+
+    # A refused request does not count, so a client that keeps retrying is let back in
+    count = _incr(f"{cache_key}:{window}", -1, period * 2)
+    if previous and count < capacity:
+        # Wait until enough of the previous window has slid out
+        return False, max(0, period * (1 - (capacity - count - 1) / previous) - elapsed)
+    # Wait for the next window, then until enough of this one has slid out
+    return False, period - elapsed + period * (1 - (capacity - 1) / max(count, capacity))
+
+
+def record(scope, outcome):
+    metric_key = f"ratelimit-metrics:{scope}:{outcome}"
+    cache.add(metric_key, 0, None)
+    try:
+        cache.incr(metric_key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(metric_key, 1, None)
+
+
+def get_rate_limit_metrics():
+    """{scope: {'allowed': n, 'limited': n}} for every scope in settings.RATE_LIMITS."""
+    keys = {f"ratelimit-metrics:{scope}:{outcome}": (scope, outcome)
+            for scope in settings.RATE_LIMITS for outcome in OUTCOMES}
+    values = cache.get_many(keys)
+    metrics = {scope: dict.fromkeys(OUTCOMES, 0) for scope in settings.RATE_LIMITS}
+    for metric_key, value in values.items():
+        scope, outcome = keys[metric_key]
+        metrics[scope][outcome] = value
+    return metrics
+
+
+def reset_rate_limit_metrics():
+    cache.delete_many([f"ratelimit-metrics:{scope}:{outcome}"
+                       for scope in settings.RATE_LIMITS for outcome in OUTCOMES])
+
+
+def rate_limit(scope, key='ip', methods=None):
+    """
+    Sliding-window throttling for a view. The rate comes from
+    settings.RATE_LIMITS[scope] when the request is made, so it can be tuned
+    without code changes. `key` is 'ip', 'user' or a callable taking the
+    request; `methods` limits only those HTTP methods (all by default).
+    Throttled requests get a 429 with Retry-After.
+    """
+    key_func = KEYS[key] if isinstance(key, str) else key
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            rate = settings.RATE_LIMITS.get(scope)
+            if not settings.RATE_LIMIT_ENABLED or not rate or (methods and request.method not in methods):
+                return view_func(request, *args, **kwargs)
+
+            capacity, period = parse_rate(rate)
+            allowed, retry_after = consume(scope, key_func(request), capacity, period)
+            record(scope, 'allowed' if allowed else 'limited')
+            if allowed:
+                return view_func(request, *args, **kwargs)
+
+            retry_after = max(1, math.ceil(retry_after))
+            logger.warning("Rate limit %s exceeded by %s, retry in %ss", scope, key_func(request), retry_after)
+            response = HttpResponse("Too many requests, please try again later.", status=429,
+                                    content_type='text/plain')
+            response['Retry-After'] = str(retry_after)
+            return response
+
+        return _wrapped_view
+
+    return decorator
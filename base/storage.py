@@ -0,0 +1,83 @@
+import gzip
+import logging
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip variants are still written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Text formats worth compressing, images and woff fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ttf', '.eot', '.otf')
+# Below this the compressed variant saves less than a packet
+MIN_COMPRESS_SIZE = 512
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=11)
+    # mtime=0 so the same input always gives the same bytes
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes a .br and a .gz copy next to each
+    hashed text file during collectstatic, kept only when smaller than the
+    original. base.middleware.StaticFilesMiddleware and nginx's gzip_static
+    serve them as they are instead of compressing on every request.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            # collectstatic has not run (development, tests): the finders serve the plain names
+            return name
+        return super().stored_name(name)
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            # A url() in a bundled stylesheet that points at a file never shipped, left as written
+            logger.warning("Static file %s is referenced but missing, not hashing it", name)
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name, hashed_name in sorted(self.hashed_files.items()):
+            for encoded_name in self.compress_file(hashed_name):
+                yield name, encoded_name, True
+
+    def encodings(self):
+        return [encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None]
+
+    def compress_file(self, name):
+        """Writes the compressed variants of a stored file, returns the names written."""
+        if not name.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+            return []
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return []
+
+        written = []
+        for encoding in self.encodings():
+            encoded_name = name + ENCODINGS[encoding]
+            compressed = compress(content, encoding)
+            if self.exists(encoded_name):
+                self.delete(encoded_name)
+            if len(compressed) >= len(content):
+                continue
+            self._save(encoded_name, ContentFile(compressed))
+            written.append(encoded_name)
+        logger.debug("Compressed %s as %s", name, ', '.join(written) or 'nothing')
+        return written
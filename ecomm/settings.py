@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -108,6 +108,7 @@ SOCIALACCOUNT_PROVIDERS = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'base.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -130,6 +131,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.request', # Added this line for authentication purpose
+                'products.context_processors.wishlist_count',
             ],
         },
     },
@@ -179,6 +181,22 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing: the first hasher hashes new passwords, the others only verify
+# older hashes. Passwords stored with another hasher or work factor are rehashed
+# on the user's next login, so the policy can be changed at any time.
+PASSWORD_HASHERS = config('PASSWORD_HASHERS', cast=Csv(), default=','.join([
+    'accounts.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]))
+
+# PBKDF2 rounds per password check, i.e. the CPU cost of every login.
+# Measure with `python manage.py benchmark_password_hashing` before changing it.
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=720000, cast=int)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -198,15 +216,27 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
-# Correctly define STATICFILES_DIRS as a list
+# Bundled assets live in public/static, user uploads in public/media
 STATICFILES_DIRS = [
-    os.path.join(BASE_DIR, "public/media"),
+    os.path.join(BASE_DIR, "public/static"),
 ]
 
 # Media files
 MEDIA_ROOT = os.path.join(BASE_DIR, 'public/media')
 MEDIA_URL = '/media/'
 
+# collectstatic writes content-hashed names plus .br/.gz copies, served with a one-year immutable max-age
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "base.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+# Seconds browsers may cache static files whose name carries no content hash
+STATIC_MAX_AGE = config('STATIC_MAX_AGE', default=60 * 60, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -227,9 +257,45 @@ EMAIL_USE_SSL = False
 RAZORPAY_KEY_ID = config('RAZORPAY_KEY_ID')
 RAZORPAY_SECRET_KEY = config('RAZORPAY_SECRET_KEY')
 
+# Cache Configurations
+# Use a shared backend (memcached/redis) in production so the cache is common to all workers
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Active coupons are kept in memory of each worker for this many seconds
+COUPON_CACHE_TIMEOUT = config('COUPON_CACHE_TIMEOUT', default=60, cast=int)
+
+# Stock reservations are held this long while the customer is paying
+STOCK_RESERVATION_TTL_MINUTES = config('STOCK_RESERVATION_TTL_MINUTES', default=15, cast=int)
+
+# Product data derived from the catalog (variant prices, facets...) is cached for this many seconds
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Old product/category slugs and where they redirect to are cached for this many seconds
+SLUG_REDIRECT_CACHE_TIMEOUT = config('SLUG_REDIRECT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Sliding-window limits for expensive views (see base.ratelimit): "20/m" allows 20
+# requests in any minute. The counters live in CACHES, so use a shared backend
+# (Redis/Memcached) for the limits to hold across workers.
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+RATE_LIMITS = {
+    'search': config('RATE_LIMIT_SEARCH', default='30/m'),
+    'invoice': config('RATE_LIMIT_INVOICE', default='10/m'),
+    'checkout': config('RATE_LIMIT_CHECKOUT', default='20/m'),
+    'login': config('RATE_LIMIT_LOGIN', default='10/m'),
+    'register': config('RATE_LIMIT_REGISTER', default='10/h'),
+    'contact': config('RATE_LIMIT_CONTACT', default='5/h'),
+}
+# request.META entry holding the client IP, e.g. HTTP_X_REAL_IP behind nginx
+RATE_LIMIT_IP_META = config('RATE_LIMIT_IP_META', default='REMOTE_ADDR')
+
 # Auth Backends Configurations
 AUTHENTICATION_BACKENDS = (
-    "django.contrib.auth.backends.ModelBackend",
+    "accounts.backends.ProfileModelBackend",
     "allauth.account.auth_backends.AuthenticationBackend",
 )
 
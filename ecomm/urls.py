@@ -32,6 +32,5 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
-
-
-urlpatterns += staticfiles_urlpatterns()
+    # In production collectstatic's output is served by StaticFilesMiddleware or nginx
+    urlpatterns += staticfiles_urlpatterns()
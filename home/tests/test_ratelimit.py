@@ -0,0 +1,127 @@
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+from django.urls import reverse
+from django.test import Client
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from base.ratelimit import consume, parse_rate, get_rate_limit_metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_buckets(settings):
+    cache.clear()
+    settings.RATE_LIMIT_ENABLED = True
+    yield
+    cache.clear()
+
+
+def test_parse_rate():
+    assert parse_rate('20/m') == (20, 60)
+    assert parse_rate('100/5m') == (100, 300)
+    with pytest.raises(ValueError):
+        parse_rate('lots')
+
+
+def test_window_slides_over_time():
+    assert consume('test', 'k', 2, 10, now=0) == (True, 0)
+    assert consume('test', 'k', 2, 10, now=1) == (True, 0)
+
+    allowed, retry_after = consume('test', 'k', 2, 10, now=2)
+    assert not allowed and retry_after == pytest.approx(13)
+
+    # Half of the previous window still counts 5 seconds into the next one
+    assert consume('test', 'k', 2, 10, now=10) == (False, pytest.approx(5))
+    assert consume('test', 'k', 2, 10, now=15)[0]
+    assert not consume('test', 'k', 2, 10, now=15)[0]
+    assert consume('test', 'k', 2, 10, now=1000)[0]
+    assert consume('test', 'k', 2, 10, now=1000)[0]
+    assert not consume('test', 'k', 2, 10, now=1000)[0]
+
+
+class SlowCache:
+    """The test cache, pausing after each read so racing requests really interleave."""
+
+    def __getattr__(self, name):
+        return getattr(cache, name)
+
+    def get(self, *args, **kwargs):
+        value = cache.get(*args, **kwargs)
+        time.sleep(0.01)
+        return value
+
+
+def test_parallel_requests_cannot_exceed_the_limit(monkeypatch):
+    monkeypatch.setattr('base.ratelimit.cache', SlowCache())
+    workers = 20
+    barrier = threading.Barrier(workers)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(consume('test', 'parallel', 5, 60, now=30)[0])
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 5
+    assert not consume('test', 'parallel', 5, 60, now=30)[0]
+
+
+@pytest.mark.django_db
+def test_search_is_throttled_per_ip_with_retry_after(settings, monkeypatch):
+    settings.RATE_LIMITS = {**settings.RATE_LIMITS, 'search': '2/m'}
+    # Half way through a minute window
+    monkeypatch.setattr('base.ratelimit.time', SimpleNamespace(time=lambda: 60 * 1000 + 30))
+    client = Client()
+
+    assert client.get(reverse('product_search'), {'q': 'shoe'}).status_code == 200
+    assert client.get(reverse('product_search'), {'q': 'shoe'}).status_code == 200
+    response = client.get(reverse('product_search'), {'q': 'shoe'})
+
+    assert response.status_code == 429
+    # Until the next window, then until half of this one has slid out
+    assert int(response['Retry-After']) == 60
+    # Another client address has its own bucket
+    assert client.get(reverse('product_search'), {'q': 'shoe'}, REMOTE_ADDR='10.0.0.2').status_code == 200
+    assert get_rate_limit_metrics()['search'] == {'allowed': 3, 'limited': 1}
+
+
+@pytest.mark.django_db
+def test_login_limits_only_posts(settings):
+    settings.RATE_LIMITS = {**settings.RATE_LIMITS, 'login': '1/h'}
+    client = Client()
+
+    client.post(reverse('login'), {'username': 'nobody', 'password': 'wrong'})
+    assert client.post(reverse('login'), {'username': 'nobody', 'password': 'wrong'}).status_code == 429
+    assert get_rate_limit_metrics()['login'] == {'allowed': 1, 'limited': 1}
+
+
+@pytest.mark.django_db
+def test_user_key_separates_logged_in_users(settings):
+    settings.RATE_LIMITS = {**settings.RATE_LIMITS, 'checkout': '1/m'}
+    first = User.objects.create_user(username='first', password='password')
+    second = User.objects.create_user(username='second', password='password')
+    client = Client()
+
+    client.force_login(first)
+    assert client.get(reverse('cart')).status_code != 429
+    assert client.get(reverse('cart')).status_code == 429
+
+    client.force_login(second)
+    assert client.get(reverse('cart')).status_code != 429
+
+
+@pytest.mark.django_db
+def test_disabled_limits_let_everything_through(settings):
+    settings.RATE_LIMIT_ENABLED = False
+    settings.RATE_LIMITS = {**settings.RATE_LIMITS, 'search': '1/h'}
+    client = Client()
+
+    for _ in range(3):
+        assert client.get(reverse('product_search'), {'q': 'shoe'}).status_code == 200
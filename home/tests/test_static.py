@@ -0,0 +1,115 @@
+import gzip
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.core.management import call_command
+from django.contrib.staticfiles.storage import staticfiles_storage
+from base.middleware import IMMUTABLE_MAX_AGE, StaticFilesMiddleware, parse_range
+
+STYLESHEET = "body { background: url(../images/bg.png); }\n" + ".row { margin: 0 auto; }\n" * 100
+
+
+@pytest.fixture
+def collected(settings, tmp_path):
+    source = tmp_path / 'source'
+    (source / 'css').mkdir(parents=True)
+    (source / 'images').mkdir()
+    (source / 'css' / 'site.css').write_text(STYLESHEET)
+    (source / 'css' / 'tiny.css').write_text("p { margin: 0; }")
+    (source / 'images' / 'bg.png').write_bytes(b'\x89PNG' + b'\0' * 2000)
+    settings.STATICFILES_DIRS = [str(source)]
+    settings.STATIC_ROOT = str(tmp_path / 'collected')
+    settings.STATIC_MAX_AGE = 60
+    call_command('collectstatic', interactive=False, verbosity=0)
+    return tmp_path / 'collected'
+
+
+@pytest.fixture
+def middleware(collected):
+    return StaticFilesMiddleware(lambda request: HttpResponse("from django"))
+
+
+def get(middleware, path, **headers):
+    return middleware(RequestFactory().get(path, headers=headers))
+
+
+def body(response):
+    return b''.join(response.streaming_content)
+
+
+def test_collectstatic_hashes_names_and_writes_compressed_copies(collected):
+    name = staticfiles_storage.stored_name('css/site.css')
+    assert name != 'css/site.css'
+    content = (collected / name).read_bytes()
+    # References inside stylesheets point at the hashed names too
+    assert staticfiles_storage.stored_name('images/bg.png').encode() in content.replace(b'../', b'')
+    assert gzip.decompress((collected / f'{name}.gz').read_bytes()) == content
+    assert (collected / f'{name}.br').exists()
+
+    # Too small to be worth it, and images are not compressed at all
+    tiny = staticfiles_storage.stored_name('css/tiny.css')
+    assert not (collected / f'{tiny}.gz').exists()
+    assert not list(collected.glob('images/*.gz'))
+
+
+def test_hashed_names_are_immutable_and_sent_precompressed(middleware):
+    url = staticfiles_storage.url('css/site.css')
+
+    response = get(middleware, url, accept_encoding='gzip, br')
+    assert response['Cache-Control'] == f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    assert response['Content-Encoding'] == 'br'
+    assert response['Vary'] == 'Accept-Encoding'
+    assert int(response['Content-Length']) == len(body(response))
+
+    response = get(middleware, url, accept_encoding='gzip')
+    assert gzip.decompress(body(response)).startswith(b'body {')
+    assert response['Content-Encoding'] == 'gzip'
+
+    response = get(middleware, url, accept_encoding='br;q=0')
+    assert 'Content-Encoding' not in response
+    assert body(response).startswith(b'body {')
+
+    # The unhashed copy may change under the same name
+    response = get(middleware, '/static/css/site.css')
+    assert response['Cache-Control'] == 'public, max-age=60'
+
+
+def test_conditional_and_range_requests(middleware):
+    url = staticfiles_storage.url('css/site.css')
+    response = get(middleware, url)
+    size = int(response['Content-Length'])
+    full = body(response)
+
+    assert get(middleware, url, if_none_match=response['ETag']).status_code == 304
+    assert get(middleware, url, if_modified_since=response['Last-Modified']).status_code == 304
+
+    response = get(middleware, url, range='bytes=5-14')
+    assert response.status_code == 206
+    assert response['Content-Range'] == f'bytes 5-14/{size}'
+    assert body(response) == full[5:15]
+
+    response = get(middleware, url, range='bytes=-10')
+    assert body(response) == full[-10:]
+
+    assert get(middleware, url, range=f'bytes={size}-').status_code == 416
+    # A range of an older version of the file gets the whole current file
+    assert get(middleware, url, range='bytes=0-9', if_range='"stale"').status_code == 200
+
+    response = middleware(RequestFactory().head(url))
+    assert response.content == b'' and int(response['Content-Length']) == size
+
+
+def test_unknown_paths_and_other_methods_reach_django(middleware):
+    assert get(middleware, '/static/css/missing.css').content == b"from django"
+    assert get(middleware, '/media/product/shoe.jpg').content == b"from django"
+    url = staticfiles_storage.url('css/site.css')
+    assert middleware(RequestFactory().post(url)).content == b"from django"
+
+
+def test_parse_range():
+    assert parse_range('bytes=0-99', 50) == (0, 49)
+    assert parse_range('bytes=10-', 50) == (10, 49)
+    assert parse_range('bytes=0-1,5-6', 50) is None
+    assert parse_range('items=0-1', 50) is None
+    assert parse_range('bytes=60-70', 50) is False
@@ -1,35 +1,34 @@
 from django.shortcuts import render
-from products.models import Product, Category
+from products.facets import parse_filters, filter_products, get_facets
+from products.listings import LISTING_SORTS, grid_listings
+from base.pagination import KnownCountPaginator
 from django.db.models import Q
 from django.core.mail import send_mail
 from django.conf import settings
 from django.http import HttpResponseRedirect
 from django.contrib import messages
 from django.core.validators import validate_email
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
+from django.core.paginator import PageNotAnInteger, EmptyPage
+from base.ratelimit import rate_limit
 
 # Create your views here.
 
 
 def index(request):
-    query = Product.objects.all()
-    categories = Category.objects.all()
+    filters = parse_filters(request.GET)
+    facets = get_facets(filters)
+    query = filter_products(grid_listings(), filters)
     selected_sort = request.GET.get('sort')
-    selected_category = request.GET.get('category')
 
-    if selected_category:
-        query = query.filter(category__category_name=selected_category)
-
-    if selected_sort:
-        if selected_sort == 'newest':
-            query = query.filter(newest_product=True).order_by('category_id')
-        elif selected_sort == 'priceAsc':
-            query = query.order_by('price')
-        elif selected_sort == 'priceDesc':
-            query = query.order_by('-price')
+    if selected_sort in LISTING_SORTS:
+        query = query.order_by(*LISTING_SORTS[selected_sort])
+    else:
+        # The key order, so every product is on exactly one page
+        query = query.order_by('product_id')
 
     page = request.GET.get('page', 1)
-    paginator = Paginator(query, 20)
+    # The facets already counted the result set, so the paginator skips its COUNT(*)
+    paginator = KnownCountPaginator(query, 20, facets['total'])
 
     try:
         products = paginator.page(page)
@@ -40,29 +39,36 @@ def index(request):
     except Exception as e:
         print(e)
 
+    # Keeps the filters on the pagination links
+    querystring = request.GET.copy()
+    querystring.pop('page', None)
+
     context = {
         'products': products,
-        'categories': categories,
-        'selected_category': selected_category,
+        'facets': facets,
+        'selected_category': filters['category'][0] if filters['category'] else None,
         'selected_sort': selected_sort,
+        'querystring': querystring.urlencode(),
     }
     return render(request, 'home/index.html', context)
 
 
+@rate_limit('search', key='ip')
 def product_search(request):
     query = request.GET.get('q', '')
 
     if query:
         # Search for products that contain the query string in their product_name field
-        products = Product.objects.filter(Q(product_name__icontains=query) | Q(
+        products = grid_listings().filter(Q(product_name__icontains=query) | Q(
             product_name__istartswith=query))
     else:
-        products = Product.objects.none()
+        products = grid_listings().none()
 
     context = {'query': query, 'products': products}
     return render(request, 'home/search.html', context)
 
 
+@rate_limit('contact', key='ip', methods=['POST'])
 def contact(request):
     try:
         message_name = ""
@@ -1,19 +1,124 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from base.admin import LargeTableAdmin
+from .bulk import change_prices, set_newest, assign_variants
 from .models import *
 
 # Register your models here.
 
 
 admin.site.register(Category)
-admin.site.register(Coupon)
+
+@admin.register(Coupon)
+class CouponAdmin(admin.ModelAdmin):
+    list_display = ['coupon_code', 'discount_amount', 'minimum_amount', 'valid_from', 'valid_until',
+                    'times_used', 'usage_limit', 'is_expired']
+    readonly_fields = ['times_used']
+    search_fields = ['^coupon_code']
+    list_filter = ['is_expired']
+
+    model = Coupon
+
+
+@admin.register(CouponUsage)
+class CouponUsageAdmin(LargeTableAdmin):
+    list_display = ['coupon', 'user', 'times_used']
+    list_select_related = ['coupon', 'user']
+    raw_id_fields = ['coupon', 'user']
+    search_fields = ['=user__username']
+
+    model = CouponUsage
+
 
 class ProductImageAdmin(admin.StackedInline):
     model = ProductImage
 
 
-class ProductAdmin(admin.ModelAdmin):
-    list_display = ['product_name', 'price']
+class ProductActionForm(ActionForm):
+    value = forms.DecimalField(required=False, help_text="Percent or amount for the price actions, amounts are whole numbers.")
+    size_variants = forms.ModelMultipleChoiceField(queryset=SizeVariant.objects.all(), required=False)
+    color_variants = forms.ModelMultipleChoiceField(queryset=ColorVariant.objects.all(), required=False)
+
+
+class ProductAdmin(LargeTableAdmin):
+    list_display = ['product_name', 'category', 'price', 'newest_product']
+    list_select_related = ['category']
+    list_filter = ['newest_product', 'category']
+    search_fields = ['^product_name', '=slug']
+    raw_id_fields = ['parent']
     inlines = [ProductImageAdmin]
+    action_form = ProductActionForm
+    actions = ['change_price_by_percent', 'change_price_by_amount', 'mark_newest', 'unmark_newest',
+               'add_variants']
+
+    # Bulk actions run as one UPDATE or bulk insert for the whole selection
+    def _action_form(self, request):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        form.is_valid()
+        return form.cleaned_data
+
+    @admin.action(description="Change price by percent of selected products")
+    def change_price_by_percent(self, request, queryset):
+        value = self._action_form(request).get('value')
+        if value is None:
+            self.message_user(request, "Enter the percent to change prices by.", messages.ERROR)
+            return
+        changed = change_prices(queryset, percent=value, user=request.user)
+        self.message_user(request, f"Repriced {changed} products by {value}%.", messages.SUCCESS)
+
+    @admin.action(description="Change price by amount of selected products")
+    def change_price_by_amount(self, request, queryset):
+        value = self._action_form(request).get('value')
+        if value is None:
+            self.message_user(request, "Enter the amount to change prices by.", messages.ERROR)
+            return
+        try:
+            changed = change_prices(queryset, amount=value, user=request.user)
+        except ValueError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        self.message_user(request, f"Repriced {changed} products by {value}.", messages.SUCCESS)
+
+    @admin.action(description="Mark selected products as newest")
+    def mark_newest(self, request, queryset):
+        changed = set_newest(queryset, True, user=request.user)
+        self.message_user(request, f"Marked {changed} products as newest.", messages.SUCCESS)
+
+    @admin.action(description="Unmark selected products as newest")
+    def unmark_newest(self, request, queryset):
+        changed = set_newest(queryset, False, user=request.user)
+        self.message_user(request, f"Unmarked {changed} products as newest.", messages.SUCCESS)
+
+    @admin.action(description="Add size/color variants to selected products")
+    def add_variants(self, request, queryset):
+        data = self._action_form(request)
+        sizes, colors = list(data.get('size_variants') or []), list(data.get('color_variants') or [])
+        if not sizes and not colors:
+            self.message_user(request, "Select the sizes or colors to add.", messages.ERROR)
+            return
+        changed = assign_variants(queryset, sizes, colors, user=request.user)
+        self.message_user(request, f"Added variants to {changed} products.", messages.SUCCESS)
+
+
+@admin.register(CatalogChange)
+class CatalogChangeAdmin(admin.ModelAdmin):
+    list_display = ['action', 'product_count', 'user', 'source', 'created_at']
+    list_select_related = ['user']
+    list_filter = ['action', 'source']
+    readonly_fields = ['user', 'action', 'details', 'product_count', 'source']
+
+    model = CatalogChange
+
+
+@admin.register(ProductImage)
+class ProductImagesAdmin(LargeTableAdmin):
+    list_display = ['product', 'image']
+    list_select_related = ['product']
+    raw_id_fields = ['product']
+
+    model = ProductImage
 
 
 @admin.register(ColorVariant)
@@ -28,6 +133,34 @@ class SizeVariantAdmin(admin.ModelAdmin):
 
     model = SizeVariant
 
+@admin.register(Inventory)
+class InventoryAdmin(LargeTableAdmin):
+    list_display = ['product', 'size_variant', 'color_variant', 'quantity', 'reserved']
+    list_select_related = ['product', 'size_variant', 'color_variant']
+    raw_id_fields = ['product']
+    search_fields = ['^product__product_name']
+
+    model = Inventory
+
+
+@admin.register(ProductReview)
+class ProductReviewAdmin(LargeTableAdmin):
+    list_display = ['product', 'user', 'stars', 'date_added']
+    list_select_related = ['product', 'user']
+    list_filter = ['stars']
+    raw_id_fields = ['product', 'user']
+    search_fields = ['=product__slug', '=user__username']
+
+    model = ProductReview
+
+
+@admin.register(Wishlist)
+class WishlistAdmin(LargeTableAdmin):
+    list_display = ['user', 'product', 'size_variant', 'added_on']
+    list_select_related = ['user', 'product', 'size_variant']
+    raw_id_fields = ['user', 'product']
+    search_fields = ['=user__username']
+
+    model = Wishlist
+
 admin.site.register(Product, ProductAdmin)
-admin.site.register(ProductImage)
-admin.site.register(ProductReview)
\ No newline at end of file
@@ -0,0 +1,85 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, IntegerField, Value
+from django.db.models.functions import Cast, Greatest, Round
+
+from products.cache import invalidate_catalog_cache
+from products.models import CatalogChange, Product, ProductListing
+
+THROUGH_BATCH_SIZE = 1000
+
+
+def _record(action, queryset_count, details, user, source):
+    CatalogChange.objects.create(
+        user=user if user is not None and user.is_authenticated else None,
+        action=action, details=details, product_count=queryset_count, source=source)
+    transaction.on_commit(invalidate_catalog_cache)
+
+
+def change_prices(queryset, percent=None, amount=None, user=None, source='admin'):
+    """
+    Reprices every product in the queryset with one UPDATE, either by a
+    percentage (-10 for a 10% discount, rounded to whole prices) or by an
+    absolute amount, which must be a whole number. Prices never go below
+    zero. Returns the number of products changed.
+    """
+    if (percent is None) == (amount is None):
+        raise ValueError("Pass either percent or amount.")
+    if amount is not None and Decimal(str(amount)) % 1:
+        raise ValueError("The amount must be a whole number, prices have no decimals.")
+
+    if percent is not None:
+        factor = (Decimal(100) + Decimal(str(percent))) / 100
+        new_price = Cast(Round(F('price') * Value(factor)), IntegerField())
+        details = {'percent': str(percent)}
+    else:
+        new_price = F('price') + int(amount)
+        details = {'amount': int(amount)}
+
+    with transaction.atomic():
+        # The listing copy gets the same expression first, while the queryset still selects the same products
+        ProductListing.objects.filter(product__in=queryset.order_by().values('pk')).update(
+            price=Greatest(new_price, Value(0)))
+        changed = queryset.order_by().update(price=Greatest(new_price, Value(0)))
+        _record('change_prices', changed, details, user, source)
+    return changed
+
+
+def set_newest(queryset, newest=True, user=None, source='admin'):
+    with transaction.atomic():
+        ProductListing.objects.filter(product__in=queryset.order_by().values('pk')).update(newest_product=newest)
+        changed = queryset.order_by().update(newest_product=newest)
+        _record('set_newest', changed, {'newest_product': newest}, user, source)
+    return changed
+
+
+def assign_variants(queryset, sizes=(), colors=(), user=None, source='admin'):
+    """
+    Adds the size and color variants to every product in the queryset with bulk
+    inserts into the M2M through tables. Pairs that already exist are skipped
+    by the unique index.
+    """
+    size_through = Product.size_variant.through
+    color_through = Product.color_variant.through
+    size_ids = [size.pk for size in sizes]
+    color_ids = [color.pk for color in colors]
+
+    with transaction.atomic():
+        product_ids = list(queryset.order_by().values_list('pk', flat=True))
+        for start in range(0, len(product_ids), THROUGH_BATCH_SIZE):
+            batch = product_ids[start:start + THROUGH_BATCH_SIZE]
+            size_through.objects.bulk_create([
+                size_through(product_id=product_id, sizevariant_id=size_id)
+                for product_id in batch for size_id in size_ids
+            ], ignore_conflicts=True)
+            color_through.objects.bulk_create([
+                color_through(product_id=product_id, colorvariant_id=color_id)
+                for product_id in batch for color_id in color_ids
+            ], ignore_conflicts=True)
+
+        _record('assign_variants', len(product_ids), {
+            'sizes': [size.size_name for size in sizes],
+            'colors': [color.color_name for color in colors],
+        }, user, source)
+    return len(product_ids)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_catalog_version():
+    """Version number of the catalog, cached product data is keyed on it."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def invalidate_catalog_cache():
+    """Bumps the catalog version so every worker stops using its cached product data."""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 1, None)
+
+
+def get_or_build(name, build, *parts):
+    """
+    Returns the cached value for name and parts under the current catalog
+    version, building and caching it on a miss. Entries of older versions are
+    never read again and simply expire.
+    """
+    key = ':'.join(['catalog', str(get_catalog_version()), name, *map(str, parts)])
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, settings.CATALOG_CACHE_TIMEOUT)
+    return value
@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.text import slugify
+
+from products.cache import invalidate_catalog_cache
+from products.listings import sync_listings
+from products.slugs import assign_slugs
+from products.variants import invalidate_variant_cache
+from products.models import Category, ColorVariant, SizeVariant, Product, ProductImage
+
+CATALOG_FIELDS = ['slug', 'product_name', 'category', 'price', 'description', 'newest_product',
+                  'sizes', 'colors', 'images']
+LIST_SEPARATOR = '|'
+
+
+class CatalogRowError(Exception):
+    pass
+
+
+def read_rows(path, file_format=None):
+    """
+    Streams (line_number, row) pairs from a CSV or JSONL file without loading
+    it whole. A JSONL line that does not decode is yielded as a CatalogRowError,
+    so parse_row reports it like any other invalid row.
+    """
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'jsonl':
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, CatalogRowError(f"invalid JSON: {e}")
+        else:
+            for line_number, row in enumerate(csv.DictReader(source), start=2):
+                yield line_number, row
+
+
+def _split(value):
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in (value or '').split(LIST_SEPARATOR) if item.strip()]
+
+
+def parse_row(row):
+    """Validates one catalog row and returns it normalised. Raises CatalogRowError."""
+    if isinstance(row, CatalogRowError):
+        raise row
+    if not isinstance(row, dict):
+        raise CatalogRowError("row is not a JSON object.")
+
+    name = (row.get('product_name') or '').strip()
+    if not name:
+        raise CatalogRowError("product_name is required.")
+    if len(name) > 100:
+        raise CatalogRowError("product_name is longer than 100 characters.")
+
+    category = (row.get('category') or '').strip()
+    if not category:
+        raise CatalogRowError("category is required.")
+
+    try:
+        price = int(row.get('price'))
+    except (TypeError, ValueError):
+        raise CatalogRowError(f"price {row.get('price')!r} is not a whole number.")
+    if price < 0:
+        raise CatalogRowError("price cannot be negative.")
+
+    slug = slugify(row.get('slug') or name)
+    if not slug:
+        raise CatalogRowError("could not build a slug from the product name.")
+
+    newest = row.get('newest_product')
+    if not isinstance(newest, bool):
+        newest = str(newest or '').strip().lower() in ('1', 'true', 'yes')
+
+    return {
+        'slug': slug,
+        'product_name': name,
+        'category': category,
+        'price': price,
+        'description': row.get('description') or '',
+        'newest_product': newest,
+        'sizes': _split(row.get('sizes')),
+        'colors': _split(row.get('colors')),
+        'images': _split(row.get('images')),
+    }
+
+
+def _store_image(path):
+    """Copies an image file into media storage, returns its storage name or None if it is missing."""
+    name = f"{ProductImage._meta.get_field('image').upload_to}/{os.path.basename(path)}"
+    if default_storage.exists(name):
+        return name
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as image:
+        return default_storage.save(name, File(image))
+
+
+class CatalogImporter:
+    """
+    Writes catalog rows in batches: lookups go through in-memory maps, products
+    are written with bulk_create/bulk_update and their variants with bulk
+    inserts into the M2M through tables, one transaction per batch. Image
+    files are copied into storage by a thread pool.
+    """
+
+    def __init__(self, image_root='', image_workers=4):
+        self.image_root = image_root
+        self.image_workers = image_workers
+        self.categories = {category.category_name: category for category in Category.objects.all()}
+        self.sizes = {size.size_name: size for size in SizeVariant.objects.all()}
+        self.colors = {color.color_name: color for color in ColorVariant.objects.all()}
+        self.missing_images = []
+
+    def _resolve(self, names, lookup, model, field):
+        missing = [name for name in dict.fromkeys(names) if name not in lookup]
+        if missing:
+            created = [model(**{field: name}) for name in missing]
+            if model is Category:
+                assign_slugs(Category, created, field)
+            model.objects.bulk_create(created)
+            if model is not Category:
+                transaction.on_commit(invalidate_variant_cache)
+            for obj in created:
+                lookup[getattr(obj, field)] = obj
+
+    def _store_images(self, rows):
+        paths = {path for row in rows for path in row['images']}
+        if not paths:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.image_workers) as pool:
+            names = dict(zip(paths, pool.map(_store_image, [os.path.join(self.image_root, path) for path in paths])))
+        self.missing_images.extend(path for path, name in names.items() if name is None)
+        return names
+
+    def import_batch(self, rows):
+        # Later rows win when the same slug shows up twice in one batch
+        rows = list({row['slug']: row for row in rows}.values())
+        stored_images = self._store_images(rows)
+
+        with transaction.atomic():
+            self._resolve([row['category'] for row in rows], self.categories, Category, 'category_name')
+            self._resolve([size for row in rows for size in row['sizes']], self.sizes, SizeVariant, 'size_name')
+            self._resolve([color for row in rows for color in row['colors']], self.colors, ColorVariant, 'color_name')
+
+            existing = Product.objects.in_bulk([row['slug'] for row in rows], field_name='slug')
+            to_create, to_update, products = [], [], {}
+            for row in rows:
+                product = existing.get(row['slug']) or Product(slug=row['slug'])
+                product.product_name = row['product_name']
+                product.category = self.categories[row['category']]
+                product.price = row['price']
+                product.product_desription = row['description']
+                product.newest_product = row['newest_product']
+                (to_update if product.slug in existing else to_create).append(product)
+                products[row['slug']] = product
+
+            Product.objects.bulk_create(to_create)
+            Product.objects.bulk_update(
+                to_update, ['product_name', 'category', 'price', 'product_desription', 'newest_product'])
+
+            # Replace the variant sets of every product in the batch with two bulk statements per table
+            product_ids = [product.pk for product in products.values()]
+            size_through = Product.size_variant.through
+            color_through = Product.color_variant.through
+            size_through.objects.filter(product_id__in=product_ids).delete()
+            color_through.objects.filter(product_id__in=product_ids).delete()
+            size_through.objects.bulk_create([
+                size_through(product_id=products[row['slug']].pk, sizevariant_id=self.sizes[size].pk)
+                for row in rows for size in dict.fromkeys(row['sizes'])
+            ])
+            color_through.objects.bulk_create([
+                color_through(product_id=products[row['slug']].pk, colorvariant_id=self.colors[color].pk)
+                for row in rows for color in dict.fromkeys(row['colors'])
+            ])
+
+            known_images = set(
+                ProductImage.objects.filter(product_id__in=product_ids).values_list('product_id', 'image'))
+            ProductImage.objects.bulk_create([
+                ProductImage(product=products[row['slug']], image=stored_images[path])
+                for row in rows for path in row['images']
+                if stored_images[path] and (products[row['slug']].pk, stored_images[path]) not in known_images
+            ])
+            # The bulk writes above bypass the Product signals
+            sync_listings(product_ids)
+            transaction.on_commit(invalidate_catalog_cache)
+
+        return len(to_create), len(to_update)
+
+
+def export_rows(queryset=None, chunk_size=1000):
+    """Streams products as catalog rows, in the same format import_catalog reads."""
+    queryset = queryset if queryset is not None else Product.objects.all()
+    queryset = queryset.select_related('category').prefetch_related(
+        'size_variant', 'color_variant', 'product_images').order_by('pk')
+
+    for product in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'slug': product.slug,
+            'product_name': product.product_name,
+            'category': product.category.category_name,
+            'price': product.price,
+            'description': product.product_desription,
+            'newest_product': product.newest_product,
+            'sizes': [size.size_name for size in product.size_variant.all()],
+            'colors': [color.color_name for color in product.color_variant.all()],
+            'images': [image.image.name for image in product.product_images.all()],
+        }
@@ -0,0 +1,8 @@
+from products.wishlists import get_wishlist_count
+
+
+def wishlist_count(request):
+    """Wishlist badge count for the navbar, served from the cache."""
+    if not request.user.is_authenticated:
+        return {}
+    return {'wishlist_count': get_wishlist_count(request.user)}
@@ -0,0 +1,131 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from products.models import Coupon, CouponUsage
+
+VERSION_KEY = 'coupons:version'
+
+_lock = threading.Lock()
+_state = {'version': None, 'loaded_at': 0.0, 'coupons': {}}
+
+
+class CouponError(Exception):
+    pass
+
+
+def invalidate_coupon_cache():
+    """
+    Drops the active coupon cache. The shared version key tells the other
+    worker processes to reload on their next lookup.
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+    with _lock:
+        _state['loaded_at'] = 0.0
+
+
+def get_coupon_version():
+    """Changes whenever a coupon is saved or deleted, for caches holding coupon discounts."""
+    return cache.get(VERSION_KEY)
+
+
+def _load_active_coupons():
+    now = timezone.now()
+    coupons = Coupon.objects.filter(is_expired=False).filter(
+        Q(valid_until__isnull=True) | Q(valid_until__gt=now))
+    return {coupon.coupon_code: coupon for coupon in coupons}
+
+
+def get_active_coupon(coupon_code):
+    """
+    Looks the code up in the in-process cache of active coupons. The whole set
+    is loaded with one query and reloaded after COUPON_CACHE_TIMEOUT seconds or
+    as soon as a coupon is edited.
+    """
+    if not coupon_code:
+        return None
+
+    version = cache.get(VERSION_KEY)
+    with _lock:
+        expired = time.monotonic() - _state['loaded_at'] > settings.COUPON_CACHE_TIMEOUT
+        if expired or version != _state['version']:
+            _state['coupons'] = _load_active_coupons()
+            _state['version'] = version
+            _state['loaded_at'] = time.monotonic()
+        coupons = _state['coupons']
+
+    coupon = coupons.get(coupon_code)
+    if coupon is None or not coupon.is_active():
+        return None
+    return coupon
+
+
+def validate_coupon(coupon_code, user, cart_total):
+    """
+    Returns the coupon if the user may apply it to a cart of cart_total,
+    raises CouponError otherwise. The code lookup is served from memory; the
+    usage limits cost at most one query each.
+    """
+    coupon = get_active_coupon(coupon_code)
+    if coupon is None:
+        stored = Coupon.objects.filter(coupon_code__exact=coupon_code).only(
+            'is_expired', 'valid_from', 'valid_until').first()
+        if stored is None:
+            raise CouponError('Invalid coupon code.')
+        now = timezone.now()
+        if not stored.is_expired and stored.valid_from and now < stored.valid_from:
+            raise CouponError('Coupon code is not valid yet.')
+        raise CouponError('Coupon code expired.')
+
+    if cart_total < coupon.minimum_amount:
+        raise CouponError(f'Amount should be greater than {coupon.minimum_amount}')
+
+    if coupon.usage_limit is not None:
+        times_used = Coupon.objects.filter(pk=coupon.pk).values_list('times_used', flat=True).first()
+        if times_used is None or times_used >= coupon.usage_limit:
+            raise CouponError('Coupon usage limit reached.')
+
+    if coupon.per_user_limit is not None:
+        used = CouponUsage.objects.filter(coupon=coupon, user=user).values_list('times_used', flat=True).first()
+        if (used or 0) >= coupon.per_user_limit:
+            raise CouponError('You have already used this coupon.')
+
+    return coupon
+
+
+def redeem_coupon(coupon, user):
+    """
+    Counts one use of the coupon with conditional UPDATEs, so the limits hold
+    even when many orders redeem the same code at once. Returns False if a
+    limit was already reached.
+    """
+    with transaction.atomic():
+        redeemed = Coupon.objects.filter(pk=coupon.pk).filter(
+            Q(usage_limit__isnull=True) | Q(times_used__lt=F('usage_limit'))
+        ).update(times_used=F('times_used') + 1)
+        if not redeemed:
+            return False
+
+        try:
+            with transaction.atomic():
+                CouponUsage.objects.get_or_create(coupon=coupon, user=user)
+        except IntegrityError:
+            pass
+
+        usages = CouponUsage.objects.filter(coupon=coupon, user=user)
+        if coupon.per_user_limit is not None:
+            usages = usages.filter(times_used__lt=coupon.per_user_limit)
+
+        if not usages.update(times_used=F('times_used') + 1):
+            transaction.set_rollback(True)
+            return False
+
+    return True
@@ -0,0 +1,121 @@
+import hashlib
+import json
+
+from django.db.models import Count, Min, Q
+
+from products.cache import get_or_build
+from products.models import Product, ProductListing
+
+# (key, label, lower bound, upper bound or None), the upper bound is exclusive
+PRICE_BUCKETS = [
+    ('0-499', 'Under ₹500', 0, 500),
+    ('500-999', '₹500 - ₹999', 500, 1000),
+    ('1000-2499', '₹1,000 - ₹2,499', 1000, 2500),
+    ('2500-4999', '₹2,500 - ₹4,999', 2500, 5000),
+    ('5000+', '₹5,000 and above', 5000, None),
+]
+FACETS = ('category', 'size', 'color', 'price')
+
+SizeThrough = Product.size_variant.through
+ColorThrough = Product.color_variant.through
+
+
+def parse_filters(params):
+    """Normalised filters from the query string, so equal selections share one cache entry."""
+    buckets = {bucket[0] for bucket in PRICE_BUCKETS}
+    return {
+        'category': sorted({value for value in params.getlist('category') if value}),
+        'size': sorted({value for value in params.getlist('size') if value}),
+        'color': sorted({value for value in params.getlist('color') if value}),
+        'price': sorted({value for value in params.getlist('price') if value in buckets}),
+        'newest': params.get('sort') == 'newest',
+    }
+
+
+def _price_q(key):
+    _, _, low, high = next(bucket for bucket in PRICE_BUCKETS if bucket[0] == key)
+    condition = Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return condition
+
+
+def filter_products(queryset, filters, skip=None):
+    """
+    Applies every filter except `skip` to a ProductListing queryset. Variant
+    filters are semi-joins on the through tables, so a product matching
+    several selected sizes is still returned once.
+    """
+    if filters['category'] and skip != 'category':
+        queryset = queryset.filter(category_name__in=filters['category'])
+    if filters['size'] and skip != 'size':
+        queryset = queryset.filter(product_id__in=SizeThrough.objects.filter(
+            sizevariant__size_name__in=filters['size']).values('product_id'))
+    if filters['color'] and skip != 'color':
+        queryset = queryset.filter(product_id__in=ColorThrough.objects.filter(
+            colorvariant__color_name__in=filters['color']).values('product_id'))
+    if filters['price'] and skip != 'price':
+        condition = Q()
+        for key in filters['price']:
+            condition |= _price_q(key)
+        queryset = queryset.filter(condition)
+    if filters['newest']:
+        queryset = queryset.filter(newest_product=True)
+    return queryset
+
+
+def _options(rows, selected):
+    # Selected options stay listed with a zero count so they can be unticked
+    counts = dict(rows)
+    for value in selected:
+        counts.setdefault(value, 0)
+    return [{'value': value, 'count': count, 'selected': value in selected} for value, count in counts.items()]
+
+
+def build_facets(filters):
+    """
+    Counts per category, size, color and price bucket, one grouped query per
+    facet. Each facet is counted with the other facets' filters only, so the
+    counts show what ticking one more option in that facet would return.
+    """
+    products = ProductListing.objects.all()
+
+    categories = filter_products(products, filters, skip='category').values_list(
+        'category_name').annotate(count=Count('pk')).order_by('category_name')
+
+    sizes = SizeThrough.objects.filter(
+        product_id__in=filter_products(products, filters, skip='size').values('product_id')
+    ).values('sizevariant__size_name').annotate(
+        count=Count('product_id', distinct=True), position=Min('sizevariant__order'),
+    ).order_by('position', 'sizevariant__size_name').values_list('sizevariant__size_name', 'count')
+
+    colors = ColorThrough.objects.filter(
+        product_id__in=filter_products(products, filters, skip='color').values('product_id')
+    ).values('colorvariant__color_name').annotate(
+        count=Count('product_id', distinct=True),
+    ).order_by('colorvariant__color_name').values_list('colorvariant__color_name', 'count')
+
+    price_counts = filter_products(products, filters, skip='price').aggregate(**{
+        f"bucket_{i}": Count('pk', filter=_price_q(key)) for i, (key, *_) in enumerate(PRICE_BUCKETS)
+    })
+    prices = [
+        {'value': key, 'label': label, 'count': price_counts[f"bucket_{i}"], 'selected': key in filters['price']}
+        for i, (key, label, _, _) in enumerate(PRICE_BUCKETS)
+    ]
+
+    return {
+        'total': filter_products(products, filters).count(),
+        'category': _options(categories, filters['category']),
+        'size': _options(sizes, filters['size']),
+        'color': _options(colors, filters['color']),
+        'price': [bucket for bucket in prices if bucket['count'] or bucket['selected']],
+    }
+
+
+def filter_signature(filters):
+    return hashlib.md5(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+
+
+def get_facets(filters):
+    """Facet counts for the filters, cached per filter combination until the catalog changes."""
+    return get_or_build('facets', lambda: build_facets(filters), filter_signature(filters))
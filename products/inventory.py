@@ -0,0 +1,190 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from products.models import Inventory
+from accounts.models import Cart, CartItem, StockReservation
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStock(Exception):
+    def __init__(self, inventory, requested):
+        self.inventory = inventory
+        self.requested = requested
+        self.available = inventory.get_available_quantity()
+        super().__init__(f"Only {self.available} left in stock for {inventory}.")
+
+
+def get_reservation_ttl():
+    return timedelta(minutes=settings.STOCK_RESERVATION_TTL_MINUTES)
+
+
+def get_available_quantity(product, size_variant=None, color_variant=None):
+    """
+    Returns the free quantity for a SKU, or None when the SKU has no inventory
+    row and is therefore not stock tracked.
+    """
+    inventory = Inventory.objects.filter(
+        product=product, size_variant=size_variant, color_variant=color_variant).first()
+    if inventory is None:
+        return None
+    return inventory.get_available_quantity()
+
+
+def get_available_quantities(cart_items):
+    """
+    Free quantity for many cart lines with one query: {cart_item.pk: available},
+    None for lines that are not stock tracked.
+    """
+    cart_items = list(cart_items)
+    if not cart_items:
+        return {}
+
+    stock = {
+        (inventory.product_id, inventory.size_variant_id, inventory.color_variant_id): inventory
+        for inventory in Inventory.objects.filter(product_id__in={item.product_id for item in cart_items})
+    }
+
+    available = {}
+    for cart_item in cart_items:
+        inventory = stock.get((cart_item.product_id, cart_item.size_variant_id, cart_item.color_variant_id))
+        available[cart_item.pk] = inventory.get_available_quantity() if inventory else None
+
+    return available
+
+
+def _get_cart_lines(cart):
+    # Map each stock tracked cart line onto its inventory row: {inventory: quantity}
+    cart_items = CartItem.objects.filter(cart=cart, product__isnull=False)
+    keys = {}
+    for cart_item in cart_items:
+        key = (cart_item.product_id, cart_item.size_variant_id, cart_item.color_variant_id)
+        keys[key] = keys.get(key, 0) + cart_item.quantity
+
+    if not keys:
+        return {}
+
+    product_ids = {key[0] for key in keys}
+    lines = {}
+    for inventory in Inventory.objects.filter(product_id__in=product_ids):
+        key = (inventory.product_id, inventory.size_variant_id, inventory.color_variant_id)
+        if key in keys:
+            lines[inventory] = keys[key]
+
+    return lines
+
+
+def _try_reserve(inventory_id, quantity):
+    # A single conditional UPDATE: the row only changes if enough free stock is left.
+    return Inventory.objects.filter(
+        pk=inventory_id, quantity__gte=F('reserved') + quantity
+    ).update(reserved=F('reserved') + quantity) == 1
+
+
+def _release(reservation):
+    with transaction.atomic():
+        # Whoever deletes the reservation row owns giving its units back.
+        deleted, _ = StockReservation.objects.filter(pk=reservation.pk).delete()
+        if deleted:
+            Inventory.objects.filter(
+                pk=reservation.inventory_id, reserved__gte=reservation.quantity
+            ).update(reserved=F('reserved') - reservation.quantity)
+    return bool(deleted)
+
+
+def release_cart(cart):
+    released = 0
+    for reservation in StockReservation.objects.filter(cart=cart):
+        released += _release(reservation)
+    return released
+
+
+def release_expired_reservations(now=None, inventory_ids=None, batch_size=500):
+    now = now or timezone.now()
+    expired = StockReservation.objects.filter(expires_at__lte=now)
+    if inventory_ids is not None:
+        expired = expired.filter(inventory_id__in=inventory_ids)
+
+    released = 0
+    while True:
+        batch = list(expired.order_by('expires_at')[:batch_size])
+        if not batch:
+            break
+        for reservation in batch:
+            released += _release(reservation)
+        if len(batch) < batch_size:
+            break
+
+    return released
+
+
+def reserve_cart(cart):
+    """
+    Reserves stock for every stock tracked line of the cart, all or nothing.
+    Any reservation the cart already holds is replaced and the TTL restarts.
+    Raises OutOfStock if a line cannot be fully reserved.
+    """
+    try:
+        with transaction.atomic():
+            # Touching the cart row locks it first: two checkouts of the same cart take turns, and the
+            # second one replaces the first one's reservations. A write, so SQLite takes its lock here too.
+            Cart.objects.filter(pk=cart.pk).update(created_at=timezone.now())
+            lines = _get_cart_lines(cart)
+            release_cart(cart)
+            if not lines:
+                return []
+
+            release_expired_reservations(inventory_ids=[inventory.pk for inventory in lines])
+            expires_at = timezone.now() + get_reservation_ttl()
+
+            # Lock rows in primary key order so that two carts never deadlock each other.
+            ordered = sorted(lines.items(), key=lambda line: str(line[0].pk))
+            for inventory, quantity in ordered:
+                if not _try_reserve(inventory.pk, quantity):
+                    inventory.refresh_from_db()
+                    raise OutOfStock(inventory, quantity)
+
+            return StockReservation.objects.bulk_create([
+                StockReservation(cart=cart, inventory=inventory, quantity=quantity, expires_at=expires_at)
+                for inventory, quantity in ordered
+            ])
+    except OutOfStock:
+        # The rollback restored the earlier reservations, a cart that cannot be reserved holds none
+        release_cart(cart)
+        raise
+
+
+def commit_cart(cart):
+    """
+    Turns the reservations of a paid cart into stock decrements. Lines whose
+    reservation already expired are taken from free stock instead.
+    """
+    lines = _get_cart_lines(cart)
+    reservations = {
+        reservation.inventory_id: reservation
+        for reservation in StockReservation.objects.filter(cart=cart)
+    }
+
+    ordered = sorted(lines.items(), key=lambda line: str(line[0].pk))
+    with transaction.atomic():
+        for inventory, quantity in ordered:
+            reservation = reservations.pop(inventory.pk, None)
+            if reservation is not None:
+                _release(reservation)
+
+            taken = Inventory.objects.filter(
+                pk=inventory.pk, quantity__gte=F('reserved') + quantity
+            ).update(quantity=F('quantity') - quantity)
+
+            if not taken:
+                logger.warning("Oversold %s: %s units paid without stock.", inventory, quantity)
+                Inventory.objects.filter(pk=inventory.pk).update(quantity=F('reserved'))
+
+        # Reservations left over belong to lines removed from the cart.
+        for reservation in reservations.values():
+            _release(reservation)
@@ -0,0 +1,86 @@
+from django.db import connection
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from products.models import Product, ProductImage, ProductListing, ProductReviewStats
+
+LISTING_BATCH_SIZE = 1000
+LISTING_PER_PAGE = 20
+# Everything but popularity, which only the popularity job writes
+SYNCED_FIELDS = ['slug', 'product_name', 'category', 'category_name', 'price', 'image', 'rating',
+                 'review_count', 'newest_product']
+GRID_FIELDS = ['product_id', 'slug', 'product_name', 'price', 'image']
+# Orderings of the grid, each ends with the key so it is unique (keyset pagination needs that)
+LISTING_SORTS = {
+    'popular': ['-popularity', '-product_id'],
+    'newest': ['category_name', 'product_id'],
+    'priceAsc': ['price', 'product_id'],
+    'priceDesc': ['-price', '-product_id'],
+}
+
+
+def grid_listings():
+    """Listing rows with just the columns a product card needs."""
+    return ProductListing.objects.only(*GRID_FIELDS)
+
+
+def _primary_image(product_ref):
+    return ProductImage.objects.filter(product=product_ref).order_by('pk').values('image')[:1]
+
+
+def _build(product_ids):
+    rows = Product.objects.filter(pk__in=product_ids).annotate(
+        primary_image=Subquery(_primary_image(OuterRef('pk'))),
+    ).values_list('pk', 'slug', 'product_name', 'category_id', 'category__category_name', 'price',
+                  'primary_image', 'review_stats__review_count', 'review_stats__rating_total', 'newest_product')
+    for pk, slug, name, category_id, category_name, price, image, review_count, rating_total, newest in rows:
+        yield ProductListing(
+            product_id=pk, slug=slug, product_name=name, category_id=category_id, category_name=category_name,
+            price=price, image=image or '', review_count=review_count or 0,
+            rating=rating_total / review_count if review_count else 0, newest_product=newest,
+        )
+
+
+def sync_listings(product_ids):
+    """
+    Rewrites the listing rows of the given products from Product, one read
+    and one upsert per batch. Used by the Product signal, the catalog
+    importer and the rebuild command.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    upsert = {'update_conflicts': True, 'update_fields': SYNCED_FIELDS}
+    if connection.features.supports_update_conflicts_with_target:
+        upsert['unique_fields'] = ['product']
+    for start in range(0, len(product_ids), LISTING_BATCH_SIZE):
+        ProductListing.objects.bulk_create(list(_build(product_ids[start:start + LISTING_BATCH_SIZE])), **upsert)
+
+
+def sync_listing_image(product_id):
+    # An UPDATE only: the product may be in the middle of being deleted
+    ProductListing.objects.filter(pk=product_id).update(
+        image=Coalesce(Subquery(_primary_image(product_id)), Value('')))
+
+
+def sync_listing_reviews(product_id):
+    stats = ProductReviewStats.objects.filter(pk=product_id).first() or ProductReviewStats(product_id=product_id)
+    ProductListing.objects.filter(pk=product_id).update(review_count=stats.review_count, rating=stats.get_rating())
+
+
+def sync_listing_category(category):
+    ProductListing.objects.filter(category=category).update(category_name=category.category_name)
+
+
+def rebuild_listings(chunk_size=LISTING_BATCH_SIZE):
+    """Resyncs every listing row in chunks of products, returns the number of products."""
+    total = 0
+    batch = []
+    for pk in Product.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=chunk_size):
+        batch.append(pk)
+        if len(batch) == chunk_size:
+            sync_listings(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        sync_listings(batch)
+        total += len(batch)
+    return total
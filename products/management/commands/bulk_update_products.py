@@ -0,0 +1,70 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.bulk import assign_variants, change_prices, set_newest
+from products.models import ColorVariant, Product, SizeVariant
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk edits the products matching the filters: reprices them by a percent or an amount, "
+        "toggles newest_product or adds size/color variants. Each change is one set-based "
+        "statement and is recorded as a CatalogChange."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', action='append', default=[], help="Category slug, repeatable.")
+        parser.add_argument('--slug', action='append', default=[], help="Product slug, repeatable.")
+        parser.add_argument('--newest-only', action='store_true', help="Only products marked as newest.")
+
+        parser.add_argument('--percent', help="Change prices by this percent, e.g. -15.")
+        parser.add_argument('--amount', type=int, help="Change prices by this whole amount, e.g. -100.")
+        parser.add_argument('--newest', choices=['on', 'off'], help="Set or clear newest_product.")
+        parser.add_argument('--add-size', action='append', default=[], help="Size name to add, repeatable.")
+        parser.add_argument('--add-color', action='append', default=[], help="Color name to add, repeatable.")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['percent'] is not None and options['amount'] is not None:
+            raise CommandError("Pass either --percent or --amount, not both.")
+        percent = None
+        if options['percent'] is not None:
+            try:
+                percent = Decimal(options['percent'])
+            except InvalidOperation:
+                raise CommandError(f"{options['percent']} is not a number.")
+
+        sizes = self._variants(SizeVariant, 'size_name', options['add_size'])
+        colors = self._variants(ColorVariant, 'color_name', options['add_color'])
+        if percent is None and options['amount'] is None and options['newest'] is None and not sizes and not colors:
+            raise CommandError("Nothing to change, pass --percent, --amount, --newest, --add-size or --add-color.")
+
+        products = Product.objects.all()
+        if options['category']:
+            products = products.filter(category__slug__in=options['category'])
+        if options['slug']:
+            products = products.filter(slug__in=options['slug'])
+        if options['newest_only']:
+            products = products.filter(newest_product=True)
+
+        if options['dry_run']:
+            self.stdout.write(f"Would change {products.count()} products.")
+            return
+
+        if percent is not None or options['amount'] is not None:
+            changed = change_prices(products, percent=percent, amount=options['amount'], source='command')
+            self.stdout.write(self.style.SUCCESS(f"Repriced {changed} products."))
+        if options['newest'] is not None:
+            changed = set_newest(products, options['newest'] == 'on', source='command')
+            self.stdout.write(self.style.SUCCESS(f"Updated newest_product on {changed} products."))
+        if sizes or colors:
+            changed = assign_variants(products, sizes, colors, source='command')
+            self.stdout.write(self.style.SUCCESS(f"Added variants to {changed} products."))
+
+    def _variants(self, model, field, names):
+        variants = list(model.objects.filter(**{f'{field}__in': names}))
+        missing = set(names) - {getattr(variant, field) for variant in variants}
+        if missing:
+            raise CommandError(f"Unknown {model._meta.verbose_name}: {', '.join(sorted(missing))}.")
+        return variants
@@ -0,0 +1,41 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from products.catalog import CATALOG_FIELDS, LIST_SEPARATOR, export_rows
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Streams the product catalog as CSV or JSONL, in the format import_catalog reads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--output', help="Output file, defaults to stdout.")
+        parser.add_argument('--category', help="Only export products of this category.")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options['category']:
+            queryset = queryset.filter(category__category_name=options['category'])
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            rows = export_rows(queryset, chunk_size=options['chunk_size'])
+            if options['format'] == 'jsonl':
+                for row in rows:
+                    output.write(json.dumps(row) + '\n')
+            else:
+                writer = csv.DictWriter(output, fieldnames=CATALOG_FIELDS)
+                writer.writeheader()
+                for row in rows:
+                    writer.writerow({
+                        key: LIST_SEPARATOR.join(value) if isinstance(value, list) else value
+                        for key, value in row.items()
+                    })
+        finally:
+            if output is not sys.stdout:
+                output.close()
@@ -0,0 +1,84 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.catalog import CatalogImporter, CatalogRowError, parse_row, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports products from a CSV or JSONL catalog file in batches. "
+        "Columns: slug, product_name, category, price, description, newest_product, "
+        "sizes, colors and images, with list values separated by '|'. "
+        "Products are matched on their slug, so re-running an import updates them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--image-root',
+                            help="Directory image paths are relative to, defaults to the catalog's directory.")
+        parser.add_argument('--image-workers', type=int, default=4)
+        parser.add_argument('--checkpoint',
+                            help="File recording the last imported line, defaults to <path>.checkpoint.")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore the checkpoint and import from the first line.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f"{path} does not exist.")
+
+        checkpoint = options['checkpoint'] or f"{path}.checkpoint"
+        resume_after = 0
+        if not options['restart'] and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                resume_after = int(f.read().strip() or 0)
+            self.stdout.write(f"Resuming after line {resume_after}.")
+
+        importer = CatalogImporter(
+            image_root=options['image_root'] or os.path.dirname(os.path.abspath(path)),
+            image_workers=options['image_workers'],
+        )
+
+        created = updated = invalid = 0
+        batch, last_line = [], resume_after
+
+        def flush():
+            nonlocal created, updated
+            new, changed = importer.import_batch(batch)
+            created += new
+            updated += changed
+            # The checkpoint only moves once the batch is committed
+            with open(checkpoint, 'w') as f:
+                f.write(str(last_line))
+            self.stdout.write(f"Imported up to line {last_line}: {created} created, {updated} updated.")
+            batch.clear()
+
+        for line_number, row in read_rows(path, options['format']):
+            if line_number <= resume_after:
+                continue
+            last_line = line_number
+            try:
+                batch.append(parse_row(row))
+            except CatalogRowError as e:
+                invalid += 1
+                self.stderr.write(f"Line {line_number}: {e}")
+                continue
+
+            if len(batch) >= options['batch_size']:
+                flush()
+
+        if batch:
+            flush()
+
+        for image in importer.missing_images:
+            self.stderr.write(f"Image not found: {image}")
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Catalog imported: {created} created, {updated} updated, {invalid} invalid rows skipped."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import invalidate_catalog_cache
+from products.listings import LISTING_BATCH_SIZE, rebuild_listings
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrites the product listing table from Product in chunks. Run it after changing "
+        "products with raw SQL or anything else that bypasses the model signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=LISTING_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        synced = rebuild_listings(chunk_size=options['chunk_size'])
+        invalidate_catalog_cache()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the listing rows of {synced} products."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from products.popularity import update_popularity
+
+
+class Command(BaseCommand):
+    help = (
+        "Decays product popularity scores and adds the orders, wishlist adds and reviews "
+        "since the previous run. Schedule it periodically, e.g. hourly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Recompute every score from recent events instead of updating incrementally.")
+
+    def handle(self, *args, **options):
+        scored = update_popularity(rebuild=options['rebuild'])
+        if scored is None:
+            self.stdout.write(self.style.WARNING("Another popularity update is still running, skipped."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Updated popularity, {scored} products earned score."))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_coupon_limits_couponusage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='product_name',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
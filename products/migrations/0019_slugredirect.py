@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-19 11:57
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_catalogchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlugRedirect',
+            fields=[
+                ('uid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+                ('updated_at', models.DateTimeField(auto_now_add=True)),
+                ('model_name', models.CharField(max_length=50)),
+                ('old_slug', models.SlugField()),
+                ('new_slug', models.SlugField(db_index=False)),
+            ],
+            options={
+                'unique_together': {('model_name', 'old_slug')},
+            },
+        ),
+    ]
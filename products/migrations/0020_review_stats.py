@@ -0,0 +1,53 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_review_stats(apps, schema_editor):
+    ProductReview = apps.get_model('products', 'ProductReview')
+    ProductReviewStats = apps.get_model('products', 'ProductReviewStats')
+
+    stats = ProductReview.objects.values('product').annotate(
+        review_count=Count('pk'),
+        rating_total=Sum('stars'),
+        **{f'stars_{stars}': Count('pk', filter=Q(stars=stars)) for stars in range(1, 6)},
+    ).order_by()
+    ProductReviewStats.objects.bulk_create(
+        [ProductReviewStats(product_id=row.pop('product'), **row) for row in stats.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_slugredirect'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductReviewStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_stats', serialize=False, to='products.product')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Product review stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['product', 'date_added', 'uid'], name='products_pr_product_d64a8b_idx'),
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_listings(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductImage = apps.get_model('products', 'ProductImage')
+    ProductListing = apps.get_model('products', 'ProductListing')
+
+    primary_image = ProductImage.objects.filter(product=OuterRef('pk')).order_by('pk').values('image')[:1]
+    rows = Product.objects.annotate(primary_image=Subquery(primary_image)).values_list(
+        'pk', 'slug', 'product_name', 'category_id', 'category__category_name', 'price', 'primary_image',
+        'review_stats__review_count', 'review_stats__rating_total', 'newest_product').order_by()
+    ProductListing.objects.bulk_create((
+        ProductListing(
+            product_id=pk, slug=slug, product_name=name, category_id=category_id, category_name=category_name,
+            price=price, image=image or '', review_count=review_count or 0,
+            rating=rating_total / review_count if review_count else 0, newest_product=newest,
+        )
+        for pk, slug, name, category_id, category_name, price, image, review_count, rating_total, newest
+        in rows.iterator(chunk_size=1000)
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_product_price_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='products.product')),
+                ('slug', models.SlugField(blank=True, db_index=False, null=True)),
+                ('product_name', models.CharField(max_length=100)),
+                ('category_name', models.CharField(max_length=100)),
+                ('price', models.IntegerField()),
+                ('image', models.CharField(blank=True, default='', max_length=100)),
+                ('rating', models.FloatField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('newest_product', models.BooleanField(default=False)),
+                ('popularity', models.FloatField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listings', to='products.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['price'], name='products_pr_price_9e02a8_idx'), models.Index(fields=['category_name', 'price'], name='products_pr_categor_d23f4c_idx'), models.Index(fields=['newest_product', 'category_name'], name='products_pr_newest__37fd6d_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_listings, migrations.RunPython.noop),
+    ]
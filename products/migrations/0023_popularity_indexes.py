@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0022_product_listing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['-popularity', '-product'], name='products_pr_popular_422122_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['category_name', '-popularity'], name='products_pr_categor_ddbc66_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['date_added'], name='products_pr_date_ad_efc720_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wishlist',
+            index=models.Index(fields=['added_on'], name='products_wi_added_o_87e5a2_idx'),
+        ),
+    ]
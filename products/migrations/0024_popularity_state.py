@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:15
+
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+
+def move_watermark(apps, schema_editor):
+    # Runs used to be recorded as CatalogChange rows, which filled the bulk edit audit log
+    CatalogChange = apps.get_model('products', 'CatalogChange')
+    PopularityState = apps.get_model('products', 'PopularityState')
+
+    runs = CatalogChange.objects.filter(action='update_popularity')
+    last = runs.order_by('-updated_at').first()
+    if last is not None:
+        PopularityState.objects.create(
+            pk=1, scored_until=parse_datetime(last.details['until']), product_count=last.product_count)
+    runs.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0023_popularity_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scored_until', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(move_watermark, migrations.RunPython.noop),
+    ]
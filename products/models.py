@@ -1,20 +1,19 @@
 from django.db import models
 from base.models import BaseModel
-from django.utils.text import slugify
+from django.utils import timezone
+from products.slugs import SluggedModel
 from django.utils.html import mark_safe
 from django.contrib.auth.models import User
 
 # Create your models here.
 
 
-class Category(BaseModel):
+class Category(SluggedModel, BaseModel):
     category_name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, null=True, blank=True)
     category_image = models.ImageField(upload_to="catgories")
 
-    def save(self, *args, **kwargs):
-        self.slug = slugify(self.category_name)
-        super(Category, self).save(*args, **kwargs)
+    slug_source_field = 'category_name'
 
     def __str__(self) -> str:
         return self.category_name
@@ -37,9 +36,9 @@ class SizeVariant(BaseModel):
         return self.size_name
 
 
-class Product(BaseModel):
+class Product(SluggedModel, BaseModel):
     parent = models.ForeignKey('self', related_name='variants', on_delete=models.CASCADE, blank=True, null=True)
-    product_name = models.CharField(max_length=100)
+    product_name = models.CharField(max_length=100, db_index=True)
     slug = models.SlugField(unique=True, null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="products")
     price = models.IntegerField()
@@ -48,23 +47,32 @@ class Product(BaseModel):
     size_variant = models.ManyToManyField(SizeVariant, blank=True)
     newest_product = models.BooleanField(default=False)
 
-    def save(self, *args, **kwargs):
-        self.slug = slugify(self.product_name)
-        super(Product, self).save(*args, **kwargs)
+    slug_source_field = 'product_name'
+
+    class Meta:
+        # Price sorting and the price facet, with and without a category filter
+        indexes = [models.Index(fields=['price']), models.Index(fields=['category', 'price'])]
 
     def __str__(self) -> str:
         return self.product_name
 
     def get_product_price_by_size(self, size):
-        return self.price + SizeVariant.objects.get(size_name=size).price
+        """Price with the named size, or None if the product does not come in that size."""
+        from products.variants import get_size_variant
+
+        size_variant = get_size_variant(size, product=self)
+        if size_variant is None:
+            return None
+        return self.price + size_variant.price
     
-    def get_rating(self):
-        total = sum(int(review['stars']) for review in self.reviews.values())
+    def get_review_stats(self):
+        try:
+            return self.review_stats
+        except ProductReviewStats.DoesNotExist:
+            return ProductReviewStats(product=self)
 
-        if self.reviews.count() > 0:
-            return total / self.reviews.count()
-        else:
-            return 0
+    def get_rating(self):
+        return self.get_review_stats().get_rating()
 
 
 class ProductImage(BaseModel):
@@ -77,10 +85,40 @@ class ProductImage(BaseModel):
 
 
 class Coupon(BaseModel):
-    coupon_code = models.CharField(max_length=10)
+    coupon_code = models.CharField(max_length=10, db_index=True)
     is_expired = models.BooleanField(default=False)
     discount_amount = models.IntegerField(default=100)
     minimum_amount = models.IntegerField(default=500)
+    valid_from = models.DateTimeField(null=True, blank=True)
+    valid_until = models.DateTimeField(null=True, blank=True)
+    usage_limit = models.PositiveIntegerField(null=True, blank=True, help_text="Leave empty for unlimited use.")
+    per_user_limit = models.PositiveIntegerField(null=True, blank=True, help_text="Leave empty for unlimited use.")
+    times_used = models.PositiveIntegerField(default=0, editable=False)
+
+    def __str__(self) -> str:
+        return self.coupon_code
+
+    def is_active(self, now=None):
+        now = now or timezone.now()
+        if self.is_expired:
+            return False
+        if self.valid_from and now < self.valid_from:
+            return False
+        if self.valid_until and now >= self.valid_until:
+            return False
+        return True
+
+
+class CouponUsage(BaseModel):
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name="usages")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="coupon_usages")
+    times_used = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('coupon', 'user')
+
+    def __str__(self) -> str:
+        return f'{self.coupon.coupon_code} - {self.user.username}'
 
 
 class ProductReview(BaseModel):
@@ -92,6 +130,119 @@ class ProductReview(BaseModel):
 
     date_added = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Reviews are paged newest first per product, the popularity job reads them by date
+        indexes = [models.Index(fields=['product', 'date_added', 'uid']), models.Index(fields=['date_added'])]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the signals move the review between star buckets when it is edited
+        instance._loaded_stars = instance.__dict__.get('stars')
+        return instance
+
+
+class ProductReviewStats(models.Model):
+    """
+    Review count, rating total and star histogram of a product, kept up to date
+    by the ProductReview signals with single-row UPDATEs. A separate table so
+    saving a Product never writes stale aggregates back.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="review_stats")
+    review_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Product review stats"
+
+    def get_rating(self):
+        if self.review_count > 0:
+            return self.rating_total / self.review_count
+        else:
+            return 0
+
+    def get_star_histogram(self):
+        histogram = []
+        for stars in range(5, 0, -1):
+            count = getattr(self, f'stars_{stars}')
+            percent = count * 100 / self.review_count if self.review_count else 0
+            histogram.append({'stars': stars, 'count': count, 'percent': percent})
+        return histogram
+
+
+class ProductListing(models.Model):
+    """
+    Narrow copy of what the catalog grid shows, without the description, kept
+    in sync by products.listings. Browsing, sorting, facets and search read
+    this table instead of Product.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="listing")
+    slug = models.SlugField(null=True, blank=True, db_index=False)
+    product_name = models.CharField(max_length=100)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="listings")
+    category_name = models.CharField(max_length=100)
+    price = models.IntegerField()
+    # Storage name of the first product image, empty if there is none
+    image = models.CharField(max_length=100, blank=True, default='')
+    rating = models.FloatField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    newest_product = models.BooleanField(default=False)
+    popularity = models.FloatField(default=0)
+
+    class Meta:
+        # One index per way the grid is filtered and sorted
+        indexes = [
+            models.Index(fields=['price']),
+            models.Index(fields=['category_name', 'price']),
+            models.Index(fields=['newest_product', 'category_name']),
+            models.Index(fields=['-popularity', '-product']),
+            models.Index(fields=['category_name', '-popularity']),
+        ]
+
+    def __str__(self) -> str:
+        return self.product_name
+
+
+class PopularityState(models.Model):
+    """
+    Watermark of the popularity job in products.popularity, a single row.
+    scored_until is where the last complete run stopped. started_at is set
+    while a run is in progress, which also keeps overlapping runs out.
+    """
+    scored_until = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    product_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f'Popularity scored until {self.scored_until}'
+
+
+class Inventory(BaseModel):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="inventory")
+    size_variant = models.ForeignKey(SizeVariant, on_delete=models.CASCADE, null=True, blank=True,
+                                     related_name="inventory")
+    color_variant = models.ForeignKey(ColorVariant, on_delete=models.CASCADE, null=True, blank=True,
+                                      related_name="inventory")
+    quantity = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'size_variant', 'color_variant')
+        verbose_name_plural = "Inventory"
+
+    def __str__(self) -> str:
+        size = self.size_variant.size_name if self.size_variant else "No Size"
+        color = self.color_variant.color_name if self.color_variant else "No Color"
+        return f'{self.product.product_name} - {size} - {color}'
+
+    def get_available_quantity(self):
+        return max(self.quantity - self.reserved, 0)
+
 
 class Wishlist(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="wishlist")
@@ -103,8 +254,38 @@ class Wishlist(BaseModel):
 
     class Meta:
         unique_together = ('user', 'product', 'size_variant')
+        # Read by date by the popularity job
+        indexes = [models.Index(fields=['added_on'])]
 
     def __str__(self) -> str:
         return f'{self.user.username} - {self.product.product_name} - {self.size_variant.size_name if self.size_variant else "No Size"}'
 
+    def get_price(self):
+        return self.product.price + (self.size_variant.price if self.size_variant else 0)
+
     
+
+
+class CatalogChange(BaseModel):
+    """Audit record of a bulk catalog edit made from the admin or the bulk_update_products command."""
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="catalog_changes")
+    action = models.CharField(max_length=50)
+    details = models.JSONField(default=dict, blank=True)
+    product_count = models.PositiveIntegerField(default=0)
+    source = models.CharField(max_length=20, default='admin')
+
+    def __str__(self) -> str:
+        return f'{self.action} on {self.product_count} products'
+
+
+class SlugRedirect(BaseModel):
+    """Old slug of a renamed product or category, and the slug it now lives at."""
+    model_name = models.CharField(max_length=50)
+    old_slug = models.SlugField()
+    new_slug = models.SlugField(db_index=False)
+
+    class Meta:
+        unique_together = ('model_name', 'old_slug')
+
+    def __str__(self) -> str:
+        return f'{self.old_slug} -> {self.new_slug}'
@@ -0,0 +1,153 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import OrderItem
+from products.models import PopularityState, ProductListing, ProductReview, Wishlist
+
+HALF_LIFE = timedelta(days=7)
+# Events older than this many half-lives would add under 0.4% of their weight, a rebuild skips them
+REBUILD_HALF_LIVES = 8
+# Score added per unit ordered, wishlist add and review, before decay
+WEIGHTS = {'order': 3.0, 'wishlist': 1.0, 'review': 2.0}
+# Decayed scores below this are set to zero so idle products drop out of the decay pass
+MIN_SCORE = 0.01
+UPDATE_BATCH_SIZE = 2000
+STATE_PK = 1
+# A run that has not finished after this long is taken to have crashed
+RUN_TIMEOUT = timedelta(hours=1)
+
+logger = logging.getLogger(__name__)
+
+
+def _sources():
+    return [
+        ('order', OrderItem.objects.filter(product__isnull=False), 'order__order_date', Sum('quantity')),
+        ('wishlist', Wishlist.objects.all(), 'added_on', Count('pk')),
+        ('review', ProductReview.objects.all(), 'date_added', Count('pk')),
+    ]
+
+
+def _weight(day, since, until, half_life):
+    # Events of one day are aged from the middle of the part of that day inside the window
+    day_start = timezone.make_aware(datetime.combine(day, time.min))
+    start = max(since, day_start)
+    end = min(until, day_start + timedelta(days=1))
+    midpoint = start + (end - start) / 2
+    return 0.5 ** (max(until - midpoint, timedelta(0)) / half_life)
+
+
+def collect_increments(since, until, half_life=HALF_LIFE):
+    """
+    Decayed score each product earned between since and until, from one
+    query per event source grouped by product and day.
+    """
+    increments = defaultdict(float)
+    for kind, queryset, field, amount in _sources():
+        rows = queryset.filter(**{f'{field}__gte': since, f'{field}__lt': until}).annotate(
+            day=TruncDate(field)).values('product_id', 'day').annotate(amount=amount).order_by()
+        for row in rows.iterator(chunk_size=UPDATE_BATCH_SIZE):
+            increments[row['product_id']] += WEIGHTS[kind] * row['amount'] * _weight(
+                row['day'], since, until, half_life)
+    return increments
+
+
+def _scored_batches():
+    """Keys of the listing rows with a score, in batches, so each UPDATE touches a bounded range."""
+    keys = ProductListing.objects.filter(popularity__gt=0).order_by('pk').values_list('pk', flat=True)
+    batch = []
+    for pk in keys.iterator(chunk_size=UPDATE_BATCH_SIZE):
+        batch.append(pk)
+        if len(batch) == UPDATE_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reset_scores():
+    for batch in _scored_batches():
+        ProductListing.objects.filter(pk__in=batch).update(popularity=0)
+
+
+def decay_scores(factor):
+    if not factor:
+        # So much time passed that every score underflowed
+        return reset_scores()
+    for batch in _scored_batches():
+        ProductListing.objects.filter(pk__in=batch).update(popularity=Case(
+            When(popularity__lt=MIN_SCORE / factor, then=Value(0.0)),
+            default=F('popularity') * factor,
+        ))
+
+
+def add_scores(increments):
+    items = list(increments.items())
+    for start in range(0, len(items), UPDATE_BATCH_SIZE):
+        ProductListing.objects.bulk_update([
+            ProductListing(pk=product_id, popularity=F('popularity') + score)
+            for product_id, score in items[start:start + UPDATE_BATCH_SIZE]
+        ], ['popularity'])
+
+
+def claim_run(rebuild=False, stale_after=RUN_TIMEOUT):
+    """
+    Marks a run as started on the watermark row, in a short transaction that
+    locks the row. Returns (scored_until, rebuild), or None when another run is
+    in progress. A run left unfinished for longer than stale_after crashed
+    part way: its batches may or may not have been applied, so the retry
+    rebuilds the scores.
+    """
+    with transaction.atomic():
+        state, _ = PopularityState.objects.select_for_update().get_or_create(pk=STATE_PK)
+        started = timezone.now()
+        if state.started_at is not None:
+            if started - state.started_at < stale_after:
+                return None
+            logger.warning("Popularity run started at %s never finished, rebuilding", state.started_at)
+            rebuild = True
+        rebuild = rebuild or state.scored_until is None
+        state.started_at = started
+        state.save(update_fields=['started_at'])
+    return state.scored_until, rebuild
+
+
+def update_popularity(now=None, rebuild=False, half_life=HALF_LIFE):
+    """
+    Brings every product's popularity up to `now`: decays the stored scores by
+    the time passed since the previous run and adds what orders, wishlist adds
+    and reviews since then contributed. Each batch is its own short UPDATE.
+    The first run, or one with rebuild=True, recomputes the scores from the
+    last REBUILD_HALF_LIVES half-lives of events. Returns the number of
+    products that earned score in this run, or None if another run was
+    already in progress.
+    """
+    now = now or timezone.now()
+    claimed = claim_run(rebuild)
+    if claimed is None:
+        return None
+    since, rebuild = claimed
+
+    try:
+        if rebuild:
+            since = now - half_life * REBUILD_HALF_LIVES
+            reset_scores()
+        else:
+            decay_scores(0.5 ** ((now - since) / half_life))
+
+        increments = collect_increments(since, now, half_life)
+        add_scores(increments)
+    except BaseException:
+        # Some batches may have been applied, forget the watermark so the next run rebuilds
+        PopularityState.objects.filter(pk=STATE_PK).update(scored_until=None, started_at=None)
+        raise
+
+    # The next run starts where this one stopped
+    PopularityState.objects.filter(pk=STATE_PK).update(
+        scored_until=now, started_at=None, product_count=len(increments))
+    return len(increments)
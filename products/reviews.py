@@ -0,0 +1,72 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from base.pagination import paginate_keyset
+from products.models import ProductReview, ProductReviewStats
+
+REVIEW_ORDERING = ['-date_added', '-uid']
+REVIEWS_PER_PAGE = 10
+
+STAT_FIELDS = ['review_count', 'rating_total', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+
+
+def _apply(product_id, stars, sign):
+    """Adds (sign=1) or removes (sign=-1) one review of the given stars with a single UPDATE."""
+    bucket = f'stars_{stars}'
+    changes = {
+        'review_count': F('review_count') + sign,
+        'rating_total': F('rating_total') + sign * stars,
+        bucket: F(bucket) + sign,
+    }
+    if ProductReviewStats.objects.filter(product_id=product_id).update(**changes) or sign < 0:
+        return
+    try:
+        with transaction.atomic():
+            ProductReviewStats.objects.create(product_id=product_id)
+    except IntegrityError:
+        # Another request created the row first
+        pass
+    ProductReviewStats.objects.filter(product_id=product_id).update(**changes)
+
+
+def _forget_cached_stats(review):
+    # The product instance the caller holds may have loaded the old stats
+    if ProductReview.product.is_cached(review):
+        review.product._state.fields_cache.pop('review_stats', None)
+
+
+def review_saved(review, created):
+    old_stars = getattr(review, '_loaded_stars', None)
+    if created:
+        _apply(review.product_id, review.stars, 1)
+    elif old_stars is not None and old_stars != review.stars:
+        _apply(review.product_id, old_stars, -1)
+        _apply(review.product_id, review.stars, 1)
+    review._loaded_stars = review.stars
+    _forget_cached_stats(review)
+
+
+def review_deleted(review):
+    stars = getattr(review, '_loaded_stars', None) or review.stars
+    _apply(review.product_id, stars, -1)
+    _forget_cached_stats(review)
+
+
+def rebuild_review_stats(products):
+    """Recomputes the review aggregates of the products from their reviews, for backfills and repairs."""
+    stats = ProductReview.objects.filter(product__in=products).values('product').annotate(
+        review_count=Count('pk'),
+        rating_total=Sum('stars'),
+        **{f'stars_{stars}': Count('pk', filter=Q(stars=stars)) for stars in range(1, 6)},
+    ).order_by()
+    with transaction.atomic():
+        ProductReviewStats.objects.filter(product__in=products).delete()
+        ProductReviewStats.objects.bulk_create([
+            ProductReviewStats(product_id=row.pop('product'), **row) for row in stats
+        ])
+
+
+def get_reviews_page(product, cursor=None, per_page=REVIEWS_PER_PAGE):
+    """One page of the product's reviews, newest first, with their authors. Returns (reviews, next_cursor)."""
+    reviews = ProductReview.objects.filter(product=product).select_related('user')
+    return paginate_keyset(reviews, REVIEW_ORDERING, cursor, per_page)
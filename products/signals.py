@@ -0,0 +1,74 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from products.models import Category, Coupon, Product, ProductImage, ProductReview, SizeVariant, ColorVariant, Wishlist
+from products.cache import invalidate_catalog_cache
+from products.coupons import invalidate_coupon_cache
+from products.listings import sync_listings, sync_listing_image, sync_listing_reviews, sync_listing_category
+from products.reviews import review_saved, review_deleted
+from products.variants import invalidate_variant_cache
+from products.wishlists import invalidate_wishlist_count
+
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def coupon_changed(sender, instance, **kwargs):
+    invalidate_coupon_cache()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(m2m_changed, sender=Product.size_variant.through)
+@receiver(m2m_changed, sender=Product.color_variant.through)
+def product_changed(sender, **kwargs):
+    invalidate_catalog_cache()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    # Category names are part of the cached facets
+    invalidate_catalog_cache()
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    sync_listings([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if not created:
+        sync_listing_category(instance)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    sync_listing_image(instance.product_id)
+
+
+@receiver(post_save, sender=SizeVariant)
+@receiver(post_delete, sender=SizeVariant)
+@receiver(post_save, sender=ColorVariant)
+@receiver(post_delete, sender=ColorVariant)
+def variant_changed(sender, **kwargs):
+    invalidate_variant_cache()
+    invalidate_catalog_cache()
+
+
+@receiver(post_save, sender=ProductReview)
+def product_review_saved(sender, instance, created, **kwargs):
+    review_saved(instance, created)
+    sync_listing_reviews(instance.product_id)
+
+
+@receiver(post_delete, sender=ProductReview)
+def product_review_deleted(sender, instance, **kwargs):
+    review_deleted(instance)
+    sync_listing_reviews(instance.product_id)
+
+
+@receiver(post_save, sender=Wishlist)
+@receiver(post_delete, sender=Wishlist)
+def wishlist_changed(sender, instance, **kwargs):
+    invalidate_wishlist_count(instance.user_id)
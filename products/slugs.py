@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.text import slugify
+
+# Characters kept free at the end of the slug for a "-<n>" suffix
+SUFFIX_ROOM = 8
+
+
+def _base_slug(model, value):
+    max_length = model._meta.get_field('slug').max_length
+    return (slugify(value) or model._meta.model_name)[:max_length]
+
+
+def _prefix(model, base):
+    return base[:model._meta.get_field('slug').max_length - SUFFIX_ROOM]
+
+
+def _first_free(model, base, taken):
+    if base not in taken:
+        return base
+    max_length = model._meta.get_field('slug').max_length
+    n = 2
+    while True:
+        suffix = f'-{n}'
+        candidate = f'{base[:max_length - len(suffix)]}{suffix}'
+        if candidate not in taken:
+            return candidate
+        n += 1
+
+
+def unique_slug(model, value, exclude_pk=None):
+    """
+    Returns a free slug for value, adding "-2", "-3"... when it is taken. All
+    candidates share a prefix, so one indexed prefix lookup finds every slug
+    that could collide.
+    """
+    base = _base_slug(model, value)
+    taken = model._default_manager.filter(slug__startswith=_prefix(model, base))
+    if exclude_pk is not None:
+        taken = taken.exclude(pk=exclude_pk)
+    return _first_free(model, base, set(taken.values_list('slug', flat=True)))
+
+
+def assign_slugs(model, instances, field):
+    """
+    Gives every instance without a slug a unique one, generated from its
+    field value, with a single prefix query for the whole batch. Meant for
+    imports before a bulk_create.
+    """
+    pending = [instance for instance in instances if not instance.slug]
+    if not pending:
+        return
+    bases = {instance: _base_slug(model, getattr(instance, field)) for instance in pending}
+
+    prefixes = Q()
+    for prefix in {_prefix(model, base) for base in bases.values()}:
+        prefixes |= Q(slug__startswith=prefix)
+    taken = set(model._default_manager.filter(prefixes).values_list('slug', flat=True))
+    taken.update(instance.slug for instance in instances if instance.slug)
+
+    for instance in pending:
+        instance.slug = _first_free(model, bases[instance], taken)
+        taken.add(instance.slug)
+
+
+def _redirect_cache_key(model_name, slug):
+    return f'slug-redirect:{model_name}:{slug}'
+
+
+def record_slug_change(model, old_slug, new_slug):
+    """Keeps old_slug working as a redirect to new_slug, and folds earlier redirects into it."""
+    from products.models import SlugRedirect
+
+    model_name = model._meta.model_name
+    redirects = SlugRedirect.objects.filter(model_name=model_name)
+    changed = {old_slug, new_slug}
+    changed.update(redirects.filter(new_slug=old_slug).values_list('old_slug', flat=True))
+
+    redirects.filter(new_slug=old_slug).update(new_slug=new_slug)
+    redirects.filter(old_slug=new_slug).delete()
+    if old_slug:
+        SlugRedirect.objects.update_or_create(
+            model_name=model_name, old_slug=old_slug, defaults={'new_slug': new_slug})
+    cache.delete_many([_redirect_cache_key(model_name, slug) for slug in changed])
+
+
+def discard_slug_redirect(model, slug):
+    """A live object took over the slug, so it must not redirect anymore."""
+    from products.models import SlugRedirect
+
+    model_name = model._meta.model_name
+    if SlugRedirect.objects.filter(model_name=model_name, old_slug=slug).delete()[0]:
+        cache.delete(_redirect_cache_key(model_name, slug))
+
+
+def resolve_slug_redirect(model, slug):
+    """Returns the current slug an old slug redirects to, or None. Misses are cached as well."""
+    from products.models import SlugRedirect
+
+    key = _redirect_cache_key(model._meta.model_name, slug)
+    new_slug = cache.get(key)
+    if new_slug is None:
+        new_slug = SlugRedirect.objects.filter(
+            model_name=model._meta.model_name, old_slug=slug).values_list('new_slug', flat=True).first() or ''
+        cache.set(key, new_slug, settings.SLUG_REDIRECT_CACHE_TIMEOUT)
+    return new_slug or None
+
+
+class SluggedModel:
+    """
+    Mixin for models with a unique slug built from slug_source_field. The slug
+    is only generated when missing or when the source changed (and the slug
+    was not edited by hand), and the old slug is kept as a redirect.
+    """
+    slug_source_field = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_slug = instance.__dict__.get('slug')
+        instance._loaded_slug_source = instance.__dict__.get(cls.slug_source_field)
+        return instance
+
+    def save(self, *args, **kwargs):
+        model = type(self)
+        source = getattr(self, self.slug_source_field)
+        loaded_slug = getattr(self, '_loaded_slug', None)
+        loaded_source = getattr(self, '_loaded_slug_source', None)
+        adding = self._state.adding
+
+        renamed = not adding and loaded_source is not None and loaded_source != source
+        if not self.slug or (renamed and self.slug == loaded_slug):
+            self.slug = unique_slug(model, source, exclude_pk=None if adding else self.pk)
+
+        super().save(*args, **kwargs)
+
+        if not adding and loaded_slug and loaded_slug != self.slug:
+            record_slug_change(model, loaded_slug, self.slug)
+        elif adding:
+            discard_slug_redirect(model, self.slug)
+        self._loaded_slug = self.slug
+        self._loaded_slug_source = source
@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.db import connection
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from products.bulk import change_prices, assign_variants
+from products.cache import get_catalog_version
+from products.models import Category, ColorVariant, SizeVariant, Product, CatalogChange
+
+# Fixtures
+@pytest.fixture
+def products():
+    shoes = Category.objects.create(category_name="Shoes")
+    shirts = Category.objects.create(category_name="Shirts")
+    return [
+        Product.objects.create(product_name=f"Shoe {i}", price=100 * (i + 1), product_desription="Shoe", category=shoes)
+        for i in range(3)
+    ] + [Product.objects.create(product_name="Shirt", price=500, product_desription="Shirt", category=shirts)]
+
+def prices():
+    return dict(Product.objects.values_list('product_name', 'price'))
+
+# Test Cases
+
+# 1. Price changes are one UPDATE and an audit row
+@pytest.mark.django_db
+def test_change_prices_by_percent(products, django_capture_on_commit_callbacks):
+    cache.clear()
+    version = get_catalog_version()
+    shoes = Product.objects.filter(category__slug='shoes')
+    with django_capture_on_commit_callbacks(execute=True), CaptureQueriesContext(connection) as queries:
+        assert change_prices(shoes, percent=-15) == 3
+
+    # One UPDATE of the products and one of their listing rows
+    updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+    assert len(updates) == 2 and 'products_productlisting' in updates[0]
+    assert prices() == {"Shoe 0": 85, "Shoe 1": 170, "Shoe 2": 255, "Shirt": 500}
+    change = CatalogChange.objects.get()
+    assert (change.action, change.product_count, change.details) == ('change_prices', 3, {'percent': '-15'})
+    assert get_catalog_version() != version
+
+@pytest.mark.django_db
+def test_change_prices_never_go_negative(products):
+    change_prices(Product.objects.all(), amount=-250)
+    assert prices() == {"Shoe 0": 0, "Shoe 1": 0, "Shoe 2": 50, "Shirt": 250}
+
+# 2. Variants are added with bulk inserts, existing pairs are kept
+@pytest.mark.django_db
+def test_assign_variants(products):
+    small = SizeVariant.objects.create(size_name="S")
+    red = ColorVariant.objects.create(color_name="Red")
+    products[0].size_variant.add(small)
+
+    assert assign_variants(Product.objects.all(), [small], [red]) == 4
+    for product in products:
+        assert list(product.size_variant.all()) == [small]
+        assert list(product.color_variant.all()) == [red]
+
+# 3. Admin action and management command
+@pytest.mark.django_db
+def test_admin_price_action(admin_client, products):
+    response = admin_client.post(reverse('admin:products_product_changelist'), {
+        'action': 'change_price_by_amount',
+        'value': '50',
+        '_selected_action': [str(products[0].pk), str(products[3].pk)],
+    })
+    assert response.status_code == 302
+    assert prices() == {"Shoe 0": 150, "Shoe 1": 200, "Shoe 2": 300, "Shirt": 550}
+
+    # Prices are whole numbers, a fractional amount is refused rather than truncated
+    response = admin_client.post(reverse('admin:products_product_changelist'), {
+        'action': 'change_price_by_amount',
+        'value': '0.99',
+        '_selected_action': [str(products[0].pk)],
+    }, follow=True)
+    assert "whole number" in response.content.decode()
+    assert prices()["Shoe 0"] == 150
+    with pytest.raises(ValueError):
+        change_prices(Product.objects.all(), amount=Decimal('-9.5'))
+
+@pytest.mark.django_db
+def test_bulk_update_products_command(products):
+    call_command('bulk_update_products', '--category', 'shirts', '--percent', '10', '--newest', 'on')
+    shirt = Product.objects.get(product_name="Shirt")
+    assert (shirt.price, shirt.newest_product) == (550, True)
+    assert not Product.objects.filter(category__slug='shoes', newest_product=True).exists()
+    assert CatalogChange.objects.filter(source='command').count() == 2
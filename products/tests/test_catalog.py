@@ -0,0 +1,97 @@
+import csv
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from products.models import Category, Product, ProductImage
+
+# Fixtures
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    return tmp_path / 'media'
+
+@pytest.fixture
+def catalog(tmp_path):
+    (tmp_path / 'runner.jpg').write_bytes(b'image')
+    path = tmp_path / 'catalog.csv'
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['product_name', 'category', 'price', 'description', 'sizes', 'colors', 'images'])
+        writer.writerow(['Runner', 'Shoes', '120', 'Light shoe', 'S|M|L', 'Red', 'runner.jpg'])
+        writer.writerow(['Walker', 'Shoes', '90', 'Comfy shoe', 'M', '', ''])
+        writer.writerow(['Broken', 'Shoes', 'cheap', '', '', '', ''])
+        writer.writerow(['Cap', 'Hats', '20', 'Sun cap', '', 'Red|Blue', ''])
+    return path
+
+# Test Cases
+
+# 1. Import validates, resolves lookups and writes in batches
+@pytest.mark.django_db
+def test_import_catalog(catalog):
+    err = StringIO()
+    call_command('import_catalog', str(catalog), '--batch-size', '2', stdout=StringIO(), stderr=err)
+
+    assert "Line 4: price 'cheap' is not a whole number." in err.getvalue()
+    assert Product.objects.count() == 3
+    assert set(Category.objects.values_list('category_name', flat=True)) == {'Shoes', 'Hats'}
+
+    runner = Product.objects.get(slug='runner')
+    assert runner.price == 120
+    assert sorted(runner.size_variant.values_list('size_name', flat=True)) == ['L', 'M', 'S']
+    assert list(runner.color_variant.values_list('color_name', flat=True)) == ['Red']
+    assert list(runner.product_images.values_list('image', flat=True)) == ['product/runner.jpg']
+    assert sorted(Product.objects.get(slug='cap').color_variant.values_list('color_name', flat=True)) == ['Blue', 'Red']
+
+# 2. Re-importing updates products in place
+@pytest.mark.django_db
+def test_import_catalog_updates_existing_products(catalog, tmp_path):
+    call_command('import_catalog', str(catalog), stdout=StringIO(), stderr=StringIO())
+    update = tmp_path / 'update.jsonl'
+    update.write_text(json.dumps({'product_name': 'Runner', 'category': 'Shoes', 'price': 99, 'sizes': ['M']}) + '\n')
+
+    call_command('import_catalog', str(update), stdout=StringIO())
+
+    runner = Product.objects.get(slug='runner')
+    assert runner.price == 99
+    assert list(runner.size_variant.values_list('size_name', flat=True)) == ['M']
+    assert ProductImage.objects.filter(product=runner).count() == 1
+
+# 3. A line that is not a JSON object is skipped like any other invalid row
+@pytest.mark.django_db
+def test_import_catalog_skips_undecodable_lines(tmp_path):
+    path = tmp_path / 'catalog.jsonl'
+    path.write_text('{"product_name": "Run\n[1, 2]\n' + json.dumps({'product_name': 'Cap', 'category': 'Hats', 'price': 20}) + '\n')
+    err, out = StringIO(), StringIO()
+    call_command('import_catalog', str(path), stdout=out, stderr=err)
+
+    assert "Line 1: invalid JSON" in err.getvalue()
+    assert "Line 2: row is not a JSON object." in err.getvalue()
+    assert "1 created, 0 updated, 2 invalid rows skipped." in out.getvalue()
+    assert list(Product.objects.values_list('slug', flat=True)) == ['cap']
+
+# 4. A failed import resumes after the last committed batch
+@pytest.mark.django_db
+def test_import_catalog_resumes_from_checkpoint(catalog):
+    checkpoint = f"{catalog}.checkpoint"
+    with open(checkpoint, 'w') as f:
+        f.write('3')
+
+    call_command('import_catalog', str(catalog), stdout=StringIO(), stderr=StringIO())
+
+    assert list(Product.objects.values_list('slug', flat=True)) == ['cap']
+
+# 5. Export round trip
+@pytest.mark.django_db
+def test_export_catalog(catalog, tmp_path):
+    call_command('import_catalog', str(catalog), stdout=StringIO(), stderr=StringIO())
+    output = tmp_path / 'export.csv'
+    call_command('export_catalog', '--output', str(output))
+
+    with open(output, newline='') as f:
+        rows = {row['slug']: row for row in csv.DictReader(f)}
+    assert set(rows) == {'runner', 'walker', 'cap'}
+    assert rows['runner']['price'] == '120'
+    assert sorted(rows['runner']['sizes'].split('|')) == ['L', 'M', 'S']
+    assert rows['runner']['images'] == 'product/runner.jpg'
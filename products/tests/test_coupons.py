@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+from django.contrib.auth.models import User
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from products.models import Coupon, CouponUsage
+from products.coupons import CouponError, get_active_coupon, validate_coupon, redeem_coupon, invalidate_coupon_cache
+
+# Fixtures
+@pytest.fixture(autouse=True)
+def clear_coupon_cache():
+    cache.clear()
+    invalidate_coupon_cache()
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='testuser', password='password')
+
+@pytest.fixture
+def coupon():
+    return Coupon.objects.create(coupon_code="SALE10", discount_amount=10, minimum_amount=100)
+
+# Test Cases
+
+# 1. Cached lookups
+@pytest.mark.django_db
+def test_active_coupon_lookup_is_cached(coupon):
+    assert get_active_coupon("SALE10") == coupon
+    with CaptureQueriesContext(connection) as queries:
+        assert get_active_coupon("SALE10") == coupon
+        assert get_active_coupon("UNKNOWN") is None
+    assert len(queries) == 0
+
+@pytest.mark.django_db
+def test_admin_edit_invalidates_cache(coupon):
+    assert get_active_coupon("SALE10") is not None
+    coupon.is_expired = True
+    coupon.save()
+    assert get_active_coupon("SALE10") is None
+
+# 2. Validity windows
+@pytest.mark.django_db
+def test_validity_window(user):
+    now = timezone.now()
+    Coupon.objects.create(coupon_code="LATER", valid_from=now + timedelta(days=1), minimum_amount=0)
+    Coupon.objects.create(coupon_code="OVER", valid_until=now - timedelta(days=1), minimum_amount=0)
+
+    with pytest.raises(CouponError, match='not valid yet'):
+        validate_coupon("LATER", user, 1000)
+    with pytest.raises(CouponError, match='expired'):
+        validate_coupon("OVER", user, 1000)
+    with pytest.raises(CouponError, match='Invalid'):
+        validate_coupon("NOPE", user, 1000)
+
+@pytest.mark.django_db
+def test_minimum_amount(coupon, user):
+    with pytest.raises(CouponError, match='greater than 100'):
+        validate_coupon("SALE10", user, 50)
+    assert validate_coupon("SALE10", user, 150) == coupon
+
+# 3. Usage limits
+@pytest.mark.django_db
+def test_global_usage_limit(coupon, user):
+    coupon.usage_limit = 1
+    coupon.save()
+    other = User.objects.create_user(username='other', password='password')
+
+    assert redeem_coupon(coupon, user) is True
+    assert redeem_coupon(coupon, other) is False
+    with pytest.raises(CouponError, match='usage limit'):
+        validate_coupon("SALE10", other, 150)
+    coupon.refresh_from_db()
+    assert coupon.times_used == 1
+
+@pytest.mark.django_db
+def test_per_user_limit(coupon, user):
+    coupon.per_user_limit = 1
+    coupon.save()
+
+    assert redeem_coupon(coupon, user) is True
+    with pytest.raises(CouponError, match='already used'):
+        validate_coupon("SALE10", user, 150)
+    assert redeem_coupon(coupon, user) is False
+
+    coupon.refresh_from_db()
+    assert coupon.times_used == 1
+    assert CouponUsage.objects.get(coupon=coupon, user=user).times_used == 1
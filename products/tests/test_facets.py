@@ -0,0 +1,104 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.test import Client
+from django.http import QueryDict
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from products.models import Category, SizeVariant, ColorVariant, Product, ProductListing
+from products.facets import parse_filters, filter_products, get_facets
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def catalog():
+    shoes = Category.objects.create(category_name="Shoes")
+    shirts = Category.objects.create(category_name="Shirts")
+    small = SizeVariant.objects.create(size_name="S", order=1)
+    large = SizeVariant.objects.create(size_name="L", order=2)
+    red = ColorVariant.objects.create(color_name="Red")
+    blue = ColorVariant.objects.create(color_name="Blue")
+
+    def make(name, category, price, sizes, colors, newest=False):
+        product = Product.objects.create(product_name=name, category=category, price=price,
+                                         product_desription=name, newest_product=newest)
+        product.size_variant.set(sizes)
+        product.color_variant.set(colors)
+        return product
+
+    make("Runner", shoes, 400, [small, large], [red], newest=True)
+    make("Trail", shoes, 1200, [large], [blue])
+    make("Oxford", shirts, 700, [small, large], [red, blue])
+    make("Polo", shirts, 6000, [small], [])
+
+
+def options(facet):
+    return {option['value']: option['count'] for option in facet}
+
+
+def filters(query):
+    return parse_filters(QueryDict(query))
+
+
+@pytest.mark.django_db
+def test_facet_counts_without_filters(catalog):
+    facets = get_facets(filters(''))
+
+    assert facets['total'] == 4
+    assert options(facets['category']) == {'Shirts': 2, 'Shoes': 2}
+    assert [option['value'] for option in facets['size']] == ['S', 'L']
+    assert options(facets['size']) == {'S': 3, 'L': 3}
+    assert options(facets['color']) == {'Blue': 2, 'Red': 2}
+    assert options(facets['price']) == {'0-499': 1, '500-999': 1, '1000-2499': 1, '5000+': 1}
+
+
+@pytest.mark.django_db
+def test_each_facet_ignores_its_own_filter(catalog):
+    facets = get_facets(filters('category=Shoes&size=L'))
+
+    assert facets['total'] == 2
+    # Categories are counted with the size filter only, sizes with the category filter only
+    assert options(facets['category']) == {'Shirts': 1, 'Shoes': 2}
+    assert options(facets['size']) == {'S': 1, 'L': 2}
+    assert options(facets['color']) == {'Blue': 1, 'Red': 1}
+    assert [option['value'] for option in facets['category'] if option['selected']] == ['Shoes']
+
+
+@pytest.mark.django_db
+def test_filters_combine_and_ignore_unknown_buckets(catalog):
+    selected = filters('color=Red&color=Blue&price=500-999&price=1000-2499&price=bogus')
+
+    assert selected['price'] == ['1000-2499', '500-999']
+    names = filter_products(ProductListing.objects.all(), selected).values_list('product_name', flat=True)
+    assert sorted(names) == ['Oxford', 'Trail']
+
+
+@pytest.mark.django_db
+def test_facets_are_cached_until_the_catalog_changes(catalog):
+    get_facets(filters('size=S'))
+    with CaptureQueriesContext(connection) as queries:
+        get_facets(filters('size=S'))
+    assert len(queries.captured_queries) == 0
+
+    Product.objects.filter(product_name="Polo").first().save()
+    with CaptureQueriesContext(connection) as queries:
+        facets = get_facets(filters('size=S'))
+    assert len(queries.captured_queries) == 5
+    assert facets['total'] == 3
+
+
+@pytest.mark.django_db
+def test_index_page_filters_and_keeps_them_on_page_links(catalog):
+    client = Client()
+
+    response = client.get(reverse('index'), {'category': 'Shoes', 'sort': 'priceAsc'})
+
+    assert [product.product_name for product in response.context['products']] == ['Runner', 'Trail']
+    assert response.context['facets']['total'] == 2
+    assert 'category=Shoes' in response.context['querystring']
+    assert 'Shirts (1)' not in response.content.decode()
+    assert 'Shirts (2)' in response.content.decode()
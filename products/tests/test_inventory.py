@@ -0,0 +1,177 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+from django.contrib.auth.models import User
+from accounts.models import Cart, CartItem, StockReservation
+from products.models import Category, SizeVariant, Product, Inventory
+from products.inventory import (OutOfStock, reserve_cart, commit_cart, release_cart,
+                                release_expired_reservations, get_available_quantity)
+
+# Fixtures
+@pytest.fixture
+def size_variant():
+    return SizeVariant.objects.create(size_name="M", price=10)
+
+@pytest.fixture
+def product(size_variant):
+    category = Category.objects.create(category_name="Shoes")
+    product = Product.objects.create(
+        product_name="Runner", price=100, product_desription="Running shoe", category=category)
+    product.size_variant.add(size_variant)
+    return product
+
+@pytest.fixture
+def inventory(product, size_variant):
+    return Inventory.objects.create(product=product, size_variant=size_variant, quantity=5)
+
+def make_cart(username, product, size_variant, quantity=1):
+    user = User.objects.create_user(username=username, password='password')
+    cart = Cart.objects.create(user=user)
+    CartItem.objects.create(cart=cart, product=product, size_variant=size_variant, quantity=quantity)
+    return cart
+
+# Test Cases
+
+# 1. Untracked SKUs have no stock limit
+@pytest.mark.django_db
+def test_untracked_sku_has_no_limit(product, size_variant):
+    assert get_available_quantity(product, size_variant) is None
+    cart = make_cart('buyer', product, size_variant, quantity=50)
+    assert reserve_cart(cart) == []
+
+# 2. Reservation, commit and release
+@pytest.mark.django_db
+def test_reserve_and_commit(product, size_variant, inventory):
+    cart = make_cart('buyer', product, size_variant, quantity=2)
+    reserve_cart(cart)
+    inventory.refresh_from_db()
+    assert (inventory.quantity, inventory.reserved) == (5, 2)
+
+    # Reserving again replaces the previous reservation instead of stacking it
+    reserve_cart(cart)
+    inventory.refresh_from_db()
+    assert inventory.reserved == 2
+
+    commit_cart(cart)
+    inventory.refresh_from_db()
+    assert (inventory.quantity, inventory.reserved) == (3, 0)
+    assert not StockReservation.objects.filter(cart=cart).exists()
+
+@pytest.mark.django_db
+def test_reserve_out_of_stock(product, size_variant, inventory):
+    cart = make_cart('buyer', product, size_variant, quantity=6)
+    with pytest.raises(OutOfStock) as excinfo:
+        reserve_cart(cart)
+    assert excinfo.value.available == 5
+    inventory.refresh_from_db()
+    assert inventory.reserved == 0
+
+    # A cart that reserved before and grew past the stock keeps nothing reserved
+    CartItem.objects.filter(cart=cart).update(quantity=2)
+    reserve_cart(cart)
+    CartItem.objects.filter(cart=cart).update(quantity=6)
+    with pytest.raises(OutOfStock):
+        reserve_cart(cart)
+    inventory.refresh_from_db()
+    assert inventory.reserved == 0
+    assert not StockReservation.objects.filter(cart=cart).exists()
+
+@pytest.mark.django_db
+def test_release_cart(product, size_variant, inventory):
+    cart = make_cart('buyer', product, size_variant, quantity=3)
+    reserve_cart(cart)
+    assert release_cart(cart) == 1
+    inventory.refresh_from_db()
+    assert inventory.reserved == 0
+
+# 3. Expired reservations are released by the TTL sweep
+@pytest.mark.django_db
+def test_release_expired_reservations(product, size_variant, inventory):
+    cart = make_cart('buyer', product, size_variant, quantity=5)
+    reserve_cart(cart)
+    assert release_expired_reservations() == 0
+
+    assert release_expired_reservations(now=timezone.now() + timedelta(days=1)) == 1
+    inventory.refresh_from_db()
+    assert inventory.reserved == 0
+
+@pytest.mark.django_db
+def test_expired_reservation_does_not_block_other_buyers(product, size_variant, inventory):
+    abandoned = make_cart('abandoned', product, size_variant, quantity=5)
+    reserve_cart(abandoned)
+    StockReservation.objects.filter(cart=abandoned).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+    buyer = make_cart('buyer', product, size_variant, quantity=5)
+    reserve_cart(buyer)
+    inventory.refresh_from_db()
+    assert inventory.reserved == 5
+
+# 4. Concurrency stress test: many buyers racing for one hot SKU
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_reservations_never_oversell(product, size_variant, inventory):
+    buyers = 20
+    carts = [make_cart(f'buyer{i}', product, size_variant) for i in range(buyers)]
+    results = []
+    barrier = threading.Barrier(buyers)
+
+    def checkout(cart):
+        try:
+            barrier.wait()
+            for attempt in range(50):
+                try:
+                    reserve_cart(cart)
+                    results.append(True)
+                    return
+                except OutOfStock:
+                    results.append(False)
+                    return
+                except Exception:
+                    # SQLite serialises writers and may report the table as locked
+                    if connection.vendor != 'sqlite':
+                        raise
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=checkout, args=(cart,)) for cart in carts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    inventory.refresh_from_db()
+    assert results.count(True) == 5
+    assert inventory.reserved == 5
+    assert StockReservation.objects.filter(inventory=inventory).count() == 5
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_checkouts_of_one_cart_hold_one_reservation(product, size_variant, inventory):
+    cart = make_cart('buyer', product, size_variant, quantity=2)
+    workers = 8
+    barrier = threading.Barrier(workers)
+
+    def checkout():
+        try:
+            barrier.wait()
+            for attempt in range(50):
+                try:
+                    reserve_cart(cart)
+                    return
+                except Exception:
+                    # SQLite serialises writers and may report the table as locked
+                    if connection.vendor != 'sqlite':
+                        raise
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=checkout) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    inventory.refresh_from_db()
+    assert inventory.reserved == 2
+    assert StockReservation.objects.filter(cart=cart).count() == 1
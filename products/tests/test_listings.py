@@ -0,0 +1,119 @@
+from io import StringIO
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.test import Client
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from products.bulk import change_prices, set_newest
+from products.models import Category, Product, ProductImage, ProductListing, ProductReview
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def category():
+    return Category.objects.create(category_name="Shoes")
+
+
+@pytest.fixture
+def product(category):
+    return Product.objects.create(product_name="Runner", price=100, product_desription="x" * 5000, category=category)
+
+
+def listing(product):
+    return ProductListing.objects.get(pk=product.pk)
+
+
+@pytest.mark.django_db
+def test_listing_follows_product_image_review_and_category_changes(product, category):
+    row = listing(product)
+    assert (row.product_name, row.slug, row.price, row.category_name, row.image) == (
+        "Runner", product.slug, 100, "Shoes", '')
+
+    product.product_name = "Road Runner"
+    product.price = 120
+    product.save()
+    ProductImage.objects.create(product=product, image='product/runner.jpg')
+    user = User.objects.create_user(username='reviewer', password='password')
+    ProductReview.objects.create(product=product, user=user, stars=4, content="Good")
+    category.category_name = "Footwear"
+    category.save()
+
+    row = listing(product)
+    assert (row.product_name, row.price, row.image, row.category_name) == (
+        "Road Runner", 120, 'product/runner.jpg', "Footwear")
+    assert (row.review_count, row.rating) == (1, 4)
+
+    ProductImage.objects.filter(product=product).delete()
+    assert listing(product).image == ''
+
+    product.delete()
+    assert not ProductListing.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_edits_update_the_listing(product, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        change_prices(Product.objects.filter(price__lt=150), percent=100)
+        set_newest(Product.objects.all())
+
+    row = listing(product)
+    assert (row.price, row.newest_product) == (200, True)
+
+
+@pytest.mark.django_db
+def test_rebuild_command_restores_drifted_rows(product, category):
+    other = Product.objects.create(product_name="Trail", price=300, product_desription="", category=category)
+    ProductListing.objects.filter(pk=product.pk).update(price=1, popularity=7.5)
+    ProductListing.objects.filter(pk=other.pk).delete()
+
+    out = StringIO()
+    call_command('rebuild_product_listings', '--chunk-size', '1', stdout=out)
+
+    assert "2 products" in out.getvalue()
+    assert listing(product).price == 100
+    # Popularity is owned by the popularity job, rebuilding keeps it
+    assert listing(product).popularity == 7.5
+    assert listing(other).price == 300
+
+
+@pytest.mark.django_db
+def test_grid_pages_read_only_the_listing_table(product):
+    ProductImage.objects.create(product=product, image='product/runner.jpg')
+    client = Client()
+    client.get(reverse('index'))  # fills the facet and wishlist count caches
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('index'))
+
+    assert response.status_code == 200
+    assert 'product/runner.jpg' in response.content.decode()
+    sql = ' '.join(query['sql'] for query in queries.captured_queries)
+    assert 'products_productlisting' in sql
+    assert 'products_product"' not in sql and 'product_desription' not in sql
+    assert len(queries.captured_queries) == 1
+
+    response = client.get(reverse('product_search'), {'q': 'Run'})
+    assert [product.product_name for product in response.context['products']] == ['Runner']
+
+
+@pytest.mark.django_db
+def test_related_products_come_from_the_listing_table(product, category):
+    for name in ("Walker", "Trail"):
+        related = Product.objects.create(product_name=name, price=90, product_desription="x", category=category)
+        ProductImage.objects.create(product=related, image=f'product/{name.lower()}.jpg')
+    Product.objects.create(product_name="Walker Wide", price=90, product_desription="x", category=category,
+                           parent=Product.objects.get(product_name="Walker"))
+
+    response = Client().get(reverse('get_product', args=[product.slug]))
+
+    assert sorted(row.product_name for row in response.context['related_products']) == ['Trail', 'Walker']
+    assert all(isinstance(row, ProductListing) for row in response.context['related_products'])
+    assert 'product/walker.jpg' in response.content.decode()
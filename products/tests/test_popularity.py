@@ -0,0 +1,164 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.urls import reverse
+from django.test import Client
+from django.utils import timezone
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from accounts.models import Order, OrderItem
+from products.models import CatalogChange, Category, PopularityState, Product, ProductListing, Wishlist
+from products.popularity import HALF_LIFE, RUN_TIMEOUT, WEIGHTS, update_popularity
+
+
+@pytest.fixture
+def products():
+    category = Category.objects.create(category_name="Shoes")
+    return [
+        Product.objects.create(product_name=f"Shoe {i}", price=100 * (i + 1), product_desription="", category=category)
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='buyer', password='password')
+
+
+def order(user, product, quantity, when):
+    placed = Order.objects.create(user=user, order_id=f"order-{Order.objects.count()}", payment_status='paid',
+                                  payment_mode='razorpay', order_total_price=0, grand_total=0)
+    Order.objects.filter(pk=placed.pk).update(order_date=when)
+    OrderItem.objects.create(order=placed, product=product, quantity=quantity)
+
+
+def scores():
+    return dict(ProductListing.objects.values_list('product__product_name', 'popularity'))
+
+
+@pytest.mark.django_db
+def test_first_run_scores_recent_events_with_decay(products, user):
+    now = timezone.now()
+    order(user, products[0], 2, now - timedelta(minutes=10))
+    order(user, products[1], 2, now - HALF_LIFE)
+    Wishlist.objects.create(user=user, product=products[2])
+    Wishlist.objects.update(added_on=now - timedelta(minutes=10))
+
+    assert update_popularity(now=now) == 3
+
+    result = scores()
+    assert result["Shoe 0"] == pytest.approx(2 * WEIGHTS['order'], rel=0.05)
+    # An order one half-life old counts about half
+    assert result["Shoe 1"] == pytest.approx(WEIGHTS['order'], rel=0.1)
+    assert result["Shoe 2"] == pytest.approx(WEIGHTS['wishlist'], rel=0.05)
+    state = PopularityState.objects.get()
+    assert (state.scored_until, state.started_at, state.product_count) == (now, None, 3)
+    # Runs are not bulk catalog edits, the admin audit log stays clean
+    assert not CatalogChange.objects.exists()
+
+
+@pytest.mark.django_db
+def test_later_runs_decay_and_add_only_new_events(products, user):
+    now = timezone.now()
+    order(user, products[0], 1, now - timedelta(minutes=5))
+    update_popularity(now=now)
+    first = scores()["Shoe 0"]
+
+    later = now + HALF_LIFE
+    order(user, products[1], 1, later - timedelta(minutes=5))
+    assert update_popularity(now=later) == 1
+
+    result = scores()
+    assert result["Shoe 0"] == pytest.approx(first / 2)
+    # Events are aged per day, so a week-long gap between runs is accurate to about half a day
+    assert result["Shoe 1"] == pytest.approx(WEIGHTS['order'], rel=0.05)
+
+    # Long idle products fall back to zero instead of decaying forever
+    update_popularity(now=later + HALF_LIFE * 20)
+    assert set(scores().values()) == {0}
+
+
+@pytest.mark.django_db
+def test_overlapping_runs_are_skipped(products, user):
+    now = timezone.now()
+    order(user, products[0], 1, now - timedelta(minutes=5))
+    update_popularity(now=now)
+    first = scores()["Shoe 0"]
+
+    # Another run is in the middle of its batches
+    PopularityState.objects.update(started_at=timezone.now())
+    assert update_popularity(now=now + timedelta(hours=1)) is None
+    out = StringIO()
+    call_command('update_popularity', stdout=out)
+    assert "still running" in out.getvalue()
+    assert scores()["Shoe 0"] == first
+
+
+@pytest.mark.django_db
+def test_runs_after_a_crash_rebuild_instead_of_adding_twice(products, user, monkeypatch):
+    now = timezone.now()
+    order(user, products[0], 1, now - timedelta(minutes=5))
+    update_popularity(now=now)
+    expected = scores()["Shoe 0"]
+
+    # Killed after adding its scores but before moving the watermark
+    later = now + timedelta(hours=1)
+    ProductListing.objects.update(popularity=expected * 2)
+    PopularityState.objects.update(started_at=timezone.now() - RUN_TIMEOUT * 2)
+    update_popularity(now=later)
+    assert scores()["Shoe 0"] == pytest.approx(expected, rel=0.01)
+    assert PopularityState.objects.get().started_at is None
+
+    # An error part way through makes the next run rebuild straight away
+    monkeypatch.setattr('products.popularity.add_scores', lambda increments: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        update_popularity(now=later + timedelta(hours=1))
+    monkeypatch.undo()
+    assert PopularityState.objects.get().scored_until is None
+    update_popularity(now=later + timedelta(hours=2))
+    assert scores()["Shoe 0"] == pytest.approx(expected, rel=0.01)
+
+
+@pytest.mark.django_db
+def test_rebuild_recomputes_from_events(products, user):
+    now = timezone.now()
+    order(user, products[0], 1, now - timedelta(minutes=5))
+    update_popularity(now=now)
+    ProductListing.objects.update(popularity=1000)
+
+    out = StringIO()
+    call_command('update_popularity', '--rebuild', stdout=out)
+
+    assert "1 products earned score" in out.getvalue()
+    assert scores()["Shoe 0"] == pytest.approx(WEIGHTS['order'], rel=0.05)
+    assert scores()["Shoe 1"] == 0
+
+
+@pytest.mark.django_db
+def test_popular_sort_on_index_and_listing_api(products):
+    for product, score in zip(products, [5, 20, 10]):
+        ProductListing.objects.filter(pk=product.pk).update(popularity=score)
+    client = Client()
+
+    response = client.get(reverse('index'), {'sort': 'popular'})
+    assert [listing.product_name for listing in response.context['products']] == ["Shoe 1", "Shoe 2", "Shoe 0"]
+
+    data = client.get(reverse('catalog_listing')).json()
+    assert [item['product_name'] for item in data['products']] == ["Shoe 1", "Shoe 2", "Shoe 0"]
+    assert data['next_cursor'] is None
+
+    data = client.get(reverse('catalog_listing'), {'sort': 'priceDesc', 'price': '0-499'}).json()
+    assert [item['product_name'] for item in data['products']] == ["Shoe 2", "Shoe 1", "Shoe 0"]
+
+
+@pytest.mark.django_db
+def test_listing_api_pages_by_cursor(products, monkeypatch):
+    monkeypatch.setattr('products.views.LISTING_PER_PAGE', 2)
+    client = Client()
+
+    page = client.get(reverse('catalog_listing'), {'sort': 'priceAsc'}).json()
+    assert [item['price'] for item in page['products']] == [100, 200]
+    page = client.get(reverse('catalog_listing'), {'sort': 'priceAsc', 'cursor': page['next_cursor']}).json()
+    assert [item['price'] for item in page['products']] == [300]
+    assert page['next_cursor'] is None
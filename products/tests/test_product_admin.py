@@ -0,0 +1,49 @@
+import pytest
+from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from products.models import Category, ColorVariant, SizeVariant, Product, ProductReview, Wishlist, Inventory
+
+# Fixtures
+@pytest.fixture
+def category():
+    return Category.objects.create(category_name="Shoes")
+
+def add_products(category, count, offset=0):
+    size_variant = SizeVariant.objects.create(size_name=f"M-{offset}", price=10)
+    color_variant = ColorVariant.objects.create(color_name=f"Red-{offset}", price=0)
+    for i in range(offset, offset + count):
+        user = User.objects.create_user(username=f'shopper{i}', password='password')
+        product = Product.objects.create(
+            product_name=f"Product {i}", price=100, product_desription="Product", category=category)
+        Inventory.objects.create(product=product, size_variant=size_variant, color_variant=color_variant, quantity=5)
+        ProductReview.objects.create(product=product, user=user, stars=4)
+        Wishlist.objects.create(user=user, product=product, size_variant=size_variant)
+
+def changelist_queries(client, url):
+    # Warm up the per-user caches (navbar counts) so only the page itself is measured
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(queries)
+
+# Test Cases
+
+# 1. Changelist pages cost the same number of queries for 3 or 12 rows
+@pytest.mark.django_db
+@pytest.mark.parametrize('model', ['product', 'inventory', 'productreview', 'wishlist'])
+def test_changelist_query_count_is_constant(admin_client, category, model):
+    url = reverse(f'admin:products_{model}_changelist')
+    add_products(category, 3)
+    few = changelist_queries(admin_client, url)
+    add_products(category, 9, offset=3)
+    assert changelist_queries(admin_client, url) == few
+
+# 2. Search goes through the indexed columns
+@pytest.mark.django_db
+def test_product_search(admin_client, category):
+    add_products(category, 3)
+    response = admin_client.get(reverse('admin:products_product_changelist'), {'q': '"Product 1"'})
+    assert [product.product_name for product in response.context['cl'].result_list] == ["Product 1"]
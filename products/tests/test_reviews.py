@@ -0,0 +1,77 @@
+import pytest
+from django.urls import reverse
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from products.reviews import rebuild_review_stats
+from products.models import Category, Product, ProductReview, ProductReviewStats
+
+# Fixtures
+@pytest.fixture
+def product():
+    category = Category.objects.create(category_name="Shoes")
+    return Product.objects.create(product_name="Runner", price=100, product_desription="Runner", category=category)
+
+def add_reviews(product, stars_list, offset=0):
+    for i, stars in enumerate(stars_list, start=offset):
+        user = User.objects.create_user(username=f'reviewer{i}', password='password', first_name=f'Name{i}')
+        ProductReview.objects.create(product=product, user=user, stars=stars, content=f"Review {i}")
+
+def stats(product):
+    row = ProductReviewStats.objects.get(product=product)
+    return row.review_count, row.rating_total, [bucket['count'] for bucket in row.get_star_histogram()]
+
+# Test Cases
+
+# 1. Aggregates and histogram follow reviews being added, edited and deleted
+@pytest.mark.django_db
+def test_review_stats_are_kept_incrementally(product):
+    add_reviews(product, [5, 4, 4])
+    assert stats(product) == (3, 13, [1, 2, 0, 0, 0])
+
+    review = ProductReview.objects.get(content="Review 1")
+    review.stars = 1
+    review.save()
+    assert stats(product) == (3, 10, [1, 1, 0, 0, 1])
+
+    review.delete()
+    assert stats(product) == (2, 9, [1, 1, 0, 0, 0])
+    assert Product.objects.get(pk=product.pk).get_rating() == 4.5
+
+    ProductReviewStats.objects.all().delete()
+    rebuild_review_stats(Product.objects.all())
+    assert stats(product) == (2, 9, [1, 1, 0, 0, 0])
+
+# 2. The product page costs the same number of queries for 3 or 30 reviews
+@pytest.mark.django_db
+def test_product_page_query_count_is_constant(product):
+    client = Client()
+    url = reverse('get_product', args=[product.slug])
+    add_reviews(product, [5, 4, 3])
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    few = len(queries)
+    assert len(response.context['reviews']) == 3
+
+    add_reviews(product, [2] * 27, offset=3)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert len(queries) == few
+    assert len(response.context['reviews']) == 10
+    assert response.context['reviews_next_cursor']
+
+# 3. "Load more" pages through all reviews by cursor
+@pytest.mark.django_db
+def test_review_endpoint_pages_by_cursor(product):
+    add_reviews(product, [3] * 25)
+    client = Client()
+    seen, cursor = [], None
+    while True:
+        data = client.get(reverse('product_reviews', args=[product.slug]), {'cursor': cursor or ''}).json()
+        seen.extend(review['content'] for review in data['reviews'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(f"Review {i}" for i in range(25))
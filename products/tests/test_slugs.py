@@ -0,0 +1,69 @@
+import pytest
+from django.urls import reverse
+from django.db import connection
+from django.core.cache import cache
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from products.slugs import assign_slugs, unique_slug
+from products.models import Category, Product
+
+# Fixtures
+@pytest.fixture
+def category():
+    return Category.objects.create(category_name="Shoes")
+
+def make_product(category, name):
+    return Product.objects.create(product_name=name, price=100, product_desription=name, category=category)
+
+# Test Cases
+
+# 1. Colliding names get numbered slugs from one prefix query
+@pytest.mark.django_db
+def test_colliding_names_get_unique_slugs(category):
+    slugs = [make_product(category, "Air Runner").slug for _ in range(3)]
+    assert slugs == ['air-runner', 'air-runner-2', 'air-runner-3']
+
+    with CaptureQueriesContext(connection) as queries:
+        assert unique_slug(Product, "Air Runner") == 'air-runner-4'
+    assert len(queries) == 1
+
+@pytest.mark.django_db
+def test_assign_slugs_in_bulk(category):
+    make_product(category, "Cap")
+    products = [Product(product_name=name) for name in ("Cap", "Cap", "Sock")]
+    with CaptureQueriesContext(connection) as queries:
+        assign_slugs(Product, products, 'product_name')
+    assert len(queries) == 1
+    assert [product.slug for product in products] == ['cap-2', 'cap-3', 'sock']
+
+# 2. Slugs only change when the name does
+@pytest.mark.django_db
+def test_slug_is_kept_on_unrelated_saves(category):
+    product = make_product(category, "Runner")
+    product = Product.objects.get(pk=product.pk)
+    product.price = 200
+    with CaptureQueriesContext(connection) as queries:
+        product.save()
+    assert product.slug == 'runner'
+    assert not any('LIKE' in query['sql'] for query in queries)
+
+# 3. Renamed products redirect from their old slugs
+@pytest.mark.django_db
+def test_renamed_product_redirects(category):
+    cache.clear()
+    product = Product.objects.get(pk=make_product(category, "Runner").pk)
+    product.product_name = "Trail Runner"
+    product.save()
+    product.product_name = "Trail Runner Pro"
+    product.save()
+
+    client = Client()
+    for old_slug in ('runner', 'trail-runner'):
+        response = client.get(reverse('get_product', args=[old_slug]))
+        assert response.status_code == 301
+        assert response['Location'] == reverse('get_product', args=['trail-runner-pro'])
+    assert client.get(reverse('get_product', args=['unknown'])).status_code == 404
+
+    # A new product taking the old slug wins over the redirect
+    make_product(category, "Runner")
+    assert client.get(reverse('get_product', args=['runner'])).status_code != 301
@@ -0,0 +1,109 @@
+import pytest
+from django.urls import reverse
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from products.variants import get_size_variant, get_product_sizes, get_variant_matrix
+from django.contrib.auth.models import User
+from products.models import Category, ColorVariant, SizeVariant, Product, Wishlist
+
+# Fixtures
+@pytest.fixture
+def sizes():
+    return {name: SizeVariant.objects.create(size_name=name, price=price, order=order)
+            for name, price, order in (("S", 0, 1), ("M", 10, 2), ("XL", 30, 4))}
+
+@pytest.fixture
+def product(sizes):
+    category = Category.objects.create(category_name="Shirts")
+    product = Product.objects.create(product_name="Tee", price=100, product_desription="Tee", category=category)
+    product.size_variant.add(sizes["M"], sizes["S"])
+    return product
+
+# Test Cases
+
+# 1. Lookups are served from memory once loaded
+@pytest.mark.django_db
+def test_size_lookup_does_not_query(sizes):
+    get_size_variant("S")
+    with CaptureQueriesContext(connection) as queries:
+        assert get_size_variant("M") == sizes["M"]
+        assert get_size_variant("XXL") is None
+    assert len(queries) == 0
+
+@pytest.mark.django_db
+def test_registry_reloads_after_variant_changes(sizes):
+    assert get_size_variant("M").price == 10
+    sizes["M"].price = 15
+    sizes["M"].save()
+    assert get_size_variant("M").price == 15
+
+    # Duplicate names no longer raise, the first in size order wins
+    SizeVariant.objects.create(size_name="M", price=99, order=9)
+    assert get_size_variant("M").pk == sizes["M"].pk
+
+@pytest.mark.django_db
+def test_duplicate_size_names_resolve_to_the_product_size(product, sizes):
+    other_m = SizeVariant.objects.create(size_name="M", price=50, order=9)
+    shirt = Product.objects.create(product_name="Shirt", price=200, product_desription="Shirt",
+                                   category=product.category)
+    shirt.size_variant.add(other_m)
+
+    assert get_size_variant("M", product=shirt) == other_m
+    assert get_size_variant("M", product=product) == sizes["M"]
+    assert shirt.get_product_price_by_size("M") == 250
+
+    user = User.objects.create_user(username='shopper', password='password')
+    client = Client()
+    client.force_login(user)
+    client.get(reverse('add_to_wishlist', args=[shirt.uid]), {'size': 'M'})
+    assert Wishlist.objects.get(user=user).size_variant == other_m
+    client.get(reverse('remove_from_wishlist', args=[shirt.uid]), {'size': 'M'})
+    assert not Wishlist.objects.filter(user=user).exists()
+
+    # A size detached from the product after it was wishlisted can still be removed
+    client.get(reverse('add_to_wishlist', args=[shirt.uid]), {'size': 'M'})
+    shirt.size_variant.remove(other_m)
+    assert get_size_variant("M", product=shirt) is None
+    response = client.get(reverse('remove_from_wishlist', args=[shirt.uid]), {'size': 'M'})
+    assert response.status_code == 302
+    assert not Wishlist.objects.filter(user=user).exists()
+    assert client.get(reverse('remove_from_wishlist', args=[shirt.uid]), {'size': 'XL'}).status_code == 404
+
+# 2. Prices only for sizes attached to the product
+@pytest.mark.django_db
+def test_price_is_restricted_to_product_sizes(product):
+    assert product.get_product_price_by_size("M") == 110
+    assert product.get_product_price_by_size("XL") is None
+    assert [size.size_name for size in get_product_sizes(product)] == ["S", "M"]
+
+@pytest.mark.django_db
+def test_product_page_ignores_unattached_size(product):
+    response = Client().get(reverse('get_product', args=[product.slug]), {'size': 'XL'})
+    assert 'updated_price' not in response.context
+    response = Client().get(reverse('get_product', args=[product.slug]), {'size': 'M'})
+    assert response.context['updated_price'] == 110
+
+# 3. Variant matrix with every size/color price
+@pytest.mark.django_db
+def test_variant_matrix(product):
+    red = ColorVariant.objects.create(color_name="Red", price=5)
+    product.color_variant.add(red)
+
+    response = Client().get(reverse('product_variants', args=[product.slug]))
+    assert response.json() == {
+        'base_price': 100,
+        'sizes': [{'name': 'S', 'price': 100}, {'name': 'M', 'price': 110}],
+        'colors': [{'name': 'Red', 'price': 5}],
+        'variants': [{'size': 'S', 'color': 'Red', 'price': 105}, {'size': 'M', 'color': 'Red', 'price': 115}],
+    }
+
+@pytest.mark.django_db
+def test_variant_matrix_is_cached_until_the_product_changes(product):
+    assert len(get_variant_matrix(product)['sizes']) == 2
+    with CaptureQueriesContext(connection) as queries:
+        get_variant_matrix(product)
+    assert len(queries) == 0
+
+    product.size_variant.remove(SizeVariant.objects.get(size_name="S"))
+    assert [size['name'] for size in get_variant_matrix(product)['sizes']] == ["M"]
@@ -0,0 +1,69 @@
+import pytest
+from django.urls import reverse
+from django.db import connection
+from django.test import Client
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from products.wishlists import get_wishlist_count
+from products.models import Category, ColorVariant, SizeVariant, Product, ProductImage, Wishlist
+
+# Fixtures
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='testuser', password='password')
+
+@pytest.fixture
+def client(user):
+    client = Client()
+    client.login(username='testuser', password='password')
+    return client
+
+def add_items(user, count, offset=0):
+    category = Category.objects.create(category_name=f"Category {offset}")
+    size_variant = SizeVariant.objects.create(size_name=f"M-{offset}", price=10)
+    color_variant = ColorVariant.objects.create(color_name=f"Red-{offset}")
+    for i in range(offset, offset + count):
+        product = Product.objects.create(
+            product_name=f"Product {i}", price=100, product_desription="Product", category=category)
+        product.color_variant.add(color_variant)
+        ProductImage.objects.create(product=product, image=f'product/{i}.jpg')
+        Wishlist.objects.create(user=user, product=product, size_variant=size_variant)
+
+def page_queries(client):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('wishlist'))
+    assert response.status_code == 200
+    return len(queries), response
+
+# Test Cases
+
+# 1. The wishlist page renders in a constant number of queries
+@pytest.mark.django_db
+def test_wishlist_query_count_is_constant(client, user):
+    cache.clear()
+    add_items(user, 3)
+    page_queries(client)
+    few, response = page_queries(client)
+    assert b'product/0.jpg' in response.content
+    assert b'110.00' in response.content
+
+    add_items(user, 17, offset=3)
+    page_queries(client)
+    many, response = page_queries(client)
+    assert many == few
+    assert len(response.context['wishlist_items']) == 20
+
+# 2. The count is cached and shared with the navbar badge
+@pytest.mark.django_db
+def test_wishlist_count_follows_changes(client, user):
+    cache.clear()
+    add_items(user, 2)
+    assert get_wishlist_count(user) == 2
+    with CaptureQueriesContext(connection) as queries:
+        assert get_wishlist_count(user) == 2
+    assert len(queries) == 0
+
+    Wishlist.objects.filter(user=user).first().delete()
+    assert get_wishlist_count(user) == 1
+    assert b'Wishlist (1)' in client.get(reverse('wishlist')).content
@@ -1,10 +1,14 @@
 from django.urls import path
-from products.views import get_product, wishlist_view, add_to_wishlist, move_to_cart, remove_from_wishlist
+from products.views import catalog_listing, get_product, product_variants, product_reviews, wishlist_view, add_to_wishlist, move_to_cart, remove_from_wishlist, move_wishlist_items_to_cart
 
 urlpatterns = [
     path('wishlist/', wishlist_view, name='wishlist'),
     path('wishlist/add/<uid>/', add_to_wishlist, name='add_to_wishlist'),
+    path('wishlist/move_to_cart/', move_wishlist_items_to_cart, name='move_wishlist_items_to_cart'),
     path('wishlist/move_to_cart/<uid>/', move_to_cart, name='move_to_cart'),
     path('wishlist/remove/<uid>/', remove_from_wishlist, name='remove_from_wishlist'),
+    path('listing/', catalog_listing, name='catalog_listing'),
+    path('<slug>/variants/', product_variants, name='product_variants'),
+    path('<slug>/reviews/', product_reviews, name='product_reviews'),
     path('<slug>/', get_product, name='get_product'),
 ]
@@ -0,0 +1,125 @@
+import threading
+
+from django.core.cache import cache
+
+from products.cache import get_or_build
+from products.models import ColorVariant, Product, SizeVariant
+
+VERSION_KEY = 'variants:version'
+
+_lock = threading.Lock()
+_state = {'version': None, 'loaded': False, 'sizes': {}, 'colors': {}, 'size_names': {}, 'color_names': {}}
+
+
+def invalidate_variant_cache():
+    """Tells every worker to reload the size and color variants on its next lookup."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+    with _lock:
+        _state['loaded'] = False
+
+
+def _by_name(variants, field):
+    # Several variants may share a name, each name keeps all of them in sort order
+    names = {}
+    for variant in variants:
+        names.setdefault(getattr(variant, field), []).append(variant)
+    return names
+
+
+def _pick(variants, product, field):
+    # Without a product the first in sort order wins, with one the first attached to it
+    if not variants:
+        return None
+    if product is None:
+        return variants[0]
+    attached = _attached_ids(product, field)
+    return next((variant for variant in variants if variant.pk in attached), None)
+
+
+def _registry():
+    """
+    Size and color variants of the whole shop, loaded with two queries once per
+    worker and reloaded only when a variant is edited. The instances are
+    shared, treat them as read-only.
+    """
+    version = cache.get(VERSION_KEY)
+    with _lock:
+        if not _state['loaded'] or version != _state['version']:
+            sizes = list(SizeVariant.objects.order_by('order', 'size_name', 'pk'))
+            colors = list(ColorVariant.objects.order_by('color_name', 'pk'))
+            _state.update({
+                'version': version,
+                'loaded': True,
+                'sizes': {size.pk: size for size in sizes},
+                'colors': {color.pk: color for color in colors},
+                'size_names': _by_name(sizes, 'size_name'),
+                'color_names': _by_name(colors, 'color_name'),
+            })
+        return _state
+
+
+def _attached_ids(product, field):
+    # Reuse prefetched variants when the caller has them, otherwise read the M2M table only
+    prefetched = getattr(product, '_prefetched_objects_cache', {})
+    if field in prefetched:
+        return {variant.pk for variant in prefetched[field]}
+    through = getattr(Product, field).through
+    column = 'sizevariant_id' if field == 'size_variant' else 'colorvariant_id'
+    return set(through.objects.filter(product_id=product.pk).values_list(column, flat=True))
+
+
+def get_size_variant(size_name, product=None):
+    """
+    Returns the size variant called size_name, or None. With a product, only a
+    size attached to that product is returned.
+    """
+    return _pick(_registry()['size_names'].get(size_name), product, 'size_variant')
+
+
+def get_color_variant(color_name, product=None):
+    return _pick(_registry()['color_names'].get(color_name), product, 'color_variant')
+
+
+def get_product_sizes(product):
+    """Sizes attached to the product, in the shop's size order."""
+    sizes = _registry()['sizes']
+    attached = _attached_ids(product, 'size_variant')
+    return [size for pk, size in sizes.items() if pk in attached]
+
+
+def get_product_colors(product):
+    colors = _registry()['colors']
+    attached = _attached_ids(product, 'color_variant')
+    return [color for pk, color in colors.items() if pk in attached]
+
+
+def build_variant_matrix(product):
+    sizes = get_product_sizes(product)
+    colors = get_product_colors(product)
+    variants = [
+        {
+            'size': size.size_name if size else None,
+            'color': color.color_name if color else None,
+            'price': product.price + (size.price if size else 0) + (color.price if color else 0),
+        }
+        for size in (sizes or [None]) for color in (colors or [None])
+        if size or color
+    ]
+    return {
+        'base_price': product.price,
+        'sizes': [{'name': size.size_name, 'price': product.price + size.price} for size in sizes],
+        'colors': [{'name': color.color_name, 'price': color.price} for color in colors],
+        'variants': variants,
+    }
+
+
+def get_variant_matrix(product):
+    """
+    Final price of every size, and of every valid size/color combination, of
+    the product. Cached under the catalog version, so any product or variant
+    edit rebuilds it.
+    """
+    return get_or_build('variant-matrix', lambda: build_variant_matrix(product), product.pk)
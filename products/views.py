@@ -1,18 +1,39 @@
+import json
+import uuid
 import random
 from .forms import ReviewForm
 from django.urls import reverse
 from django.contrib import messages
-from accounts.models import Cart, CartItem
+from django.db import transaction
+from accounts.carts import get_open_cart, add_cart_item, move_wishlist_to_cart
+from django.http import Http404, JsonResponse
 from django.contrib.auth.decorators import login_required
-from products.models import Product, SizeVariant, ProductReview, Wishlist
+from django.views.decorators.http import require_POST
+from products.models import Product, ProductListing, ProductReview, Wishlist
+from products.inventory import get_available_quantity
+from products.slugs import resolve_slug_redirect
+from products.variants import get_size_variant, get_product_sizes, get_variant_matrix
+from products.reviews import get_reviews_page
+from products.wishlists import get_wishlist_page
+from products.facets import parse_filters, filter_products
+from products.listings import GRID_FIELDS, LISTING_PER_PAGE, LISTING_SORTS, grid_listings
+from base.pagination import paginate_keyset
 from django.shortcuts import render, redirect, get_object_or_404
 
 # Create your views here.
 
 def get_product(request, slug):
-    product = get_object_or_404(Product, slug=slug)
-    sorted_size_variants = product.size_variant.all().order_by('size_name')
-    related_products = list(product.category.products.filter(parent=None).exclude(uid=product.uid))
+    try:
+        product = Product.objects.select_related('category', 'review_stats').get(slug=slug)
+    except Product.DoesNotExist:
+        # Renamed products keep their old links working
+        new_slug = resolve_slug_redirect(Product, slug)
+        if new_slug is None:
+            raise Http404("No Product matches the given query.")
+        return redirect('get_product', slug=new_slug, permanent=True)
+    sorted_size_variants = get_product_sizes(product)
+    related_products = list(grid_listings().filter(category_id=product.category_id, product__parent=None)
+                            .exclude(product_id=product.pk))
 
     # Review product view
     review = None
@@ -23,10 +44,12 @@ def get_product(request, slug):
         except ProductReview.DoesNotExist:
             review = None
     
-    # Calculate the rating percentage
-    rating_percentage = 0
-    if product.reviews.exists():
-        rating_percentage = (product.get_rating() / 5) * 100
+    # Calculate the rating percentage from the stored aggregates
+    review_stats = product.get_review_stats()
+    rating_percentage = (review_stats.get_rating() / 5) * 100
+
+    # First page of reviews, the rest is loaded from product_reviews
+    reviews, reviews_next_cursor = get_reviews_page(product)
 
     # Handle form submission
     if request.method == 'POST' and request.user.is_authenticated:
@@ -62,18 +85,70 @@ def get_product(request, slug):
         'related_products': related_products,
         'review_form': review_form,
         'rating_percentage': rating_percentage,
+        'review_stats': review_stats,
+        'reviews': reviews,
+        'reviews_next_cursor': reviews_next_cursor,
         'in_wishlist': in_wishlist,
+        'variant_matrix': get_variant_matrix(product),
     }
 
-    if request.GET.get('size'):
-        size = request.GET.get('size')
-        price = product.get_product_price_by_size(size)
-        context['selected_size'] = size
-        context['updated_price'] = price
+    size_variant = get_size_variant(request.GET.get('size'), product=product)
+    if size_variant:
+        context['selected_size'] = size_variant.size_name
+        context['updated_price'] = product.price + size_variant.price
 
     return render(request, 'product/product.html', context=context)
 
 
+# Prices of every size/color combination, the product page switches sizes with it client-side
+def product_variants(request, slug):
+    product = get_object_or_404(Product, slug=slug)
+    return JsonResponse(get_variant_matrix(product))
+
+
+# "Load more" for product reviews, pages by cursor
+def product_reviews(request, slug):
+    product = get_object_or_404(Product, slug=slug)
+    reviews, next_cursor = get_reviews_page(product, request.GET.get('cursor'))
+    return JsonResponse({
+        'reviews': [
+            {
+                'user': review.user.get_full_name(),
+                'stars': review.stars,
+                'content': review.content or '',
+                'date_added': review.date_added.strftime('%Y-%m-%d'),
+            }
+            for review in reviews
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+# Catalog grid as JSON, filtered like the index page and paged by cursor
+def catalog_listing(request):
+    sort = request.GET.get('sort')
+    if sort not in LISTING_SORTS:
+        sort = 'popular'
+    listings = filter_products(
+        ProductListing.objects.only(*GRID_FIELDS, 'rating', 'popularity'), parse_filters(request.GET))
+    listings, next_cursor = paginate_keyset(
+        listings, LISTING_SORTS[sort], request.GET.get('cursor'), per_page=LISTING_PER_PAGE)
+    return JsonResponse({
+        'products': [
+            {
+                'slug': listing.slug,
+                'product_name': listing.product_name,
+                'price': listing.price,
+                'image': listing.image,
+                'rating': listing.rating,
+                'popularity': listing.popularity,
+            }
+            for listing in listings
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
 # Add a product to Wishlist
 @login_required
 def add_to_wishlist(request, uid):
@@ -83,7 +158,9 @@ def add_to_wishlist(request, uid):
         return redirect(request.META.get('HTTP_REFERER'))
     
     product = get_object_or_404(Product, uid=uid)
-    size_variant = get_object_or_404(SizeVariant, size_name=variant)
+    size_variant = get_size_variant(variant, product=product)
+    if size_variant is None:
+        raise Http404("This product does not come in that size.")
     wishlist, created = Wishlist.objects.get_or_create(user=request.user, product=product, size_variant=size_variant)
 
     if created:
@@ -99,8 +176,15 @@ def remove_from_wishlist(request, uid):
     size_variant_name = request.GET.get('size')
     
     if size_variant_name:
-        size_variant = get_object_or_404(SizeVariant, size_name=size_variant_name)
-        Wishlist.objects.filter(user=request.user, product=product, size_variant=size_variant).delete()
+        size_variant = get_size_variant(size_variant_name, product=product)
+        if size_variant is not None:
+            Wishlist.objects.filter(user=request.user, product=product, size_variant=size_variant).delete()
+        else:
+            # The size was detached from the product after it was wishlisted, the row is still removable
+            deleted, _ = Wishlist.objects.filter(
+                user=request.user, product=product, size_variant__size_name=size_variant_name).delete()
+            if not deleted:
+                raise Http404("Unknown size.")
     else:
         Wishlist.objects.filter(user=request.user, product=product).delete()
 
@@ -111,13 +195,14 @@ def remove_from_wishlist(request, uid):
 # Wishlist View
 @login_required
 def wishlist_view(request):
-    wishlist_items = Wishlist.objects.filter(user=request.user)
+    wishlist_items = get_wishlist_page(request.user, request.GET.get('page', 1))
     return render(request, 'product/wishlist.html', 
                   {'wishlist_items': wishlist_items,}
                   )
 
 
 # Move to cart functionality on wishlist page.
+@login_required
 def move_to_cart(request, uid):
     product = get_object_or_404(Product, uid=uid)
 
@@ -130,18 +215,49 @@ def move_to_cart(request, uid):
     
     size_variant = wishlist.size_variant
 
-    # Remove from wishlist
-    wishlist.delete()
-
-    # Get or create the user's cart
-    cart, created = Cart.objects.get_or_create(user=request.user, is_paid=False)
-
-    # Add the product to the cart with the size variant
-    cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product, size_variant=size_variant)
+    available = get_available_quantity(product, size_variant)
+    if available is not None and available < 1:
+        messages.error(request, "Sorry, this item is out of stock.")
+        return redirect('wishlist')
 
-    if not created:
-        cart_item.quantity += 1
-        cart_item.save()
+    with transaction.atomic():
+        # Only the request that deletes the wishlist row moves it, so a double click adds it once
+        deleted, _ = Wishlist.objects.filter(pk=wishlist.pk).delete()
+        if deleted:
+            add_cart_item(get_open_cart(request.user), product, size_variant)
 
     messages.success(request, "Product moved to cart successfully!")
     return redirect('cart')
+
+
+def parse_wishlist_ids(items):
+    """The selected wishlist item ids as UUIDs, raises ValueError unless items is a list of them."""
+    if not isinstance(items, list):
+        raise ValueError("items must be a list.")
+    return [uuid.UUID(str(item)) for item in items]
+
+
+# Move all or the selected wishlist items to the cart in one transaction
+@require_POST
+@login_required
+def move_wishlist_items_to_cart(request):
+    if request.content_type == 'application/json':
+        try:
+            wishlist_ids = json.loads(request.body).get('items')
+            if wishlist_ids is not None:
+                wishlist_ids = parse_wishlist_ids(wishlist_ids)
+        except (ValueError, AttributeError):
+            return JsonResponse({"success": False, "error": "Invalid request body."}, status=400)
+        return JsonResponse({"success": True, **move_wishlist_to_cart(request.user, wishlist_ids)})
+
+    try:
+        wishlist_ids = parse_wishlist_ids(request.POST.getlist('items')) or None
+    except ValueError:
+        messages.error(request, "Invalid wishlist selection.")
+        return redirect('wishlist')
+    result = move_wishlist_to_cart(request.user, wishlist_ids)
+    if result['moved']:
+        messages.success(request, f"Moved {result['moved']} items to your cart.")
+    if result['out_of_stock']:
+        messages.warning(request, f"{result['out_of_stock']} items are out of stock and stayed in your wishlist.")
+    return redirect('cart' if result['moved'] else 'wishlist')
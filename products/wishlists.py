@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from django.db.models import OuterRef, Subquery
+
+from base.pagination import KnownCountPaginator
+from products.models import ProductImage, Wishlist
+
+WISHLIST_PER_PAGE = 20
+WISHLIST_COUNT_TIMEOUT = 60 * 60 * 24
+
+
+def _count_key(user_id):
+    return f'wishlist-count:{user_id}'
+
+
+def get_wishlist_count(user):
+    """Number of items in the user's wishlist, cached until the wishlist changes."""
+    key = _count_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Wishlist.objects.filter(user=user).count()
+        cache.set(key, count, WISHLIST_COUNT_TIMEOUT)
+    return count
+
+
+def invalidate_wishlist_count(user_id):
+    cache.delete(_count_key(user_id))
+
+
+def get_wishlist_items(user):
+    """
+    The user's wishlist, newest first, with product, category and size joined
+    in and the first product image as primary_image, so a page of cards is
+    one query plus one prefetch of colors.
+    """
+    primary_image = ProductImage.objects.filter(product=OuterRef('product')).order_by('pk').values('image')[:1]
+    return Wishlist.objects.filter(user=user).select_related('product', 'size_variant').annotate(
+        primary_image=Subquery(primary_image),
+    ).prefetch_related('product__color_variant').order_by('-added_on', '-uid')
+
+
+def get_wishlist_page(user, page):
+    paginator = KnownCountPaginator(get_wishlist_items(user), WISHLIST_PER_PAGE, get_wishlist_count(user))
+    try:
+        return paginator.page(page)
+    except PageNotAnInteger:
+        return paginator.page(1)
+    except EmptyPage:
+        return paginator.page(paginator.num_pages)